@@ -0,0 +1,189 @@
+"""
+Sell value of a whole artifact vault, from an account export (CSV, JSON or JSON lines), with totals by set, kind and
+rank.
+
+Prices come from ARTIFACT_SELL_PRICES, the same as the campaign analysis. An artifact's price only depends on its
+set, kind, rank and rarity, so the vault is read in chunks and each chunk is just counted into a 42 x 9 x 6 x 5
+array of how many artifacts there are of each. Memory stays the same however big the vault, and the whole vault is
+priced in one multiplication at the end.
+
+Records need a set, kind, rank and rarity, either as the game's (1-based) IDs or by name ("Speed", "Boots",
+"Legendary"; ranks are 1-6). Which columns/keys they're in can be changed with columns=. Records that can't be
+priced (missing or unknown values) are counted in VaultValuation.unpriced rather than stopping the import.
+
+    valuation = value_vault("artifacts.csv")
+    valuation.total_value()
+    valuation.totals(["set", "rank"])
+
+    python raid_artifact_valuation.py vault.csv|vault.json|vault.jsonl [keys to the array in the json ...]
+"""
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+
+from raid_static_data_analysis import (ARTIFACT_KIND_NAMES, ARTIFACT_SELL_PRICES, ARTIFACT_SET_NAMES, CHAMP_RARITIES,
+                                       iter_json_array)
+
+# Records read and counted at a time
+VAULT_CHUNK_ROWS = 100000
+
+# Field -> column (CSV) or key (JSON) it's read from
+VAULT_COLUMNS = {"set": "set", "kind": "kind", "rank": "rank", "rarity": "rarity"}
+
+# Field -> names of its values in 0-based order, for exports that name them rather than give IDs
+VAULT_VALUE_NAMES = {
+    "set": ARTIFACT_SET_NAMES,
+    "kind": ARTIFACT_KIND_NAMES,
+    "rank": [str(rank) for rank in range(1, 7)],
+    "rarity": CHAMP_RARITIES[1:],
+}
+# Other names exports use
+VAULT_VALUE_ALIASES = {
+    "set": {"hp": 0, "attackpower": 1, "attackspeed": 3, "criticalchance": 4, "criticaldamage": 5,
+            "lifedrain": 8, "critrate": 4, "critdamage": 5},
+    "kind": {"cloak": 7, "armor": 1},
+    "rank": {"one": 0, "two": 1, "three": 2, "four": 3, "five": 4, "six": 5},
+    "rarity": {},
+}
+
+_FIELDS = ["set", "kind", "rank", "rarity"]
+
+
+def _value_lookup(field):
+    # Lower case name, without spaces -> 0-based index
+    lookup = {name.lower().replace(" ", ""): index for index, name in enumerate(VAULT_VALUE_NAMES[field])}
+    lookup.update(VAULT_VALUE_ALIASES[field])
+    return lookup
+
+
+_VALUE_LOOKUPS = {field: _value_lookup(field) for field in _FIELDS}
+
+
+def artifact_indexes(field, values):
+    """
+    :param field: "set", "kind", "rank" or "rarity"
+    :param values: Array-like of 1-based IDs, or names
+    :return: Array of 0-based indexes into ARTIFACT_SELL_PRICES, -1 for values that aren't known
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        indexes = values - 1.0
+    else:
+        values = pd.Series(values, dtype=object)
+        indexes = pd.to_numeric(values, errors="coerce") - 1
+        named = indexes.isna() & values.notna()
+        if named.any():
+            indexes[named] = values[named].astype(str).str.lower().str.replace(" ", "", regex=False).map(
+                _VALUE_LOOKUPS[field])
+        indexes = indexes.to_numpy(dtype=float)
+    size = ARTIFACT_SELL_PRICES.shape[_FIELDS.index(field)]
+    known = (indexes >= 0) & (indexes < size) & (indexes == np.floor(indexes))
+    return np.where(known, np.nan_to_num(indexes, nan=-1), -1).astype(np.intp)
+
+
+class VaultValuation:
+    """
+    Artifacts of a vault, counted by set, kind, rank and rarity.
+
+    .counts is an array of how many artifacts there are of each, indexed like ARTIFACT_SELL_PRICES. .unpriced is the
+    number of records that couldn't be priced.
+    """
+
+    def __init__(self, counts=None, unpriced=0):
+        self.counts = np.zeros(ARTIFACT_SELL_PRICES.shape, dtype=np.int64) if counts is None else counts
+        self.unpriced = unpriced
+
+    def add(self, sets, kinds, ranks, rarities):
+        """
+        Count a batch of artifacts.
+
+        :param sets: Array-likes of each artifact's set, kind, rank and rarity, as IDs or names (see artifact_indexes)
+        """
+        indexes = [artifact_indexes(field, values) for field, values in zip(_FIELDS, (sets, kinds, ranks, rarities))]
+        priced = np.logical_and.reduce([index >= 0 for index in indexes])
+        self.unpriced += int(len(priced) - priced.sum())
+        cells = np.ravel_multi_index([index[priced] for index in indexes], self.counts.shape)
+        self.counts += np.bincount(cells, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.unpriced += other.unpriced
+
+    def values(self):
+        """
+        :return: Array of the sell value of all the artifacts of each set, kind, rank and rarity
+        """
+        return self.counts * ARTIFACT_SELL_PRICES
+
+    def total_value(self):
+        return float(self.values().sum())
+
+    def totals(self, by=("set", "kind", "rank")):
+        """
+        :param by: Fields to group by, any of "set", "kind", "rank", "rarity"
+        :return: DataFrame of the number of artifacts and their sell value for each group that has any
+        """
+        by = list(by)
+        others = tuple(axis for axis, field in enumerate(_FIELDS) if field not in by)
+        # Remaining axes put in the order of by, so the groups come out in game order
+        order = [[field for field in _FIELDS if field in by].index(field) for field in by]
+        counts = self.counts.sum(axis=others).transpose(order)
+        values = self.values().sum(axis=others).transpose(order)
+        index = pd.MultiIndex.from_product([VAULT_VALUE_NAMES[field] for field in by], names=by)
+        totals = pd.DataFrame({"count": counts.ravel(), "value": values.ravel()}, index=index)
+        return totals[totals["count"] > 0]
+
+
+def _csv_chunks(path, columns, chunk_rows):
+    for chunk in pd.read_csv(path, usecols=list(columns.values()), chunksize=chunk_rows):
+        yield [chunk[columns[field]].to_numpy() for field in _FIELDS]
+
+
+def _json_lines_chunks(path, columns, chunk_rows):
+    for chunk in pd.read_json(path, lines=True, dtype=False, chunksize=chunk_rows):
+        yield [chunk[columns[field]].to_numpy() if columns[field] in chunk else np.full(len(chunk), None)
+               for field in _FIELDS]
+
+
+def _json_chunks(path, keys, columns, chunk_rows):
+    records = iter_json_array(path, *keys)
+    while True:
+        chunk = list(itertools.islice(records, chunk_rows))
+        if not chunk:
+            return
+        yield [[record.get(columns[field]) if isinstance(record, dict) else None for record in chunk]
+               for field in _FIELDS]
+
+
+def value_vault(path, keys=(), columns=None, chunk_rows=VAULT_CHUNK_ROWS):
+    """
+    Read an artifact vault export a chunk at a time, and count and price its artifacts.
+
+    :param path: .csv, .json (an array of records, or records nested in an object) or .jsonl (a record per line)
+    :param keys: For .json, the keys leading to the array of records, e.g. ("artifacts",). The top level if not given.
+    :param columns: Optional dict of field ("set", "kind", "rank", "rarity") -> column/key to read it from, for any
+                    that aren't under the names in VAULT_COLUMNS
+    :param chunk_rows: Records read at a time
+    :return: VaultValuation
+    """
+    columns = dict(VAULT_COLUMNS, **(columns or {}))
+    if path.endswith(".csv"):
+        chunks = _csv_chunks(path, columns, chunk_rows)
+    elif path.endswith(".jsonl"):
+        chunks = _json_lines_chunks(path, columns, chunk_rows)
+    else:
+        chunks = _json_chunks(path, keys, columns, chunk_rows)
+
+    valuation = VaultValuation()
+    for chunk in chunks:
+        valuation.add(*chunk)
+    return valuation
+
+
+if __name__ == '__main__':
+    vault = value_vault(sys.argv[1] if len(sys.argv) > 1 else "artifacts.csv", keys=sys.argv[2:])
+    vault.totals().to_csv("raid_vault_value.csv")
+    print(f"{vault.counts.sum()} artifacts worth {vault.total_value():.0f} silver"
+          f"{f', {vault.unpriced} could not be priced' if vault.unpriced else ''}")
@@ -0,0 +1,406 @@
+"""
+Benchmarks for the static data pipeline.
+
+Generates synthetic static_data.json files with the same layout as the real one, at a few multiples of the size of
+the real game data, and times each part of the pipeline on them:
+
+    python raid_benchmark.py                          # 1x, 10x and 100x, results in benchmark_results.json
+    python raid_benchmark.py --scales 1 10 --repeat 3
+    python raid_benchmark.py --data static_data.json  # the real thing, e.g. to compare data patches
+    python raid_benchmark.py --compare old_results.json
+
+Every phase runs in a fresh process so that its peak memory can be measured on its own.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from raid_static_data_analysis import DIFFICULTY_CODES, EFFECT_TARGET_TYPES, EFFECT_TYPES, STAT_TYPES, STATUS_TYPES
+
+try:
+    import resource
+except ImportError:
+    # Windows. Timings still work, memory just doesn't get reported.
+    resource = None
+
+# Roughly the size of the game data as of writing. Every champ is in HeroTypes once per ascension grade (only the
+# fully ascended one, ID ending in 6, gets processed).
+SYNTHETIC_BASE_CHAMPS = 700
+SYNTHETIC_SKILLS_PER_CHAMP = 4
+SYNTHETIC_CAMPAIGN_ZONES = 12
+SYNTHETIC_CAMPAIGN_SUBSTAGES = 7
+SYNTHETIC_OTHER_STAGES = 1500
+
+BENCHMARK_PHASES = ["load_json", "build_cache", "load_cache", "campaign_drop_info",
+                    "champ_abilities_and_multipliers"]
+
+# Some real multiplier formulas, plus a few odd ones
+SYNTHETIC_FORMULAS = ["3.4*ATK", "0.15*HP", "ATK*2+DEF", "4*DEF", "0.3*ATK*(1+DEBUFF_COUNT*0.15)", "HP*0.1+ATK",
+                      "MAX_STAMINA*0.2", "HERO_LEVEL*10", "2.5*ATK+0.1*TRG_HP", "3*ATK-(0.5*DEF)", "ATK",
+                      "min(4*ATK, 0.1*TRG_MAX_HP)", "0.05*HP*(1+BUFF_COUNT*0.1)", "5.5*ATK"]
+
+# The first digit of a stage ID gives the type of content. Campaign is 1, everything else gets skipped by the campaign
+# code but still has to be read.
+SYNTHETIC_OTHER_STAGE_PREFIXES = [2, 3, 5, 7, 8, 9]
+
+
+def _synthetic_hero(rng, hero_id, skill_ids):
+    hero = {
+        "Id": hero_id,
+        "Name": {"Key": f"h{hero_id}n", "DefaultValue": f"Hero_{hero_id}"},
+        "Rarity": rng.randint(1, 5),
+        "Element": rng.randint(1, 4),
+        "Role": rng.randint(0, 3),
+        "Fraction": rng.choice([1, 2, 3, 5, 6, 7, 8, 9, 10, 11, 12, 13, 16]),
+        "Status": rng.choice([40, 40, 40, 35, 30]),
+        # Stats are fixed point, the same way the game stores them
+        "BaseStats": {"Health": int(rng.randint(12000, 20000) * 26004993.4368775),
+                      "Attack": int(rng.randint(700, 1500) * 390018709.167108),
+                      "Defence": int(rng.randint(700, 1500) * 390018709.167108),
+                      "Speed": rng.randint(90, 110) << 32,
+                      "Resistance": rng.choice([30, 40, 50]) << 32,
+                      "Accuracy": rng.choice([0, 10, 20]) << 32,
+                      "CriticalChance": 15 << 32,
+                      "CriticalDamage": rng.choice([50, 60, 63]) << 32,
+                      "CriticalHeal": 50 << 32},
+        "SkillTypeIds": skill_ids,
+    }
+    if rng.random() < 0.6:
+        hero["LeaderSkill"] = {"StatKindId": rng.randint(1, len(STAT_TYPES)),
+                               "Amount": int(rng.choice([0.15, 0.2, 0.24, 0.3]) * 4294967296),
+                               "isAbsolute": rng.choice([0, 0, 1]),
+                               "Element": rng.choice([0, 0, 1, 2, 3, 4]),
+                               "Area": rng.choice([0, 2, 3, 5, 7])}
+    return hero
+
+
+def _synthetic_skill(rng, skill_id, effect_kinds, status_types):
+    effects = []
+    for effect_index in range(rng.randint(1, 4)):
+        kind = rng.choice(effect_kinds)
+        effect = {"Id": skill_id * 10 + effect_index, "KindId": kind, "Count": rng.choice([1, 1, 1, 2, 3]),
+                  "TargetParams": {"TargetType": rng.randrange(len(EFFECT_TARGET_TYPES))}}
+        if kind in (0, 1000, 4000, 5000, 6000) or rng.random() < 0.2:
+            effect["MultiplierFormula"] = rng.choice(SYNTHETIC_FORMULAS)
+        if kind in (4000, 5000):
+            effect["Chance"] = rng.choice([0, 1 << 31, int(0.3 * 4294967296), int(0.75 * 4294967296)])
+            effect["ApplyStatusEffectParams"] = {"StatusEffectInfos": [
+                {"TypeId": rng.choice(status_types), "Duration": rng.randint(1, 3)}
+                for _ in range(rng.randint(1, 2))]}
+        effects.append(effect)
+
+    # Books
+    bonuses = [{"SkillBonusType": rng.choice([0, 0, 1, 2, 3]),
+                "Value": int(rng.choice([0.05, 0.1, 0.15, 1]) * 4294967296)}
+               for _ in range(rng.randint(0, 5))]
+
+    return {"Id": skill_id,
+            "Name": {"Key": f"s{skill_id}n", "DefaultValue": f"Skill_{skill_id}"},
+            "Description": {"Key": f"s{skill_id}d", "DefaultValue": f"Skill_{skill_id}_desc"},
+            "Cooldown": rng.choice([0, 0, 3, 4, 5]),
+            "SkillLevelBonuses": bonuses,
+            "Effects": effects}
+
+
+def _synthetic_stage(rng, stage_id, energy_cost, level):
+    rank_probabilities = rng.choice([{"1": 10, "2": 30, "3": 30, "4": 20, "5": 10},
+                                     {"4": 30, "5": 50, "6": 20}, {"1": 60, "2": 40}])
+    rarity_probabilities = rng.choice([{"1": 40, "2": 30, "3": 20, "4": 8, "5": 2},
+                                       {"3": 50, "4": 35, "5": 15}, {"1": 90, "2": 10}])
+    return {
+        "Id": stage_id,
+        "StartCondition": {"Price": {"RawValues": {"1": energy_cost}}},
+        "Rewards": [{"Type": 3, "MinCount": 100 * level, "MaxCount": 120 * level},
+                    {"Type": 5, "MinCount": 10 + level, "MaxCount": 12 + level}],
+        "RewardHeroXp": 100 * level,
+        "Reward": {"Rewards": [{"Type": 4, "Probability": rng.randint(60, 80)},
+                               {"Type": 2, "Probability": rng.randint(2, 8), "MinCount": 1, "MaxCount": 3},
+                               {"Type": 1, "HeroGrade": 1, "Probability": rng.randint(5, 15)},
+                               {"Type": 1, "HeroGrade": 2, "Probability": rng.randint(2, 8)},
+                               {"Type": 1, "HeroGrade": 3, "Probability": rng.randint(0, 3)}],
+                   "ArtifactProbsByRankId": rank_probabilities,
+                   "ArtifactProbsByRarityId": rarity_probabilities,
+                   "ArtifactProbsByKindId": {str(rng.randint(1, 9)): 100},
+                   "ArtifactProbsBySetKindId": {str(rng.randint(1, 20)): 100}},
+    }
+
+
+def synthetic_counts(scale=1):
+    """
+    :param scale: Multiple of the size of the real game data
+    :return: dict of how many champs, hero types, skills and stages a synthetic static data file of that scale has
+    """
+    champs = SYNTHETIC_BASE_CHAMPS * scale
+    campaign_stages = SYNTHETIC_CAMPAIGN_ZONES * len(DIFFICULTY_CODES) * SYNTHETIC_CAMPAIGN_SUBSTAGES * scale
+    return {"champs": champs, "hero_types": champs * 6, "skills": champs * SYNTHETIC_SKILLS_PER_CHAMP,
+            "campaign_stages": campaign_stages, "stages": campaign_stages + SYNTHETIC_OTHER_STAGES * scale}
+
+
+def write_synthetic_static_data(path, scale=1, seed=0):
+    """
+    Write a made up static data json with the same structure as the real one. Records are written out one at a time,
+    so even the big ones can be made without holding them in memory.
+
+    :param path: File to write
+    :param scale: Multiple of the size of the real game data. Campaign gets more substages per zone rather than more
+                  zones, since the zone is two digits of the stage ID.
+    :param seed: Random seed. Same seed and scale, same file.
+    :return: synthetic_counts(scale)
+    """
+    rng = random.Random(seed)
+    effect_kinds = sorted(EFFECT_TYPES)
+    status_types = sorted(STATUS_TYPES)
+    localization = {}
+
+    def write_records(f, records):
+        for index, record in enumerate(records):
+            if index:
+                f.write(",")
+            f.write(json.dumps(record))
+
+    def heroes():
+        for champ in range(SYNTHETIC_BASE_CHAMPS * scale):
+            base_id = (100 + champ) * 10
+            skill_ids = [(base_id + 6) * 10 + skill for skill in range(1, SYNTHETIC_SKILLS_PER_CHAMP + 1)]
+            localization[f"h{base_id + 6}n"] = f"Champ {champ}"
+            template = _synthetic_hero(rng, base_id + 6, skill_ids)
+            # Lower grades share everything but the ID
+            for grade in range(1, 7):
+                yield dict(template, Id=base_id + grade)
+
+    def skills():
+        for champ in range(SYNTHETIC_BASE_CHAMPS * scale):
+            for skill in range(1, SYNTHETIC_SKILLS_PER_CHAMP + 1):
+                skill_id = ((100 + champ) * 10 + 6) * 10 + skill
+                localization[f"s{skill_id}n"] = f"Skill {skill_id}"
+                localization[f"s{skill_id}d"] = (f"Attacks 1 enemy {skill % 3 + 1} times. Has a "
+                                                 f"<color=#1ee600>{skill * 10}%</color> chance of something.")
+                yield _synthetic_skill(rng, skill_id, effect_kinds, status_types)
+
+    def stages():
+        for zone in range(1, SYNTHETIC_CAMPAIGN_ZONES + 1):
+            for difficulty in range(1, len(DIFFICULTY_CODES) + 1):
+                for substage in range(1, SYNTHETIC_CAMPAIGN_SUBSTAGES * scale + 1):
+                    yield _synthetic_stage(rng, int(f"1{zone:02d}{difficulty}0{substage}"),
+                                           2 + zone // 3 + difficulty, zone * difficulty)
+        for index in range(SYNTHETIC_OTHER_STAGES * scale):
+            prefix = SYNTHETIC_OTHER_STAGE_PREFIXES[index % len(SYNTHETIC_OTHER_STAGE_PREFIXES)]
+            yield _synthetic_stage(rng, int(f"{prefix}{index:07d}"), rng.randint(8, 24), rng.randint(1, 40))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"HeroData": {"HeroTypes": [')
+        write_records(f, heroes())
+        f.write(']}, "SkillData": {"SkillTypes": [')
+        write_records(f, skills())
+        f.write(']}, "StageData": {"Stages": [')
+        write_records(f, stages())
+        f.write(']}, "StaticDataLocalization": ')
+        f.write(json.dumps(localization))
+        f.write("}")
+
+    return synthetic_counts(scale)
+
+
+def _peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def _run_phase(phase, json_path, cache_dir, workers):
+    """
+    Run one phase in this process.
+
+    :return: dict of seconds, peak memory before the timed part started and peak memory after, in MB
+    """
+    # Imported here so that the import doesn't count towards anything
+    import contextlib
+    from raid_static_data_analysis import campaign_drop_info, champ_abilities_and_multipliers
+    from raid_static_data_cache import build_static_data_cache, file_sha256, load_static_data
+
+    static_data = None
+    if phase in ("campaign_drop_info", "champ_abilities_and_multipliers"):
+        # Same as a normal run, i.e. reading from an up to date cache
+        static_data = load_static_data(json_path, cache_dir)
+    source_hash = file_sha256(json_path) if phase == "build_cache" else None
+
+    memory_before = _peak_memory_mb()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if phase == "load_json":
+            with open(json_path, encoding="utf-8") as f:
+                json.load(f)
+        elif phase == "build_cache":
+            build_static_data_cache(json_path, cache_dir, source_hash)
+        elif phase == "load_cache":
+            static_data = load_static_data(json_path, cache_dir)
+            # Opening the cache is lazy, so read something from each table too
+            for records in (static_data["HeroData"]["HeroTypes"], static_data["SkillData"]["SkillTypes"],
+                            static_data["StageData"]["Stages"]):
+                list(records)
+        elif phase == "campaign_drop_info":
+            campaign_drop_info(static_data["StageData"]["Stages"])
+        elif phase == "champ_abilities_and_multipliers":
+            champ_abilities_and_multipliers(static_data, workers=workers)
+        else:
+            raise ValueError(f"Unknown benchmark phase {phase!r}")
+    seconds = time.perf_counter() - start
+
+    return {"seconds": seconds, "memory_before_mb": memory_before, "peak_memory_mb": _peak_memory_mb()}
+
+
+def run_phase_in_subprocess(phase, json_path, cache_dir, work_dir, workers=1):
+    """
+    Run one phase in a fresh Python process, with work_dir as its working directory (the csv's end up there).
+
+    :return: See _run_phase
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--run-phase", phase, "--data", os.path.abspath(json_path),
+               "--cache-dir", os.path.abspath(cache_dir), "--workers", str(workers)]
+    output = subprocess.run(command, cwd=work_dir, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def benchmark_static_data(json_path, work_dir, phases=None, repeat=1, workers=1):
+    """
+    Time every phase of the pipeline on one static data file.
+
+    :param json_path: Static data json
+    :param work_dir: Scratch directory for the cache and output csv's
+    :param phases: Phases to run, from BENCHMARK_PHASES (default: all of them). build_cache always runs first if
+                   anything later needs the cache.
+    :param repeat: Run each phase this many times and keep the fastest
+    :param workers: Passed on to champ_abilities_and_multipliers
+    :return: dict of phase -> {"seconds", "memory_before_mb", "peak_memory_mb", "runs"}
+    """
+    phases = BENCHMARK_PHASES if phases is None else phases
+    cache_dir = os.path.join(work_dir, "static_data.cache")
+    results = {}
+
+    # Everything after build_cache reads the cache, so it gets built (untimed) even if it isn't being benchmarked
+    needs_cache = any(BENCHMARK_PHASES.index(phase) > BENCHMARK_PHASES.index("build_cache") for phase in phases)
+
+    for phase in BENCHMARK_PHASES:
+        if phase == "build_cache" and phase not in phases and needs_cache:
+            run_phase_in_subprocess(phase, json_path, cache_dir, work_dir, workers)
+        if phase not in phases:
+            continue
+        runs = []
+        for _ in range(repeat):
+            if phase == "build_cache":
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            runs.append(run_phase_in_subprocess(phase, json_path, cache_dir, work_dir, workers))
+        best = min(runs, key=lambda run: run["seconds"])
+        results[phase] = dict(best, runs=[run["seconds"] for run in runs])
+
+    return results
+
+
+def benchmark_environment():
+    """
+    :return: dict describing the machine and library versions, to go along with benchmark results
+    """
+    return {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__}
+
+
+def compare_results(old, new):
+    """
+    Line up two benchmark result files, phase by phase.
+
+    :return: DataFrame with one row per (dataset, phase) in both files, old and new times and memory, and ratios
+    """
+    rows = []
+    for dataset, new_dataset in new["datasets"].items():
+        old_dataset = old["datasets"].get(dataset)
+        if not old_dataset:
+            continue
+        for phase, new_phase in new_dataset["phases"].items():
+            old_phase = old_dataset["phases"].get(phase)
+            if not old_phase:
+                continue
+            rows.append({"dataset": dataset, "phase": phase,
+                         "old_s": old_phase["seconds"], "new_s": new_phase["seconds"],
+                         "time_ratio": new_phase["seconds"] / old_phase["seconds"],
+                         "old_peak_mb": old_phase["peak_memory_mb"], "new_peak_mb": new_phase["peak_memory_mb"]})
+    return pd.DataFrame(rows, columns=["dataset", "phase", "old_s", "new_s", "time_ratio", "old_peak_mb",
+                                       "new_peak_mb"])
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                            help="Sizes of synthetic data to benchmark, as multiples of the real data")
+    arg_parser.add_argument("--data", help="Benchmark this static data json instead of synthetic data")
+    arg_parser.add_argument("--phases", nargs="+", choices=BENCHMARK_PHASES, default=BENCHMARK_PHASES)
+    arg_parser.add_argument("--repeat", type=int, default=1, help="Runs per phase; the fastest is kept")
+    arg_parser.add_argument("--workers", type=int, default=1, help="Processes for champ_abilities_and_multipliers")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    arg_parser.add_argument("--output", default="benchmark_results.json")
+    arg_parser.add_argument("--compare", help="Earlier results file to compare against")
+    arg_parser.add_argument("--keep", action="store_true", help="Keep the generated data and outputs")
+    # Used by run_phase_in_subprocess
+    arg_parser.add_argument("--run-phase", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+
+    if args.run_phase:
+        print(json.dumps(_run_phase(args.run_phase, args.data, args.cache_dir, args.workers)))
+        return
+
+    results = {"environment": benchmark_environment(), "workers": args.workers, "repeat": args.repeat,
+               "datasets": {}}
+    work_root = tempfile.mkdtemp(prefix="raid_benchmark_")
+    try:
+        datasets = [("data", args.data, None)] if args.data else [(f"synthetic_{scale}x", None, scale)
+                                                                 for scale in args.scales]
+        for name, json_path, scale in datasets:
+            work_dir = os.path.join(work_root, name)
+            os.makedirs(work_dir)
+            dataset = {}
+            if json_path is None:
+                json_path = os.path.join(work_dir, "static_data.json")
+                print(f"Generating {name}...")
+                start = time.perf_counter()
+                dataset["counts"] = write_synthetic_static_data(json_path, scale, args.seed)
+                dataset["generate_seconds"] = time.perf_counter() - start
+                dataset["seed"] = args.seed
+            dataset["json_bytes"] = os.path.getsize(json_path)
+
+            print(f"Benchmarking {name} ({dataset['json_bytes'] / (1 << 20):.1f} MB)...")
+            dataset["phases"] = benchmark_static_data(json_path, work_dir, args.phases, args.repeat, args.workers)
+            for phase, result in dataset["phases"].items():
+                memory = f"{result['peak_memory_mb']:.0f} MB peak" if result["peak_memory_mb"] is not None else ""
+                print(f"  {phase:<33}{result['seconds']:9.3f} s  {memory}")
+            results["datasets"][name] = dataset
+
+            # Write as we go, the 100x one takes a while
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if args.keep:
+            print(f"Benchmark files kept in {work_root}")
+        else:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare_results(json.load(f), results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
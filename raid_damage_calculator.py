@@ -0,0 +1,320 @@
+"""
+Expected damage of champions' skills for whole rosters of stat builds against whole lists of bosses, in one
+vectorized go. Rather than calculated_damage's base level 60 stats, each build brings its own stats (base stats plus
+gear, see apply_gear) and crit masteries, and each boss its DEF, HP and affinity.
+
+A skill's damage against a boss is, per damage effect:
+
+    formula (build's stats, boss's HP) * hits * book damage multiplier
+        * DEF mitigation * affinity multiplier * masteries * boss damage taken
+
+summed over the skill's damage effects, and the crit version times 1 + crit damage. Expected damage weighs the two by
+crit rate. Weak hits can't crit.
+
+    builds = apply_gear(champ_info_df, gear_df)
+    bosses = pd.DataFrame({"def": 3000, "hp": 1e8, "affinity": ["Magic", "Force", "Spirit", "Void"]},
+                          index=["Magic", "Force", "Spirit", "Void"])
+    damage = calculate_skill_damage(champ_move_df, builds, bosses)
+    damage.best()  # Best nuker against each affinity
+
+The game doesn't publish how DEF reduces damage. DEF mitigation here is defense_constant / (defense_constant +
+DEF), a curve fitted by players. Pass another constant if a better one turns up.
+
+    python raid_damage_calculator.py [static_data.json] [boss DEF] [boss HP]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from raid_static_data_analysis import AFFINITIES, FORMULA_DEFAULT_VARIABLES, _process_champs, evaluate_formulas_batched
+
+# Effect KindId of damage. Bomb multipliers (5000) are left out, they go off later and don't crit.
+DAMAGE_EFFECT_KIND = 6000
+
+# DEF that halves damage taken
+DEFENSE_CONSTANT = 600.0
+
+# Damage of strong and weak hits. Weak hits can't crit either.
+AFFINITY_STRONG_HIT = 1.3
+AFFINITY_WEAK_HIT = 0.7
+# Affinity -> the affinity it's strong against. Void is neutral.
+AFFINITY_STRONG_AGAINST = {"Magic": "Spirit", "Spirit": "Force", "Force": "Magic"}
+
+# Offense masteries, by their column in the builds: stat bonuses, and damage bonuses against bosses with more max HP
+# than the champ (Bring it Down)
+DAMAGE_MASTERY_STATS = {
+    "deadly_precision": {"cr_rate": 5},
+    "keen_strike": {"cr_dmg": 10},
+    "flawless_execution": {"cr_dmg": 20},
+}
+DAMAGE_MASTERY_BOSS_BONUS = {
+    "bring_it_down": 0.06,
+}
+
+# Boss columns -> formula variables depending on the target
+DAMAGE_TARGET_VARIABLES = {"TRG_MAX_HP": "hp", "TRG_HP": "current_hp"}
+
+# Most (damage effect x boss) formula results worked out at a time
+DAMAGE_CHUNK_CELLS = 1 << 21
+
+# Stats gear adds a percentage of base stats of, as "<stat>_pct" columns
+_PERCENT_STATS = ["hp", "atk", "def"]
+_BUILD_STATS = ["hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc"]
+
+
+def apply_gear(base_stats, gear):
+    """
+    Add gear to champs' base stats, the way the game does: HP/ATK/DEF% bonuses are of the base stat, everything else
+    is flat.
+
+    :param base_stats: DataFrame of base stats, laid out like champ_basic_info.csv (id, hp, atk, def, spd, cr_rate...)
+    :param gear: DataFrame with one row per build, with an "id" column for the champ, and any of "hp_pct", "atk_pct",
+                 "def_pct" for percentage bonuses and the base stat columns for flat bonuses. Other columns (build
+                 names, masteries...) are kept.
+    :return: DataFrame of builds, with the gear's index and the total stats
+    """
+    base = base_stats.drop_duplicates("id").set_index("id")
+    builds = gear.copy()
+    for stat in _BUILD_STATS:
+        total = pd.to_numeric(base[stat]).reindex(builds["id"]).to_numpy(dtype=float)
+        if stat in _PERCENT_STATS and f"{stat}_pct" in gear:
+            total = total * (1 + gear[f"{stat}_pct"].fillna(0).to_numpy(dtype=float) / 100)
+        if stat in gear:
+            total = total + gear[stat].fillna(0).to_numpy(dtype=float)
+        builds[stat] = total
+    return builds.drop(columns=[f"{stat}_pct" for stat in _PERCENT_STATS if f"{stat}_pct" in builds])
+
+
+def affinity_multipliers():
+    """
+    :return: (damage multiplier, whether it can crit), each an array indexed by [attacker, defender] AFFINITIES code
+    """
+    damage = np.ones((len(AFFINITIES), len(AFFINITIES)))
+    can_crit = np.ones(damage.shape, dtype=bool)
+    for attacker, defender in AFFINITY_STRONG_AGAINST.items():
+        damage[AFFINITIES.index(attacker), AFFINITIES.index(defender)] = AFFINITY_STRONG_HIT
+        damage[AFFINITIES.index(defender), AFFINITIES.index(attacker)] = AFFINITY_WEAK_HIT
+        can_crit[AFFINITIES.index(defender), AFFINITIES.index(attacker)] = False
+    return damage, can_crit
+
+
+def _affinity_codes(names):
+    # Unknown affinities count as neutral ('')
+    return pd.Index(AFFINITIES).get_indexer(pd.Series(names).fillna("")).clip(0)
+
+
+def damage_effects(champ_move_df):
+    """
+    :param champ_move_df: DataFrame laid out like champ_move_details.csv
+    :return: The damage effects with a multiplier formula, one row each (champ_move_details has a row per status)
+    """
+    kinds = pd.to_numeric(champ_move_df["effect_type_code"], errors="coerce")
+    effects = champ_move_df[(kinds == DAMAGE_EFFECT_KIND).to_numpy() &
+                            (champ_move_df["multiplier"].fillna("").str.len() > 1).to_numpy()]
+    return effects.drop_duplicates(["id", "skill_index", "effect_id", "multiplier", "num_hits"])
+
+
+class DamageTable:
+    """
+    Damage of every skill of every build against every boss.
+
+    .skills has a row per (build, skill): build (index label of the build), id, name, affinity, skill_index,
+    skill_id, skill_cd_booked. .non_crit, .crit and .expected are arrays of skills x bosses, in .bosses order, NaN
+    where a formula needs a value that wasn't given.
+    """
+
+    def __init__(self, skills, bosses, non_crit, crit, expected):
+        self.skills = skills
+        self.bosses = bosses
+        self.non_crit = non_crit
+        self.crit = crit
+        self.expected = expected
+
+    def per_turn(self, values):
+        """
+        :param values: One of .non_crit, .crit, .expected
+        :return: values over the booked cooldown of each skill
+        """
+        return values / np.maximum(self.skills["skill_cd_booked"].to_numpy(dtype=float), 1)[:, None]
+
+    def to_frame(self):
+        """
+        :return: DataFrame with a row per (build, skill, boss)
+        """
+        frame = self.skills.loc[self.skills.index.repeat(len(self.bosses))].reset_index(drop=True)
+        frame["boss"] = np.tile(self.bosses.to_numpy(), len(self.skills))
+        for name in ["non_crit", "crit", "expected"]:
+            frame[name] = getattr(self, name).ravel()
+        frame["expected_per_turn"] = self.per_turn(self.expected).ravel()
+        return frame
+
+    def best(self, top=1, per_turn=False):
+        """
+        :param top: How many skills to list per boss
+        :param per_turn: Rank by expected damage per turn (over the booked cooldown) rather than per use
+        :return: DataFrame of the skills with the most expected damage against each boss
+        """
+        expected_per_turn = self.per_turn(self.expected)
+        values = expected_per_turn if per_turn else self.expected
+        rows = []
+        for column, boss in enumerate(self.bosses):
+            # NaNs go last
+            order = np.argsort(-np.nan_to_num(values[:, column], nan=-np.inf), kind="stable")[:top]
+            best = self.skills.iloc[order].copy()
+            best.insert(0, "boss", boss)
+            best["expected"] = self.expected[order, column]
+            best["expected_per_turn"] = expected_per_turn[order, column]
+            rows.append(best)
+        return pd.concat(rows, ignore_index=True)
+
+
+def _boss_column(bosses, name, default):
+    if name in bosses:
+        return pd.to_numeric(bosses[name]).fillna(default).to_numpy(dtype=float)
+    return np.full(len(bosses), default, dtype=float)
+
+
+def calculate_skill_damage(champ_move_df, builds, bosses, extra_formula_variables=None,
+                           defense_constant=DEFENSE_CONSTANT):
+    """
+    Work out every build's skill damage against every boss.
+
+    :param champ_move_df: DataFrame laid out like champ_move_details.csv, for the formulas, hits, books and cooldowns
+    :param builds: DataFrame with a row per build: "id" of the champ, hp, atk, def, cr_rate, cr_dmg (see apply_gear),
+                   optionally "def_ignore" (0.25 for 25% DEF ignored) and True/False columns for the masteries in
+                   DAMAGE_MASTERY_STATS and DAMAGE_MASTERY_BOSS_BONUS. Champs can have any number of builds.
+    :param bosses: DataFrame with a row per boss, indexed by name: "def", and optionally "affinity" (neutral if not
+                   given), "hp" (max HP), "current_hp" (max HP if not given), "def_down" (0.6 for -60% DEF) and
+                   "damage_taken" (1.25 for Weaken and the like)
+    :param extra_formula_variables: Optional dict of other formula variables, on top of FORMULA_DEFAULT_VARIABLES,
+                                    e.g. {"DEBUFF_COUNT": 3}
+    :param defense_constant: DEF that halves damage
+    :return: DamageTable
+    """
+    effects = damage_effects(champ_move_df)
+    build_rows = np.arange(len(builds))
+    pairs = pd.DataFrame({"build": build_rows, "id": builds["id"].to_numpy()}).merge(
+        pd.DataFrame({"effect": np.arange(len(effects)), "id": effects["id"].to_numpy()}), on="id")
+    # Each build's skills' effects next to each other, in move table order
+    pairs = pairs.sort_values(["build", "effect"], kind="stable")
+    pair_builds = pairs["build"].to_numpy()
+    pair_effects = pairs["effect"].to_numpy()
+
+    # First effect of each (build, skill)
+    pair_skills = effects["skill_index"].to_numpy()[pair_effects]
+    starts = np.flatnonzero(np.r_[len(pairs) > 0, (pair_builds[1:] != pair_builds[:-1]) |
+                                  (pair_skills[1:] != pair_skills[:-1])])
+    skill_builds = pair_builds[starts]
+    skill_effects = pair_effects[starts]
+
+    skills = pd.DataFrame({
+        "build": builds.index.to_numpy()[skill_builds],
+        **{column: effects[column].to_numpy()[skill_effects]
+           for column in ["id", "name", "affinity", "skill_index", "skill_id"]},
+        "skill_cd_booked": pd.to_numeric(effects["skill_cd_booked"]).to_numpy(dtype=float)[skill_effects],
+    })
+
+    # Formula variables: the build's stats per effect, the boss's per boss
+    stats = {stat: pd.to_numeric(builds[stat]).to_numpy(dtype=float) for stat in ["hp", "atk", "def"]}
+    target_variables = {variable: _boss_column(bosses, column, np.nan)
+                        for variable, column in DAMAGE_TARGET_VARIABLES.items()}
+    if "current_hp" not in bosses:
+        target_variables["TRG_HP"] = target_variables["TRG_MAX_HP"]
+    formulas = effects["multiplier"].str[1:].to_numpy()[pair_effects]
+    effect_scale = (pd.to_numeric(effects["num_hits"]).to_numpy(dtype=float) *
+                    pd.to_numeric(effects["book_dmg_mul"]).to_numpy(dtype=float))[pair_effects]
+
+    # Base damage of each skill against each boss, a chunk of whole skills at a time
+    base = np.empty((len(starts), len(bosses)))
+    bounds = np.r_[starts, len(pairs)]
+    step = max(1, DAMAGE_CHUNK_CELLS // max(len(bosses), 1))
+    first = 0
+    while first < len(starts):
+        # Whole skills, at least one, up to step effects
+        last = max(first + 1, np.searchsorted(bounds, bounds[first] + step, side="right") - 1)
+        rows = slice(bounds[first], bounds[last])
+        count = rows.stop - rows.start
+        variables = dict(FORMULA_DEFAULT_VARIABLES, **(extra_formula_variables or {}))
+        variables.update(HP=np.repeat(stats["hp"][pair_builds[rows]], len(bosses)),
+                         ATK=np.repeat(stats["atk"][pair_builds[rows]], len(bosses)),
+                         DEF=np.repeat(stats["def"][pair_builds[rows]], len(bosses)))
+        variables.update({name: np.tile(values, count) for name, values in target_variables.items()})
+        values, _ = evaluate_formulas_batched(np.repeat(formulas[rows], len(bosses)), variables)
+        values = values.reshape(count, len(bosses)) * effect_scale[rows, None]
+        base[first:last] = np.add.reduceat(values, starts[first:last] - bounds[first], axis=0)
+        first = last
+
+    # Crit, with masteries
+    cr_rate = pd.to_numeric(builds["cr_rate"]).to_numpy(dtype=float).copy()
+    cr_dmg = pd.to_numeric(builds["cr_dmg"]).to_numpy(dtype=float).copy()
+    boss_bonus = np.zeros((len(builds), 1))
+    boss_hp = _boss_column(bosses, "hp", np.nan)
+    for mastery, bonuses in DAMAGE_MASTERY_STATS.items():
+        if mastery in builds:
+            chosen = builds[mastery].fillna(False).to_numpy(dtype=bool)
+            cr_rate += chosen * bonuses.get("cr_rate", 0)
+            cr_dmg += chosen * bonuses.get("cr_dmg", 0)
+    for mastery, bonus in DAMAGE_MASTERY_BOSS_BONUS.items():
+        if mastery in builds:
+            boss_bonus = boss_bonus + builds[mastery].fillna(False).to_numpy(dtype=bool)[:, None] * bonus * \
+                (boss_hp[None, :] > stats["hp"][:, None])
+
+    # DEF mitigation
+    def_ignore = pd.to_numeric(builds["def_ignore"]).fillna(0).to_numpy(dtype=float) if "def_ignore" in builds else \
+        np.zeros(len(builds))
+    boss_def = _boss_column(bosses, "def", 0) * (1 - _boss_column(bosses, "def_down", 0))
+    effective_def = np.maximum(boss_def[None, :] * (1 - def_ignore[skill_builds, None]), 0)
+    mitigation = defense_constant / (defense_constant + effective_def)
+
+    # Affinity
+    affinity_damage, affinity_can_crit = affinity_multipliers()
+    attacker_affinities = _affinity_codes(skills["affinity"])[:, None]
+    boss_affinities = _affinity_codes(bosses["affinity"] if "affinity" in bosses else [""] * len(bosses))[None, :]
+
+    non_crit = base * mitigation * affinity_damage[attacker_affinities, boss_affinities] * \
+        (1 + boss_bonus[skill_builds]) * _boss_column(bosses, "damage_taken", 1)[None, :]
+    crit_multiplier = 1 + cr_dmg[skill_builds, None] / 100
+    crit_chance = np.clip(cr_rate[skill_builds, None] / 100, 0, 1) * affinity_can_crit[attacker_affinities,
+                                                                                        boss_affinities]
+    return DamageTable(skills, bosses.index, non_crit, non_crit * crit_multiplier,
+                       non_crit * (1 + crit_chance * (crit_multiplier - 1)))
+
+
+def champ_damage_tables(data):
+    """
+    :param data: static data json object
+    :return: (champ info, champ moves) DataFrames, laid out like champ_basic_info.csv and champ_move_details.csv
+    """
+    skill_data_by_id = {skill.get("Id"): skill for skill in data["SkillData"]["SkillTypes"]}
+    champ_info_rows, champ_move_rows, _ = _process_champs(data["HeroData"]["HeroTypes"], skill_data_by_id,
+                                                          data.get("StaticDataLocalization"), None, True)
+    return champ_info_rows.to_dataframe(), champ_move_rows.to_dataframe()
+
+
+def damage_by_affinity(data, boss_def=0.0, boss_hp=np.inf, top=20):
+    """
+    The best nukers against a boss of each affinity, at base level 60 stats. Writes "raid_damage_by_affinity.csv".
+
+    :param data: static data json object
+    :param boss_def: The boss's DEF
+    :param boss_hp: The boss's max HP, for formulas capped by it. Uncapped if not given.
+    :param top: Skills to list per affinity
+    :return: DataFrame of the top skills by expected damage against each affinity
+    """
+    champ_info_df, champ_move_df = champ_damage_tables(data)
+    builds = champ_info_df[["id"] + _BUILD_STATS].set_index(champ_info_df["name"])
+    affinities = [affinity for affinity in AFFINITIES if affinity]
+    bosses = pd.DataFrame({"def": boss_def, "hp": boss_hp, "affinity": affinities}, index=affinities)
+    best = calculate_skill_damage(champ_move_df, builds, bosses).best(top)
+    best.to_csv("raid_damage_by_affinity.csv", index=False)
+    return best
+
+
+if __name__ == '__main__':
+    from raid_static_data_cache import load_static_data
+
+    static_data = load_static_data(sys.argv[1] if len(sys.argv) > 1 else "static_data.json")
+    damage_by_affinity(static_data,
+                       boss_def=float(sys.argv[2]) if len(sys.argv) > 2 else 0.0,
+                       boss_hp=float(sys.argv[3]) if len(sys.argv) > 3 else np.inf)
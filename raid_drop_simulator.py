@@ -0,0 +1,183 @@
+"""
+Monte Carlo simulation of campaign stage drops, for the spread of outcomes the expected values in
+raid_campaign_farming_data.csv hide, e.g. "90% chance of at least 3 rares in 100 runs of 12-7-Br".
+
+Every run drops one random reward, picked by the stage's Reward.Rewards weights: an artifact, a mystery shard, or a
+common/uncommon/rare champ. Artifacts get a rank and rarity from ArtifactProbsByRankId/ArtifactProbsByRarityId and
+are sold for their ARTIFACT_SELL_PRICES value (averaged over the sets and kinds, for stages that drop several).
+
+That makes the outcome of N runs a multinomial draw over 35 possible drops (30 artifact rank/rarity combinations,
+shard, three champ grades, nothing), so a whole trial of any number of runs is sampled in one go, and every trial of a
+stage in one NumPy call.
+
+Each stage has its own random stream, seeded from the run's seed and the stage ID, so results can be reproduced
+whatever the number of processes and whichever other stages are simulated alongside it.
+
+    python raid_drop_simulator.py [static_data.json] [runs per trial] [trials]
+"""
+import concurrent.futures
+import sys
+
+import numpy as np
+import pandas as pd
+
+from raid_static_data_analysis import artifact_sell_prices, normalize_stage_rewards
+
+# What a trial's outcome is measured in. silver includes artifact sales.
+DROP_SIMULATION_OUTCOMES = ["artifact", "shard", "common", "uncommon", "rare", "silver"]
+DROP_SIMULATION_TRIALS = 10000
+DROP_SIMULATION_PERCENTILES = (10, 50, 90)
+# Stages handed to a worker process at a time
+DROP_SIMULATION_STAGES_PER_TASK = 16
+
+# Possible drops of a single run: artifacts by rank then rarity, then shard, common, uncommon, rare, nothing
+_ARTIFACT_DROPS = 6 * 5
+_SHARD_DROP = _ARTIFACT_DROPS
+_NOTHING_DROP = _ARTIFACT_DROPS + 4
+
+
+def drop_probabilities(stage_rewards):
+    """
+    :param stage_rewards: Output of normalize_stage_rewards
+    :return: (probabilities, artifact prices): chance of each possible drop per run (stage x 35), and the sell price
+             of each of the 30 artifact drops (stage x 30)
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reward_chances = np.nan_to_num(stage_rewards["reward_weights"] / stage_rewards["total_weight"][:, None])
+    artifact_chances = reward_chances[:, 0, None, None] * \
+        stage_rewards["rank_probabilities"][:, :, None] * stage_rewards["rarity_probabilities"][:, None, :]
+
+    probabilities = np.zeros((len(reward_chances), _NOTHING_DROP + 1))
+    probabilities[:, :_ARTIFACT_DROPS] = artifact_chances.reshape(-1, _ARTIFACT_DROPS)
+    probabilities[:, _SHARD_DROP:_NOTHING_DROP] = reward_chances[:, 1:]
+    # Whatever's left is a run without a random drop. Rank/rarity odds that add up to a bit over 100% get scaled down.
+    total = probabilities.sum(axis=1)
+    probabilities[:, _NOTHING_DROP] = np.maximum(1 - total, 0)
+    probabilities /= np.maximum(total, 1)[:, None]
+
+    prices = artifact_sell_prices(stage_rewards["set_probabilities"], stage_rewards["kind_probabilities"])
+    return probabilities, prices.reshape(-1, _ARTIFACT_DROPS)
+
+
+def _simulate_stages(seed_entropy, stage_keys, probabilities, prices, silver, shard_quantity, runs, trials):
+    """
+    :return: Array of stages x trials x DROP_SIMULATION_OUTCOMES
+    """
+    outcomes = np.empty((len(stage_keys), trials, len(DROP_SIMULATION_OUTCOMES)))
+    for stage, stage_key in enumerate(stage_keys):
+        rng = np.random.default_rng(np.random.SeedSequence(seed_entropy, spawn_key=(stage_key,)))
+        # How many of each drop every trial got: trials x 35
+        counts = rng.multinomial(runs, probabilities[stage], size=trials)
+        artifacts = counts[:, :_ARTIFACT_DROPS]
+        outcomes[stage, :, 0] = artifacts.sum(axis=1)
+        outcomes[stage, :, 1] = counts[:, _SHARD_DROP] * shard_quantity[stage]
+        outcomes[stage, :, 2:5] = counts[:, _SHARD_DROP + 1:_NOTHING_DROP]
+        outcomes[stage, :, 5] = runs * silver[stage] + artifacts @ prices[stage]
+    return outcomes
+
+
+class DropSimulation:
+    """
+    Simulated outcomes of a number of runs of each stage.
+
+    .samples is a dict of outcome (DROP_SIMULATION_OUTCOMES) -> array of stages x trials, in .stage_ids order.
+    """
+
+    def __init__(self, stage_ids, runs, samples, seed_entropy):
+        self.stage_ids = stage_ids
+        self.runs = runs
+        self.samples = samples
+        # Pass back in as seed to get the same results again
+        self.seed_entropy = seed_entropy
+
+    def percentiles(self, percentiles=DROP_SIMULATION_PERCENTILES):
+        """
+        :return: DataFrame indexed by stage ID, with columns like "rare p10": the amount at least 90% of trials got
+        """
+        columns = {}
+        for outcome, samples in self.samples.items():
+            values = np.percentile(samples, percentiles, axis=1)
+            for percentile, value in zip(percentiles, values):
+                columns[f"{outcome} p{percentile}"] = value
+        return pd.DataFrame(columns, index=pd.Index(self.stage_ids, name="id"))
+
+    def summary(self, percentiles=DROP_SIMULATION_PERCENTILES):
+        """
+        :return: DataFrame indexed by stage ID with the mean, standard deviation and percentiles of every outcome
+        """
+        columns = {}
+        for outcome, samples in self.samples.items():
+            columns[f"{outcome} mean"] = samples.mean(axis=1)
+            columns[f"{outcome} std"] = samples.std(axis=1)
+        summary = pd.DataFrame(columns, index=pd.Index(self.stage_ids, name="id"))
+        return summary.join(self.percentiles(percentiles))
+
+    def chance_of_at_least(self, outcome, amount):
+        """
+        :return: Series of the chance of each stage giving at least amount of outcome in .runs runs
+        """
+        return pd.Series((self.samples[outcome] >= amount).mean(axis=1), index=pd.Index(self.stage_ids, name="id"))
+
+
+def simulate_stage_drops(stage_rewards, runs, trials=DROP_SIMULATION_TRIALS, seed=None, stages=None, workers=1,
+                         stages_per_task=DROP_SIMULATION_STAGES_PER_TASK):
+    """
+    Simulate doing a number of runs of every stage in stage_rewards, many times over.
+
+    :param stage_rewards: Output of normalize_stage_rewards
+    :param runs: Runs of the stage per trial
+    :param trials: How many times to simulate those runs
+    :param seed: Any int (or DropSimulation.seed_entropy) to get the same results every time. Random if not given.
+    :param stages: Readable IDs of the stages to simulate. All of them if not given.
+    :param workers: Number of processes to spread the stages over. Results are the same for any number.
+    :param stages_per_task: Stages handed to a worker process at a time
+    :return: DropSimulation
+    """
+    seed_entropy = np.random.SeedSequence(seed).entropy
+    probabilities, prices = drop_probabilities(stage_rewards)
+
+    # Same stage listed twice? Last one wins, like raid_campaign_farming_data.csv
+    readable_ids = pd.Index(stage_rewards["readable_id"])
+    rows = np.flatnonzero(~readable_ids.duplicated(keep="last"))
+    if stages is not None:
+        rows = rows[readable_ids[rows].isin(list(stages))]
+
+    arguments = [stage_rewards["id"][rows].astype(np.int64).tolist(), probabilities[rows], prices[rows],
+                 stage_rewards["silver"][rows], stage_rewards["shard_quantity"][rows]]
+    if workers > 1:
+        blocks = [slice(start, start + stages_per_task) for start in range(0, len(rows), stages_per_task)]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_simulate_stages, seed_entropy, *[argument[block] for argument in arguments],
+                                       runs, trials) for block in blocks]
+            outcomes = np.concatenate([future.result() for future in futures]) if futures else \
+                np.empty((0, trials, len(DROP_SIMULATION_OUTCOMES)))
+    else:
+        outcomes = _simulate_stages(seed_entropy, *arguments, runs, trials)
+
+    samples = {outcome: outcomes[:, :, i] for i, outcome in enumerate(DROP_SIMULATION_OUTCOMES)}
+    return DropSimulation(readable_ids[rows].to_numpy(), runs, samples, seed_entropy)
+
+
+def campaign_drop_simulation(data, runs=100, trials=DROP_SIMULATION_TRIALS, seed=None, workers=1):
+    """
+    Simulate runs of every campaign stage, outputs a CSV with the mean, spread and percentiles of what they drop.
+
+    :param data: static_data['StageData']['Stages']
+    :param runs: Runs of each stage per trial
+    :param trials: How many times to simulate those runs
+    :param seed: See simulate_stage_drops
+    :param workers: See simulate_stage_drops
+    :return: DropSimulation. Writes the summary to "raid_campaign_drop_simulation.csv"
+    """
+    simulation = simulate_stage_drops(normalize_stage_rewards(data), runs, trials, seed, workers=workers)
+    simulation.summary().to_csv("raid_campaign_drop_simulation.csv")
+    return simulation
+
+
+if __name__ == '__main__':
+    from raid_static_data_cache import load_static_data
+
+    static_data = load_static_data(sys.argv[1] if len(sys.argv) > 1 else "static_data.json")
+    campaign_drop_simulation(static_data["StageData"]["Stages"],
+                             runs=int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+                             trials=int(sys.argv[3]) if len(sys.argv) > 3 else DROP_SIMULATION_TRIALS)
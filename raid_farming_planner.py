@@ -0,0 +1,339 @@
+"""
+Plans which campaign stages to farm, and how many times, for a goal:
+
+- Least energy to collect at least so much of some resources, e.g. enough XP to level 10 food champs, or 2 million
+  silver and 20 shards (plan_targets)
+- Most of a weighted mix of resources for an energy budget, e.g. silver plus shards for 5000 energy (plan_budget)
+
+Both are linear programs over the stage x resource matrix from campaign_stage_metrics. Resources are the per run
+columns: xp (per food champ), common, uncommon, rare, silver (including artifact sell value) and shard.
+
+    planner = FarmingPlanner.from_static_data(load_static_data("static_data.json"))
+    planner.plan_targets({"xp": food_xp_needed(10, 40000)})
+    planner.plan_budget(5000, {"silver": 1, "shard": 100000})
+
+Plans are built for serving lots of users at once:
+
+- Stages that can't be part of a best plan (ones another stage beats on every resource involved) are dropped up
+  front, once per set of resources.
+- A least-energy plan uses at most one stage per resource. With a handful of resources there are few enough
+  candidate stage combinations to solve them all as one batch of small linear systems, which plan_targets_many does
+  for a whole array of targets at once. Bigger problems go to scipy's LP solver.
+- A budget plan's best stage is the one with the most value per energy, which plan_budget_many works out for a whole
+  array of weights with one matrix product.
+
+integer=True gives whole runs instead, using scipy's MILP solver (needs scipy).
+
+    python raid_farming_planner.py [static_data.json] [xp=1000000 silver=2000000 ...]
+"""
+import itertools
+import sys
+
+import numpy as np
+
+from raid_static_data_analysis import campaign_stage_metrics, normalize_stage_rewards
+
+# Resource name -> per run column of campaign_stage_metrics
+PLANNER_RESOURCES = {
+    "xp": "xp/run",
+    "common": "com/run",
+    "uncommon": "unc/run",
+    "rare": "rare/run",
+    "silver": "silver/run",
+    "shard": "shard/run",
+}
+
+# Most candidate stage combinations to try in one go before handing a least-energy plan to the LP solver instead
+PLANNER_MAX_BASES = 20000
+
+# Slack for rounding error when checking plans
+PLANNER_TOLERANCE = 1e-9
+
+# When dropping stages other stages beat: how many of the strongest stages to check every stage against first, and
+# how big the stage x stage comparisons are allowed to get at a time
+PLANNER_PRUNE_SAMPLE = 256
+PLANNER_CHUNK_CELLS = 1 << 22
+
+
+def food_xp_needed(champs, xp_per_champ, champs_per_run=1):
+    """
+    :param champs: Number of food champs to level
+    :param xp_per_champ: XP each one needs, e.g. to get from level 1 to max
+    :param champs_per_run: Food champs brought along on every run. Each gets the stage's XP per food champ.
+    :return: Amount of the "xp" resource to plan for
+    """
+    return champs * xp_per_champ / champs_per_run
+
+
+class FarmingPlanner:
+    """
+    Farming plans over a fixed set of campaign stages. Cheap to query once built; cache one per static data version.
+    """
+
+    def __init__(self, stage_metrics, stages=None):
+        """
+        :param stage_metrics: DataFrame from campaign_stage_metrics
+        :param stages: Readable IDs of the stages to plan with (e.g. just the ones a user has unlocked). All of them if
+                       not given.
+        """
+        # Same stage listed twice? Last one wins, like raid_campaign_farming_data.csv
+        stage_metrics = stage_metrics[~stage_metrics.index.duplicated(keep="last")]
+        if stages is not None:
+            stage_metrics = stage_metrics[stage_metrics.index.isin(list(stages))]
+        energy = stage_metrics["energy"].to_numpy(dtype=float)
+        yields = stage_metrics[list(PLANNER_RESOURCES.values())].to_numpy(dtype=float)
+        # Stages without any drops come out as NaN, and free stages can't be planned by the energy
+        usable = energy > 0
+        self.stage_ids = stage_metrics.index.to_numpy()[usable]
+        self.energy = energy[usable]
+        self.yields = np.nan_to_num(yields[usable])
+        self.resources = list(PLANNER_RESOURCES)
+        # Worked out per set of resources on first use. Kept on the planner, so they go when it does.
+        self._efficient_stages_cache = {}
+        self._bases_cache = {}
+
+    @classmethod
+    def from_static_data(cls, data, stages=None):
+        """
+        :param data: static data json object
+        :param stages: See __init__
+        """
+        return cls(campaign_stage_metrics(normalize_stage_rewards(data["StageData"]["Stages"])), stages)
+
+    def _resource_columns(self, resources):
+        try:
+            return [self.resources.index(resource) for resource in resources]
+        except ValueError:
+            raise ValueError(f"Unknown resource in {list(resources)}, expected some of {self.resources}") from None
+
+    def _efficient_stages(self, resources, per_energy=True):
+        """
+        :param resources: Tuple of resource names
+        :param per_energy: Compare stages by yield per energy (for fractional plans), or by yield per run and energy
+                           per run (for whole runs)
+        :return: Indices of the stages no other stage beats, or matches, on every one of the resources
+        """
+        key = (resources, per_energy)
+        if key not in self._efficient_stages_cache:
+            yields = self.yields[:, self._resource_columns(resources)]
+            if per_energy:
+                values = yields / self.energy[:, None]
+            else:
+                values = np.column_stack([yields, -self.energy])
+            # Stages with none of the resources are no use at all
+            candidates = np.flatnonzero(yields.max(axis=1) > 0)
+            self._efficient_stages_cache[key] = candidates[_efficient_rows(values[candidates])]
+        return self._efficient_stages_cache[key]
+
+    def _bases(self, resources):
+        """
+        Every combination of stages (and surplus of a resource, where a target is overshot) that a least-energy plan
+        could be made of, as inverted matrices so a target can be checked against all of them with one product.
+
+        :param resources: Tuple of resource names
+        :return: (stage indices or -1 for surplus, per basis x resource; inverse matrices; energy per basis column;
+                 scale of each resource), or None if there are too many combinations
+        """
+        if resources not in self._bases_cache:
+            self._bases_cache[resources] = self._find_bases(resources)
+        return self._bases_cache[resources]
+
+    def _find_bases(self, resources):
+        stages = self._efficient_stages(resources)
+        count = len(resources)
+        columns = count + len(stages)
+        if _combinations(columns, count) > PLANNER_MAX_BASES:
+            return None
+
+        # Columns are the efficient stages' yields, then a -1 surplus column per resource. Resources are scaled to
+        # about 1, so silver in the thousands and rares in the hundredths are equally far from singular.
+        yields = self.yields[stages][:, self._resource_columns(resources)].T
+        scale = 1 / np.maximum(yields.max(axis=1, initial=0), PLANNER_TOLERANCE)
+        matrix = np.hstack([yields * scale[:, None], -np.eye(count)])
+        costs = np.concatenate([self.energy[stages], np.zeros(count)])
+        stage_of_column = np.concatenate([stages, np.full(count, -1)])
+
+        bases = np.array(list(itertools.combinations(range(columns), count)), dtype=np.intp).reshape(-1, count)
+        basis_matrices = np.transpose(matrix[:, bases], (1, 0, 2))
+        invertible = np.abs(np.linalg.det(basis_matrices)) > PLANNER_TOLERANCE
+        bases = bases[invertible]
+        inverses = np.linalg.inv(basis_matrices[invertible])
+        return stage_of_column[bases], inverses, costs[bases], scale
+
+    def _plan(self, runs, energy=None):
+        stages = np.flatnonzero(runs > PLANNER_TOLERANCE)
+        return {
+            "energy": float(self.energy @ runs) if energy is None else float(energy),
+            "runs": {str(self.stage_ids[stage]): float(runs[stage]) for stage in stages},
+            "totals": dict(zip(self.resources, (runs @ self.yields).tolist())),
+        }
+
+    def plan_targets_many(self, resources, targets):
+        """
+        Least-energy fractional plans for lots of targets on the same resources at once.
+
+        :param resources: Resource names the targets are for
+        :param targets: Array of targets x resources, in the same order
+        :return: (runs, energy): array of targets x stages (in .stage_ids order) of how many times to run each, and
+                 the energy each plan takes. Plans that can't be met are all NaN.
+        :raises ValueError: If there are too many stages and resources to solve this way
+        """
+        resources = tuple(resources)
+        targets = np.atleast_2d(np.asarray(targets, dtype=float))
+        bases = self._bases(resources)
+        if bases is None:
+            raise ValueError(f"Too many stage combinations for {len(resources)} resources, use plan_targets")
+        stage_of_column, inverses, costs, scale = bases
+
+        # Runs (or surplus) of each basis column for each basis and target: bases x targets x resources
+        values = np.einsum("bij,tj->bti", inverses, targets * scale)
+        feasible = (values >= -PLANNER_TOLERANCE).all(axis=2)
+        energy = np.where(feasible, np.einsum("bti,bi->bt", values, costs), np.inf)
+        best = energy.argmin(axis=0)
+        target_indices = np.arange(len(targets))
+
+        runs = np.zeros((len(targets), len(self.stage_ids)))
+        best_values = values[best, target_indices]
+        best_stages = stage_of_column[best]
+        is_stage = best_stages >= 0
+        np.add.at(runs, (np.broadcast_to(target_indices[:, None], best_stages.shape)[is_stage],
+                         best_stages[is_stage]), np.maximum(best_values[is_stage], 0))
+
+        best_energy = energy[best, target_indices]
+        met = np.isfinite(best_energy)
+        runs[~met] = np.nan
+        return runs, np.where(met, best_energy, np.nan)
+
+    def plan_targets(self, targets, integer=False):
+        """
+        Least energy plan that gets at least the given amount of every resource.
+
+        :param targets: dict of resource name -> amount, e.g. {"silver": 2000000, "shard": 20}
+        :param integer: Whole runs only (needs scipy)
+        :return: dict with "energy" (total energy), "runs" (stage ID -> times to run it, only stages that are used)
+                 and "totals" (resource -> expected amount collected)
+        :raises ValueError: If no mix of stages gives all the resources asked for
+        """
+        resources = tuple(targets)
+        amounts = np.array([targets[resource] for resource in resources], dtype=float)
+        if integer:
+            return self._solve_targets(resources, amounts, integer=True)
+        if self._bases(resources) is None:
+            return self._solve_targets(resources, amounts)
+        runs, energy = self.plan_targets_many(resources, amounts[None, :])
+        if np.isnan(energy[0]):
+            raise ValueError(f"No mix of stages gives {targets}")
+        return self._plan(runs[0], energy[0])
+
+    def _solve_targets(self, resources, amounts, integer=False):
+        from scipy.optimize import Bounds, LinearConstraint, milp
+
+        stages = self._efficient_stages(resources, per_energy=not integer)
+        yields = self.yields[stages][:, self._resource_columns(resources)]
+        result = milp(self.energy[stages], constraints=LinearConstraint(yields.T, lb=amounts),
+                      integrality=np.full(len(stages), int(integer)), bounds=Bounds(0, np.inf))
+        if not result.success:
+            raise ValueError(f"No mix of stages gives {dict(zip(resources, amounts))}: {result.message}")
+        runs = np.zeros(len(self.stage_ids))
+        runs[stages] = np.round(result.x) if integer else result.x
+        return self._plan(runs)
+
+    def _weight_vectors(self, weights):
+        weights = np.atleast_2d(weights)
+        if weights.shape[1] != len(self.resources):
+            raise ValueError(f"Weights need a column for each of {self.resources}")
+        return weights
+
+    def plan_budget_many(self, energy, weights):
+        """
+        Best fractional plans for an energy budget, for lots of weightings at once.
+
+        :param energy: Energy to spend
+        :param weights: Array of weightings x resources (in .resources order) of what each resource is worth
+        :return: (stage indices, runs, value): best stage for each weighting (index into .stage_ids), how many times
+                 it can be run, and the total weighted value
+        """
+        weights = self._weight_vectors(np.asarray(weights, dtype=float))
+        value_per_energy = weights @ (self.yields / self.energy[:, None]).T
+        best = value_per_energy.argmax(axis=1)
+        return best, energy / self.energy[best], energy * value_per_energy[np.arange(len(weights)), best]
+
+    def plan_budget(self, energy, weights, integer=False):
+        """
+        Plan that gets the most out of an energy budget.
+
+        :param energy: Energy to spend
+        :param weights: dict of resource name -> what one of it is worth, e.g. {"silver": 1, "shard": 100000}.
+                        Resources not given are worth nothing.
+        :param integer: Whole runs only, spending at most the budget (needs scipy)
+        :return: Same as plan_targets, plus "value" (total weighted value)
+        """
+        weight_vector = np.zeros(len(self.resources))
+        weight_vector[self._resource_columns(weights)] = list(weights.values())
+        if integer:
+            from scipy.optimize import Bounds, LinearConstraint, milp
+
+            stages = self._efficient_stages(tuple(weights), per_energy=False)
+            values = self.yields[stages] @ weight_vector
+            result = milp(-values, constraints=LinearConstraint(self.energy[stages][None, :], ub=energy),
+                          integrality=np.ones(len(stages)), bounds=Bounds(0, np.inf))
+            if not result.success:
+                raise ValueError(f"Can't plan for {energy} energy: {result.message}")
+            runs = np.zeros(len(self.stage_ids))
+            runs[stages] = np.round(result.x)
+        else:
+            (best,), (best_runs,), _ = self.plan_budget_many(energy, weight_vector[None, :])
+            runs = np.zeros(len(self.stage_ids))
+            runs[best] = best_runs
+        plan = self._plan(runs)
+        plan["value"] = float(runs @ self.yields @ weight_vector)
+        return plan
+
+
+def _dominated(values, by):
+    """
+    :return: Whether each row of values is dominated by some row of by: at least as big in every column, and bigger
+             in at least one
+    """
+    dominated = np.zeros(len(values), dtype=bool)
+    step = max(1, PLANNER_CHUNK_CELLS // max(len(by) * values.shape[1], 1))
+    for start in range(0, len(values), step):
+        chunk = values[start:start + step, None, :]
+        dominated[start:start + step] = ((by[None, :, :] >= chunk).all(axis=2) &
+                                         (by[None, :, :] > chunk).any(axis=2)).any(axis=1)
+    return dominated
+
+
+def _efficient_rows(values):
+    """
+    :return: Indices of the rows of values no other row dominates. Of identical rows, only the first is kept.
+    """
+    _, rows = np.unique(values, axis=0, return_index=True)
+    rows = np.sort(rows)
+    values = values[rows]
+    # Most rows lose to one of the strongest few, which is much cheaper to check than every pair
+    strength = np.argsort(np.argsort(values, axis=0), axis=0).sum(axis=1)
+    keep = ~_dominated(values, values[np.argsort(-strength)[:PLANNER_PRUNE_SAMPLE]])
+    rows, values = rows[keep], values[keep]
+    return rows[~_dominated(values, values)]
+
+
+def _combinations(n, k):
+    # Number of ways to pick k of n, without making them all
+    result = 1
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+
+if __name__ == '__main__':
+    from raid_static_data_cache import load_static_data
+
+    static_data = load_static_data(sys.argv[1] if len(sys.argv) > 1 else "static_data.json")
+    planner = FarmingPlanner.from_static_data(static_data)
+    goal = {resource: float(amount) for resource, amount in (arg.split("=") for arg in sys.argv[2:])} or \
+        {"xp": 1000000}
+    plan = planner.plan_targets(goal)
+    print(f"{plan['energy']:.0f} energy for {goal}")
+    for stage_id, runs in sorted(plan["runs"].items(), key=lambda item: -item[1]):
+        print(f"{stage_id}: {runs:.1f} runs")
@@ -0,0 +1,141 @@
+"""
+Timers and counters for seeing where the time in a run goes.
+
+The analysis code times its phases (loading, campaign, champ rows, formula evaluation, table writes...) and counts
+things (heroes processed, effects, formula cache hits and misses, formulas that couldn't be worked out...) in
+RUN_STATS. Phases can nest, and a phase's time includes the phases inside it. Time spent in worker processes is
+added up, so with several workers a phase can take longer than the run.
+
+    with RUN_STATS.phase("campaign"):
+        ...
+    RUN_STATS.count("effects")
+    RUN_STATS.write_report("raid_run_report.json")
+
+profiled() runs a block under cProfile and adds the functions that took longest to the report.
+"""
+import collections
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+
+# Functions listed in the report when profiling
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class RunStats:
+    """
+    Phase timings and counters of one run.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        # Phase name -> [seconds, calls]
+        self.phases = {}
+        self.counters = collections.Counter()
+        self.profile = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Time a block of code as the given phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        phase = self.phases.get(name)
+        if phase is None:
+            self.phases[name] = [seconds, calls]
+        else:
+            phase[0] += seconds
+            phase[1] += calls
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def snapshot(self):
+        """
+        :return: Phases and counters as plain data, e.g. to send back from a worker process to merge()
+        """
+        return {"phases": {name: list(phase) for name, phase in self.phases.items()},
+                "counters": dict(self.counters)}
+
+    def merge(self, snapshot):
+        for name, (seconds, calls) in snapshot["phases"].items():
+            self.add_time(name, seconds, calls)
+        self.counters.update(snapshot["counters"])
+
+    def report(self):
+        """
+        :return: JSON-compatible dict of everything measured so far
+        """
+        report = {
+            "started": self.started,
+            "seconds": time.time() - self.started,
+            "argv": sys.argv,
+            "python": platform.python_version(),
+            "pid": os.getpid(),
+            "phases": {name: {"seconds": round(seconds, 6), "calls": calls}
+                       for name, (seconds, calls) in sorted(self.phases.items(), key=lambda item: -item[1][0])},
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if self.profile is not None:
+            report["profile"] = self.profile
+        return report
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            f.write(json.dumps(self.report(), indent=2))
+
+
+# Stats of the current run, in this process
+RUN_STATS = RunStats()
+
+
+def timed(name):
+    """
+    Decorator that times every call of a function as the given phase of RUN_STATS
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with RUN_STATS.phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def profiled(path=None, top=PROFILE_TOP_FUNCTIONS):
+    """
+    Run a block under cProfile. The functions with the most time spent in them (their own time, not counting what they
+    call) go into RUN_STATS's report.
+
+    :param path: Optional file to save the full profile to, for snakeviz, pstats etc.
+    :param top: How many functions to put in the report
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        stats = pstats.Stats(profiler).stats
+        functions = sorted(stats.items(), key=lambda item: -item[1][2])[:top]
+        RUN_STATS.profile = [{"function": f"{filename}:{line}({function})", "calls": calls,
+                              "own_seconds": round(own_time, 6), "total_seconds": round(total_time, 6)}
+                             for (filename, line, function), (_, calls, own_time, total_time, _) in functions]
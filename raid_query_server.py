@@ -0,0 +1,346 @@
+"""
+Local HTTP/JSON server for looking up champs, skills, effects and campaign stages, so the static data only has to be
+loaded and indexed once instead of on every run.
+
+    python raid_query_server.py [static_data.json] [--host 127.0.0.1] [--port 8000]
+
+All requests are GETs and all responses are JSON:
+
+    /heroes?faction=Dwarves&status=Increase%20SPD     champs matching the filters (see StaticDataIndex.find_heroes)
+    /heroes/<id>                                      one champ
+    /skills?status=Decrease%20DEF&max_cooldown=4      skills matching the filters (see StaticDataIndex.find_skills)
+    /skills/<id>                                      one skill
+    /effects?kind=Extra%20turn                        effects matching the filters (see StaticDataIndex.find_effects)
+    /effects/<id>                                     one effect
+    /stages?sort=silver/e&limit=10                    campaign stages, best first by the given column
+    /stages/12-7-Br                                   expected returns of one campaign stage
+    /status                                           what's loaded and when
+
+Filters can be repeated to accept any of several values, and numbers are taken as codes. List results are sorted by
+ID and can be paged with limit and offset.
+
+The server keeps an eye on static_data.json and loads a new version in the background when it changes. Requests keep
+being answered from the old data while that happens, and the new data replaces it in one step once it's ready, so no
+request ever sees a mix of both.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from raid_static_data_analysis import campaign_stage_metrics, normalize_stage_rewards
+from raid_static_data_cache import load_static_data
+from raid_static_data_index import HERO_FILTERS, StaticDataIndex
+
+# Seconds between checks of static_data.json for changes
+RELOAD_POLL_INTERVAL = 2.0
+
+# Query parameters that take numbers, the ones that take yes/no, and the ones every list endpoint takes
+NUMERIC_QUERY_PARAMETERS = {"min_cooldown", "max_cooldown", "limit", "offset"}
+BOOLEAN_QUERY_PARAMETERS = {"booked"}
+PAGING_QUERY_PARAMETERS = {"limit", "offset"}
+
+QUERY_PARAMETERS = {
+    "heroes": set(HERO_FILTERS) | {"status", "kind", "target", "min_cooldown", "max_cooldown", "booked"},
+    "skills": {"status", "kind", "target", "min_cooldown", "max_cooldown", "booked"},
+    "effects": {"status", "kind", "target"},
+}
+
+
+class QueryError(ValueError):
+    """
+    Bad request, with the HTTP status to answer it with
+    """
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+def _missing_last(value):
+    # Sort key for values best (highest) first, with None after all of them
+    return (True, 0) if value is None else (False, -value)
+
+
+def _json_value(value):
+    # NaN and infinity aren't valid JSON
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class StaticDataState:
+    """
+    Everything the server answers from, worked out from one version of the static data. Never changed after it's
+    built, so requests can use it without locking while a newer one is being built.
+    """
+
+    def __init__(self, json_path):
+        """
+        :param json_path: Path to static data json
+        """
+        stat = os.stat(json_path)
+        self.json_path = json_path
+        self.source = (stat.st_size, stat.st_mtime_ns)
+
+        started = time.perf_counter()
+        data = load_static_data(json_path)
+        self.index = StaticDataIndex(data)
+
+        stage_rewards = normalize_stage_rewards(data["StageData"]["Stages"])
+        metrics = campaign_stage_metrics(stage_rewards)
+        # Plain dicts of plain floats, so answering is just a lookup and json.dumps
+        self.stages = {}
+        self.stage_columns = [column for column in metrics.columns if column != "id"]
+        for row, values in enumerate(metrics[self.stage_columns].itertuples(index=False)):
+            stage_id = str(stage_rewards["readable_id"][row])
+            stage = {"id": stage_id, "internal_id": int(stage_rewards["id"][row]),
+                     "zone": str(stage_rewards["zone"][row]), "difficulty": str(stage_rewards["difficulty"][row]),
+                     "substage": str(stage_rewards["substage"][row])}
+            stage.update(zip(self.stage_columns, [_json_value(float(value)) for value in values]))
+            # Same stage listed twice? Last one wins, like raid_campaign_farming_data.csv
+            self.stages[stage_id] = stage
+        self.stage_ids = sorted(self.stages)
+
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+
+    def status(self):
+        return {"static_data": os.path.abspath(self.json_path), "size": self.source[0],
+                "modified": self.source[1] / 1e9, "loaded_at": self.loaded_at,
+                "load_seconds": round(self.load_seconds, 3), "heroes": len(self.index.heroes),
+                "skills": len(self.index.skills), "effects": len(self.index.effects), "stages": len(self.stages)}
+
+
+def _parse_query(query, allowed):
+    """
+    :param query: Query string
+    :param allowed: Names of the parameters the endpoint takes, besides limit and offset
+    :return: dict of parameter -> value. Parameters given more than once become lists.
+    """
+    parameters = {}
+    for name, values in parse_qs(query, keep_blank_values=True).items():
+        if name not in allowed and name not in PAGING_QUERY_PARAMETERS:
+            raise QueryError(f"Unknown parameter {name!r}, "
+                             f"expected one of {sorted(allowed | PAGING_QUERY_PARAMETERS)}")
+        parsed = []
+        for value in values:
+            if name in BOOLEAN_QUERY_PARAMETERS:
+                parsed.append(value.lower() not in ("0", "false", "no"))
+            elif value.lstrip("-").isdigit():
+                parsed.append(int(value))
+            elif name in NUMERIC_QUERY_PARAMETERS:
+                raise QueryError(f"{name} has to be a whole number, not {value!r}")
+            else:
+                parsed.append(value)
+        if len(parsed) > 1 and name in NUMERIC_QUERY_PARAMETERS | BOOLEAN_QUERY_PARAMETERS:
+            raise QueryError(f"{name} can only be given once")
+        parameters[name] = parsed[0] if len(parsed) == 1 else parsed
+    return parameters
+
+
+def _page(items, parameters):
+    offset = parameters.pop("offset", 0)
+    limit = parameters.pop("limit", None)
+    if offset < 0 or (limit is not None and limit < 0):
+        raise QueryError("limit and offset can't be negative")
+    return {"count": len(items), "offset": offset,
+            "results": items[offset:] if limit is None else items[offset:offset + limit]}
+
+
+def _id(text):
+    try:
+        return int(text)
+    except ValueError:
+        raise QueryError(f"Not an ID: {text!r}") from None
+
+
+def _get(items, item_id, kind):
+    try:
+        return items[item_id]
+    except KeyError:
+        raise QueryError(f"No {kind} with ID {item_id!r}", HTTPStatus.NOT_FOUND) from None
+
+
+def answer_query(state, path, query=""):
+    """
+    Work out the response to one request.
+
+    :param state: StaticDataState to answer from
+    :param path: URL path, e.g. "/stages/12-7-Br"
+    :param query: URL query string, e.g. "faction=Dwarves&limit=10"
+    :return: Response as a JSON-compatible object
+    :raises QueryError: For unknown paths and bad parameters
+    """
+    parts = [unquote(part) for part in path.strip("/").split("/")]
+    endpoint, rest = parts[0], parts[1:]
+    index = state.index
+
+    if endpoint == "status" and not rest:
+        return state.status()
+
+    if endpoint in QUERY_PARAMETERS and len(rest) == 1:
+        item_id = _id(rest[0])
+        if endpoint == "heroes":
+            if item_id not in index.heroes:
+                raise QueryError(f"No champ with ID {item_id!r}", HTTPStatus.NOT_FOUND)
+            return index.describe_hero(item_id)
+        return _get(index.skills if endpoint == "skills" else index.effects, item_id, endpoint[:-1])
+
+    if endpoint in QUERY_PARAMETERS and not rest:
+        parameters = _parse_query(query, QUERY_PARAMETERS[endpoint])
+        filters = {name: value for name, value in parameters.items() if name not in PAGING_QUERY_PARAMETERS}
+        if endpoint == "heroes":
+            page = _page(sorted(index.find_heroes(**filters)), parameters)
+            page["results"] = [index.describe_hero(champ_id) for champ_id in page["results"]]
+        elif endpoint == "skills":
+            page = _page(sorted(index.find_skills(**filters)), parameters)
+            page["results"] = [index.skills[skill_id] for skill_id in page["results"]]
+        else:
+            page = _page(sorted(index.find_effects(**filters)), parameters)
+            page["results"] = [index.effects[effect_id] for effect_id in page["results"]]
+        return page
+
+    if endpoint == "stages" and len(rest) == 1:
+        return _get(state.stages, rest[0], "campaign stage")
+
+    if endpoint == "stages" and not rest:
+        parameters = _parse_query(query, {"sort"})
+        stage_ids = state.stage_ids
+        sort = parameters.pop("sort", None)
+        if sort is not None:
+            if sort not in state.stage_columns:
+                raise QueryError(f"Can't sort stages by {sort!r}, expected one of {state.stage_columns}")
+            # Best first. Stages without a value go last, zeros are still values.
+            stage_ids = sorted(stage_ids, key=lambda stage_id: _missing_last(state.stages[stage_id][sort]))
+        page = _page(stage_ids, parameters)
+        page["results"] = [state.stages[stage_id] for stage_id in page["results"]]
+        return page
+
+    raise QueryError(f"Unknown path {path!r}", HTTPStatus.NOT_FOUND)
+
+
+class StaticDataRequestHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests, and don't let the headers and body wait on each other's ACKs
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        # Look the state up once, so a reload part way through the request doesn't matter
+        state = self.server.state
+        url = urlsplit(self.path)
+        try:
+            status, body = HTTPStatus.OK, answer_query(state, url.path, url.query)
+        except QueryError as e:
+            status, body = e.status, {"error": str(e)}
+        except (TypeError, ValueError) as e:
+            status, body = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StaticDataServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering from a StaticDataState, which is swapped for a new one when the static data json
+    changes.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, json_path="static_data.json", poll_interval=RELOAD_POLL_INTERVAL, verbose=False):
+        """
+        :param address: (host, port) to listen on
+        :param json_path: Path to static data json
+        :param poll_interval: Seconds between checks for changes to the json, or None to never reload
+        :param verbose: Log every request
+        """
+        self.json_path = json_path
+        self.verbose = verbose
+        self.state = StaticDataState(json_path)
+        super().__init__(address, StaticDataRequestHandler)
+
+        self._stop_watching = threading.Event()
+        # Version of the json that last failed to load, so it isn't tried again until it changes
+        self._failed_source = None
+        if poll_interval:
+            threading.Thread(target=self._watch, args=(poll_interval,), daemon=True).start()
+
+    def _watch(self, poll_interval):
+        seen = None
+        while not self._stop_watching.wait(poll_interval):
+            try:
+                stat = os.stat(self.json_path)
+            except OSError:
+                continue
+            source = (stat.st_size, stat.st_mtime_ns)
+            if source in (self.state.source, self._failed_source):
+                seen = None
+            elif source != seen:
+                # Changed since the last check. Wait for it to stay the same for a check, in case it's still being
+                # written.
+                seen = source
+            else:
+                self.reload()
+                seen = None
+
+    def reload(self):
+        """
+        Load the static data json again and start answering from it. Keeps the current data if that fails.
+
+        :return: True if the new data was loaded
+        """
+        try:
+            stat = os.stat(self.json_path)
+            self._failed_source = (stat.st_size, stat.st_mtime_ns)
+            state = StaticDataState(self.json_path)
+        except Exception as e:
+            print(f"Couldn't reload {self.json_path}, still using the version from "
+                  f"{time.ctime(self.state.loaded_at)}: {e!r}", file=sys.stderr)
+            return False
+        # A single assignment, so every request either gets the old state or the new one
+        self.state = state
+        self._failed_source = None
+        print(f"Reloaded {self.json_path} in {state.load_seconds:.1f}s", file=sys.stderr)
+        return True
+
+    def server_close(self):
+        self._stop_watching.set()
+        super().server_close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("static_data", nargs="?", default="static_data.json", help="Static data json")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    arg_parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    arg_parser.add_argument("--poll-interval", type=float, default=RELOAD_POLL_INTERVAL,
+                            help="Seconds between checks for a new static data json (0 to never reload)")
+    arg_parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = arg_parser.parse_args(argv)
+
+    server = StaticDataServer((args.host, args.port), args.static_data, args.poll_interval, args.verbose)
+    print(f"Serving {args.static_data} on http://{args.host}:{server.server_address[1]}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,21 @@
-import parser
+import collections
+import concurrent.futures
+import functools
+import itertools
 import json
+import logging
+import math
+import numbers
 import numpy as np
+import os
 import pandas as pd
 import re
+import sqlite3
+
+from raid_instrumentation import RUN_STATS, timed
+
+# Per stage details, formulas that couldn't be worked out etc. are logged at DEBUG level, problems at WARNING
+logger = logging.getLogger("raid_static_data_analysis")
 
 DIFFICULTY_CODES = {
     "1": "Normal",
@@ -94,6 +107,55 @@ ITEM_RANK_SELL_VALUE_MULTIPLIERS = [
     0.05
 ]
 
+# Names of the artifact sets, in the order of ARTIFACT_SET_BASE_PRICES (the game's 1-based set IDs, minus 1)
+ARTIFACT_SET_NAMES = [
+    "Life",
+    "Offense",
+    "Defense",
+    "Speed",
+    "Critical Rate",
+    "Crit Damage",
+    "Accuracy",
+    "Resistance",
+    "Lifesteal",
+    "Fury",
+    "Daze",
+    "Cursed",
+    "Frost",
+    "Frenzy",
+    "Regeneration",
+    "Immunity",
+    "Shield",
+    "Relentless",
+    "Savage",
+    "Destroy",
+    "Stun",
+    "Toxic",
+    "Taunting",
+    "Retaliation",
+    "Avenging",
+    "Stalwart",
+    "Reflex",
+    "Curing",
+    "Cruel",
+    "Immortal",
+    "Divine Offense",
+    "Divine Critical Rate",
+    "Divine Life",
+    "Divine Speed",
+    "Swift Parry",
+    "Deflection",
+    "Resilience",
+    "Perception",
+    "Fatal",
+    "Untouchable",
+    "Affinitybreaker",
+    "Frostbite"
+]
+
+# Names of the artifact kinds, in the order of ITEM_TYPE_VALUE_MULTIPLIERS (the game's 1-based kind IDs, minus 1)
+ARTIFACT_KIND_NAMES = ["Helmet", "Chest", "Gloves", "Boots", "Weapon", "Shield", "Ring", "Amulet", "Banner"]
+
 FACTIONS = [
     'N/A',
     'Bannerlords',
@@ -357,143 +419,1454 @@ EFFECT_TYPES = {
     # Ex. Belanor A4: "Activates this Champion's Swordleader skill. Also activates Zavia's Poison Rain Skill when Zavia is on the same team." (Id: 349053)
 }
 
+# What codes the game data has that aren't in the tables above decode to
+UNKNOWN_CODE_NAME = "UNKNOWN"
 
-def campaign_drop_info(data):
+
+class CodeDecoder:
     """
-    Analyzes drop rates for rewards of all campaign stages, outputs a CSV with information on expected returns per
-    run and per point of energy spent.
+    Turns the game's codes into readable names, one at a time or a whole array of them at once.
 
-    :param data: static_data['StageData']['Stages']
-    :return: Nothing. Writes result to "raid_campaign_farming_data.csv"
+    Backed by an array with a slot for every code from 0 up to the highest known one, so decoding a column of codes is
+    a single np.take. Codes that aren't known (new in a patch, or just out of range) decode to the unknown sentinel
+    instead of raising, and are counted in unknown_counts, so one new code doesn't stop a long export halfway.
     """
 
-    # Set up output DataFrame
-    result_df = pd.DataFrame(columns=["id", "xp/e", "com/e", "unc/e", "rare/e", "silver/e", "shard/e", "e return/e",
-                                      "real xp/e"])
+    def __init__(self, name, names, first_code=0, unknown=UNKNOWN_CODE_NAME, count_unknown=True):
+        """
+        :param name: What the codes are, for reports
+        :param names: List of names in code order, or dict of code -> name
+        :param first_code: Code of the first name, if names is a list
+        :param unknown: What unknown codes decode to
+        :param count_unknown: Whether to count unknown codes. False for lookups that only name a few of the codes on
+                              purpose, where the rest aren't news.
+        """
+        if not isinstance(names, dict):
+            names = dict(enumerate(names, first_code))
+        self.name = name
+        self.names = names
+        self.unknown = unknown
+        self.count_unknown = count_unknown
+        # Code -> number of times it's been decoded without being known
+        self.unknown_counts = collections.Counter()
+
+        # One slot per code, plus one at the end that out of range codes get pointed at
+        self._size = max(names, default=-1) + 1
+        self._table = np.full(self._size + 1, unknown, dtype=object)
+        self._known = np.zeros(self._size + 1, dtype=bool)
+        for code, code_name in names.items():
+            self._table[code] = code_name
+            self._known[code] = True
+        # Plain list copies are quicker for one code at a time
+        self._table_list = self._table.tolist()
+        self._known_list = self._known.tolist()
+
+    def decode(self, code):
+        """
+        :param code: One code
+        :return: Its name, or the unknown sentinel
+        """
+        try:
+            if code >= 0 and self._known_list[code]:
+                return self._table_list[code]
+        except (IndexError, TypeError):
+            pass
+        if self.count_unknown:
+            self.unknown_counts[code] += 1
+        return self.unknown
+
+    def decode_array(self, codes):
+        """
+        :param codes: Array-like of codes
+        :return: Object array of their names, with the unknown sentinel for unknown codes
+        """
+        codes = np.asarray(codes)
+        with np.errstate(invalid="ignore"):
+            in_range = (codes >= 0) & (codes < self._size)
+        slots = np.where(in_range, codes, self._size).astype(np.intp)
+        unknown = ~self._known[slots]
+        if self.count_unknown and unknown.any():
+            new_codes, counts = np.unique(codes[unknown], return_counts=True)
+            self.unknown_counts.update(dict(zip(new_codes.tolist(), counts.tolist())))
+        return np.take(self._table, slots)
+
+    def __contains__(self, code):
+        return code in self.names
+
+
+# Decoders for every kind of code in the champ tables
+CODE_DECODERS = {
+    "faction": CodeDecoder("faction", FACTIONS),
+    "affinity": CodeDecoder("affinity", AFFINITIES),
+    "rarity": CodeDecoder("rarity", CHAMP_RARITIES),
+    "role": CodeDecoder("role", CHAMP_TYPES),
+    # Aura stat IDs start at 1
+    "aura_stat": CodeDecoder("aura_stat", STAT_TYPES, first_code=1),
+    "aura_area": CodeDecoder("aura_area", AURA_AREAS),
+    # Unnamed buffs/debuffs have always been left blank
+    "status": CodeDecoder("status", STATUS_TYPES, unknown=None),
+    "kind": CodeDecoder("kind", EFFECT_TYPES),
+    "target": CodeDecoder("target", EFFECT_TARGET_TYPES),
+}
+
+
+def unknown_codes():
+    """
+    :return: dict of decoder name -> {code: times seen} for every unknown code decoded since the last reset
+    """
+    return {name: dict(decoder.unknown_counts) for name, decoder in CODE_DECODERS.items() if decoder.unknown_counts}
+
+
+def reset_unknown_codes():
+    for decoder in CODE_DECODERS.values():
+        decoder.unknown_counts.clear()
+
+
+def add_unknown_codes(counts):
+    """
+    :param counts: Output of unknown_codes, e.g. from a worker process
+    """
+    for name, code_counts in counts.items():
+        CODE_DECODERS[name].unknown_counts.update(code_counts)
+
+
+def log_unknown_codes():
+    for name, code_counts in unknown_codes().items():
+        found = ", ".join(f"{code} ({count}x)" for code, count in sorted(code_counts.items(), key=str))
+        logger.warning(f"Unknown {name} codes: {found}")
+
+
+class RowAccumulator:
+    """
+    Collects table rows column by column and builds the DataFrame in one go at the end.
+
+    DataFrame.append copies the whole frame every time it's called (and is gone entirely as of pandas 2.0), so building
+    a frame one row at a time gets quadratically slower as the static data grows. Appending to a few lists doesn't.
+    """
+
+    def __init__(self, columns, dtypes=None):
+        """
+        :param columns: Column names, in output order
+        :param dtypes: Optional dict of column name -> dtype. Columns not listed stay as plain Python objects, which
+                       keeps values written to CSV exactly as they were produced (no int -> float surprises).
+        """
+        self.columns = list(columns)
+        self.dtypes = dtypes or {}
+        self._data = {column: [] for column in self.columns}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, row):
+        """
+        Add a row. Columns missing from the row are left blank. Columns not seen before are tacked on the end and
+        back-filled with blanks, same as DataFrame.append used to do.
+
+        :param row: dict of column name -> value
+        """
+        for column in row:
+            if column not in self._data:
+                self.columns.append(column)
+                self._data[column] = [None] * self._length
+
+        for column, values in self._data.items():
+            values.append(row.get(column))
+
+        self._length += 1
+
+    def columns_data(self):
+        """
+        :return: (columns, dict of column name -> list of values). Cheap to pickle, for handing rows between
+                 processes. See extend_columns.
+        """
+        return self.columns, self._data
+
+    def extend_columns(self, columns_data):
+        """
+        Append every row from another accumulator's columns_data() output.
+        """
+        columns, data = columns_data
+        length = len(data[columns[0]]) if columns else 0
+        for column in columns:
+            if column not in self._data:
+                self.columns.append(column)
+                self._data[column] = [None] * self._length
+        for column, values in self._data.items():
+            values.extend(data[column] if column in data else [None] * length)
+        self._length += length
+
+    def to_dataframe(self):
+        """
+        :return: DataFrame holding every row appended so far
+        """
+        df = pd.DataFrame(self._data, columns=self.columns, dtype=object)
+        if self.dtypes:
+            df = df.astype(self.dtypes)
+        return df
+
+
+# Rows held in memory per table before they're written out by a TableWriter
+TABLE_WRITER_CHUNK_ROWS = 10000
+
+# How the champ table columns are typed when written to Parquet or SQLite. Columns not listed are text.
+# "Dictionary" columns only have a handful of distinct values, so they're stored once each and referenced by index.
+# Blank ("") numbers, like the aura amount of a champ with no aura, become nulls.
+PARQUET_COLUMN_TYPES = {
+    "id": "int", "hp": "int", "atk": "int", "def": "int", "spd": "int", "cr_rate": "int", "cr_dmg": "int",
+    "res": "int", "acc": "int", "champ_status": "int", "skill_cd_booked": "int", "skill_cd_unbooked": "int",
+    "num_hits": "int", "status_duration": "int", "cd_minus_duration": "int", "target_type_code": "int",
+    "effect_type_code": "int", "effect_id": "int", "skill_id": "int",
+    "aura_amt": "float", "book_dmg_mul": "float", "book_heal_mul": "float", "book_shield_mul": "float",
+    "calculated_damage": "float", "damage_per_turn": "float", "effect_chance_booked": "float",
+    "effect_chance_unbooked": "float",
+    "rarity": "dictionary", "affinity": "dictionary", "role": "dictionary", "faction": "dictionary",
+    "skill_index": "dictionary", "status_type": "dictionary", "target_type": "dictionary",
+    "effect_type_desc": "dictionary", "aura_stat": "dictionary", "aura_area": "dictionary",
+    "aura_affinity": "dictionary", "released": "dictionary",
+}
+
+
+# What blanks (None and NaN, which drop_duplicates counts as the same) and numbers are tagged as by _row_hashes. Text
+# is tagged with its hash, anything else with the hash of its str() under another key.
+_BLANK_TAG = 0
+_NUMBER_TAG = 1
+_OTHER_HASH_KEY = "raid_other_kind_"
+
+
+def _row_hashes(df):
+    """
+    :return: 64-bit hash of each row of df, the same for rows drop_duplicates counts as duplicates and (barring hash
+             collisions, and whole numbers past 2**53) different otherwise. Depends only on the row, not on what other
+             rows are in df.
+    """
+    # hash_pandas_object hashes object columns as text, so 1 and "1" hash the same and 1 and 1.0 don't, the other way
+    # round from drop_duplicates. Each object column is hashed as a tag saying what each value is (the hash of its
+    # text, for text) and numbers as floats, so 1, 1.0 and True are the same.
+    parts = {}
+    for position, column in enumerate(df.columns):
+        values = df[column]
+        if values.dtype != object:
+            parts[position] = values.to_numpy()
+            continue
+        number_values = np.zeros(len(values))
+        tags = np.full(len(values), _BLANK_TAG, dtype=np.uint64)
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred in ("string", "empty"):
+            filled = values.notna().to_numpy()
+            tags[filled] = pd.util.hash_array(values.to_numpy()[filled])
+        elif inferred in ("integer", "floating", "mixed-integer-float", "boolean"):
+            filled = values.notna().to_numpy()
+            tags[filled] = _NUMBER_TAG
+            number_values[filled] = values.to_numpy()[filled].astype(float) + 0.0
+        else:
+            # A bit of everything, e.g. aura_amt ("" without an aura). Rare enough to go value by value.
+            text_rows, texts, other_rows, others = [], [], [], []
+            for row, value in enumerate(values.tolist()):
+                value_type = type(value)
+                if value_type is str:
+                    text_rows.append(row)
+                    texts.append(value)
+                elif value_type is float or value_type is int or isinstance(value, numbers.Number):
+                    if value == value:
+                        tags[row] = _NUMBER_TAG
+                        number_values[row] = float(value) + 0.0
+                elif value is not None:
+                    other_rows.append(row)
+                    others.append(str(value))
+            if texts:
+                tags[text_rows] = pd.util.hash_array(np.array(texts, dtype=object))
+            if others:
+                tags[other_rows] = pd.util.hash_array(np.array(others, dtype=object), hash_key=_OTHER_HASH_KEY)
+        parts[f"{position} number"] = number_values
+        parts[f"{position} tag"] = tags
+    return pd.util.hash_pandas_object(pd.DataFrame(parts, index=df.index), index=False)
+
+
+class TableWriter:
+    """
+    Writes table rows to disk a chunk at a time as they come in, instead of holding the whole table in memory until
+    the end. Duplicate rows are dropped on the way, the same as DataFrame.drop_duplicates would, by remembering a
+    64-bit hash of every row written rather than the rows themselves. Like drop_duplicates, 1, 1.0 and True count as
+    the same value, and 1 and "1" don't.
+
+    Has the same append/extend_columns as RowAccumulator, so code that fills one can fill the other.
+
+    csv output is the same as building the table and calling drop_duplicates(ignore_index=True) and to_csv on it.
+    Parquet output (needs pyarrow) has no index column and types columns as in PARQUET_COLUMN_TYPES. So does SQLite
+    output, which (re)creates a table in a database file.
+    """
+
+    def __init__(self, path, columns, file_format="csv", chunk_rows=TABLE_WRITER_CHUNK_ROWS, transform=None,
+                 index=True, table_name=None, index_columns=()):
+        """
+        :param path: File to write
+        :param columns: Column names, in output order. Every row has to fit these, since the header goes out with
+                        the first chunk.
+        :param file_format: "csv", "parquet" or "sqlite"
+        :param chunk_rows: Rows to collect before writing them out
+        :param transform: Optional function applied to each chunk's DataFrame (after duplicates are dropped) before
+                          it's written, e.g. to fill in calculated columns. Returns the DataFrame to write.
+        :param index: Whether csv output starts with a row number column
+        :param table_name: SQLite table to write to. Replaced if it's already there.
+        :param index_columns: SQLite columns to index once all the rows are in
+        """
+        if file_format not in ("csv", "parquet", "sqlite"):
+            raise ValueError(f"Unknown file format {file_format!r}, expected 'csv', 'parquet' or 'sqlite'")
+        if file_format == "sqlite" and not table_name:
+            raise ValueError("SQLite output needs a table_name")
+        self.path = path
+        self.columns = list(columns)
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.transform = transform
+        self.index = index
+        self.table_name = table_name
+        self.index_columns = list(index_columns)
+        self.rows_written = 0
+        self._buffer = RowAccumulator(self.columns)
+        self._seen = set()
+        self._file = None
+        self._parquet_writer = None
+        self._connection = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, row):
+        """
+        :param row: dict of column name -> value
+        """
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_rows:
+            self.flush()
+
+    def extend_columns(self, columns_data):
+        """
+        Add every row from a RowAccumulator's columns_data() output.
+        """
+        self._buffer.extend_columns(columns_data)
+        if len(self._buffer) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write out whatever rows are waiting, minus any already written.
+        """
+        extra_columns = [column for column in self._buffer.columns if column not in self.columns]
+        if extra_columns:
+            raise ValueError(f"Rows for {self.path} have columns not in its header: {extra_columns}")
+
+        df = self._buffer.to_dataframe()[self.columns]
+        self._buffer = RowAccumulator(self.columns)
+
+        # Keep the first of each distinct row
+        keep = []
+        for position, row_hash in enumerate(_row_hashes(df).tolist()):
+            if row_hash not in self._seen:
+                self._seen.add(row_hash)
+                keep.append(position)
+        df = df.iloc[keep]
+        df.index = pd.RangeIndex(self.rows_written, self.rows_written + len(df))
+        if self.transform is not None:
+            df = self.transform(df)
+
+        with RUN_STATS.phase("table_write"):
+            if self.file_format == "csv":
+                self._write_csv(df)
+            elif self.file_format == "parquet":
+                self._write_parquet(df)
+            else:
+                self._write_sqlite(df)
+        self.rows_written += len(df)
+        RUN_STATS.count("rows_written", len(df))
+
+    @staticmethod
+    def _typed_values(column, values):
+        """
+        :return: Values of a column made to fit its PARQUET_COLUMN_TYPES type. Blanks in number columns become None.
+        """
+        if PARQUET_COLUMN_TYPES.get(column) in ("int", "float"):
+            return [None if value is None or value == "" or value != value else value for value in values]
+        return [None if value is None else str(value) for value in values]
+
+    def _write_csv(self, df):
+        header = self._file is None
+        if header:
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+        if len(df) or header:
+            df.to_csv(self._file, header=header, index=self.index)
+
+    def _write_sqlite(self, df):
+        if self._connection is None:
+            sql_types = {"int": "INTEGER", "float": "REAL"}
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute(f'DROP TABLE IF EXISTS "{self.table_name}"')
+            column_definitions = ", ".join(f'"{column}" {sql_types.get(PARQUET_COLUMN_TYPES.get(column), "TEXT")}'
+                                           for column in self.columns)
+            self._connection.execute(f'CREATE TABLE "{self.table_name}" ({column_definitions})')
+
+        columns = [self._typed_values(column, df[column].tolist()) for column in self.columns]
+        placeholders = ", ".join("?" * len(self.columns))
+        self._connection.executemany(f'INSERT INTO "{self.table_name}" VALUES ({placeholders})', zip(*columns))
+        # Commit every chunk, so other writers on the same database don't find it locked
+        self._connection.commit()
+
+    def _write_parquet(self, df):
+        # pyarrow is only needed for Parquet output
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrow_types = {"int": pa.int64(), "float": pa.float64(), "dictionary": pa.string()}
+        arrays = []
+        for column in self.columns:
+            kind = PARQUET_COLUMN_TYPES.get(column)
+            values = self._typed_values(column, df[column].tolist())
+            array = pa.array(values, type=arrow_types.get(kind, pa.string()))
+            arrays.append(array.dictionary_encode() if kind == "dictionary" else array)
+
+        if self._parquet_writer is None:
+            schema = pa.schema([pa.field(column, array.type) for column, array in zip(self.columns, arrays)])
+            self._parquet_writer = pq.ParquetWriter(self.path, schema)
+        if len(df):
+            self._parquet_writer.write_table(pa.Table.from_arrays(arrays, schema=self._parquet_writer.schema))
+
+    def close(self):
+        """
+        Write out any rows still waiting and close the file. Writes just the header if there were no rows at all.
+        """
+        if self._closed:
+            return
+        if self._file is None and self._parquet_writer is None and self._connection is None or len(self._buffer):
+            self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if self._connection is not None:
+            for column in self.index_columns:
+                self._connection.execute(f'CREATE INDEX "{self.table_name}_{column}" ON "{self.table_name}" '
+                                         f'("{column}")')
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+        self._closed = True
+
+
+# Characters read from static_data.json per refill when streaming it. Memory use while streaming is roughly this plus
+# the largest single record.
+JSON_STREAM_CHUNK_SIZE = 1 << 20
+
+_JSON_WHITESPACE = re.compile(r"\s*")
+_JSON_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_STRUCTURE = re.compile(r'[\[\]{}"]')
+_JSON_SCALAR = re.compile(r"[^,:\]}\s]+")
+
+
+class JsonStream:
+    """
+    Minimal incremental JSON reader. Walks a JSON file chunk by chunk, skipping over values we don't care about
+    without decoding them, and decoding the ones we do one at a time.
+
+    Only ever holds the current chunk plus whatever value is being decoded, so a multi-hundred-MB static data file
+    can be picked through in a few MB of memory.
+    """
+
+    def __init__(self, json_file, chunk_size=JSON_STREAM_CHUNK_SIZE):
+        """
+        :param json_file: File object opened in text mode
+        :param chunk_size: Number of characters to read per refill
+        """
+        self._file = json_file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+
+    def _read_more(self, keep_from):
+        # Drop everything before keep_from, tack the next chunk on the end. Callers shift their indices by keep_from.
+        chunk = self._file.read(self._chunk_size)
+        self._buffer = self._buffer[keep_from:] + chunk
+        return bool(chunk)
+
+    def _skip_whitespace(self):
+        while True:
+            end = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if end < len(self._buffer):
+                self._pos = end
+                return
+            if not self._read_more(len(self._buffer)):
+                raise ValueError("Unexpected end of JSON input")
+            self._pos = 0
+
+    def _next_char(self):
+        self._skip_whitespace()
+        self._pos += 1
+        return self._buffer[self._pos - 1]
+
+    def _expect(self, char):
+        found = self._next_char()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON input, found {found!r}")
+
+    def _scan_value(self, keep):
+        """
+        Find the extent of the JSON value at the current position.
+
+        :param keep: Whether the value's text has to stay in the buffer. If not, it's thrown away as we go.
+        :return: (start, end) indices of the value in the buffer. start is meaningless if keep is False.
+        """
+        self._skip_whitespace()
+        start = self._pos
+        first = self._buffer[start]
+
+        if first == '"':
+            match = _JSON_STRING.match(self._buffer, start)
+            while match is None:
+                if not self._read_more(start):
+                    raise ValueError("Unterminated string in JSON input")
+                start = 0
+                match = _JSON_STRING.match(self._buffer, start)
+            return start, match.end()
+
+        if first not in "[{":
+            # Number, true, false or null. Might be cut off by the end of the chunk.
+            while True:
+                match = _JSON_SCALAR.match(self._buffer, start)
+                if match is None:
+                    raise ValueError(f"Unexpected {first!r} in JSON input")
+                if match.end() < len(self._buffer):
+                    return start, match.end()
+                if not self._read_more(start):
+                    return 0, len(self._buffer)
+                start = 0
+
+        # Object or array. Count brackets, hopping over strings so brackets inside them don't count.
+        depth = 0
+        i = start
+        while True:
+            match = _JSON_STRUCTURE.search(self._buffer, i)
+            if match is None:
+                keep_from = start if keep else len(self._buffer)
+                i = len(self._buffer) - keep_from
+                if not self._read_more(keep_from):
+                    raise ValueError("Unexpected end of JSON input")
+                start -= keep_from
+                continue
+
+            j = match.start()
+            char = self._buffer[j]
+            if char == '"':
+                string_match = _JSON_STRING.match(self._buffer, j)
+                if string_match is None:
+                    # String runs past the end of the chunk
+                    keep_from = start if keep else j
+                    i = j - keep_from
+                    if not self._read_more(keep_from):
+                        raise ValueError("Unterminated string in JSON input")
+                    start -= keep_from
+                    continue
+                i = string_match.end()
+            elif char in "[{":
+                depth += 1
+                i = j + 1
+            else:
+                depth -= 1
+                i = j + 1
+                if depth == 0:
+                    return start, i
+
+    def read_value(self):
+        """
+        :return: The decoded JSON value at the current position
+        """
+        start, end = self._scan_value(keep=True)
+        value = json.loads(self._buffer[start:end])
+        self._pos = end
+        return value
+
+    def skip_value(self):
+        """
+        Skip the JSON value at the current position without decoding it.
+        """
+        _, self._pos = self._scan_value(keep=False)
+
+    def iter_object_keys(self):
+        """
+        Step through the object at the current position. Each key is yielded with the stream sitting on its value,
+        which the caller must read or skip before asking for the next key.
+        """
+        self._expect("{")
+        self._skip_whitespace()
+        if self._buffer[self._pos] == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            yield key
+
+            separator = self._next_char()
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON input, found {separator!r}")
+
+    def iter_array(self):
+        """
+        Decode the items of the array at the current position one at a time.
+        """
+        self._expect("[")
+        self._skip_whitespace()
+        if self._buffer[self._pos] == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self.read_value()
+
+            separator = self._next_char()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON input, found {separator!r}")
+
+    def seek(self, *keys):
+        """
+        Move to the value found by following keys down through nested objects, e.g. seek("StageData", "Stages").
+        """
+        for key in keys:
+            for found_key in self.iter_object_keys():
+                if found_key == key:
+                    break
+                self.skip_value()
+            else:
+                raise KeyError(key)
+
+
+def iter_json_array(path, *keys, chunk_size=JSON_STREAM_CHUNK_SIZE):
+    """
+    Stream the items of an array nested somewhere in a JSON file.
+
+    :param path: Path to JSON file, e.g. "static_data.json"
+    :param keys: Keys leading to the array, e.g. "HeroData", "HeroTypes"
+    :param chunk_size: Number of characters to read at a time
+    :return: Generator of decoded array items
+    """
+    with open(path, encoding="utf-8") as json_file:
+        stream = JsonStream(json_file, chunk_size)
+        stream.seek(*keys)
+        yield from stream.iter_array()
+
+
+def iter_json_object(path, *keys, chunk_size=JSON_STREAM_CHUNK_SIZE):
+    """
+    Stream the key/value pairs of an object nested somewhere in a JSON file.
+
+    :param path: Path to JSON file, e.g. "static_data.json"
+    :param keys: Keys leading to the object, e.g. "StaticDataLocalization"
+    :param chunk_size: Number of characters to read at a time
+    :return: Generator of (key, decoded value) tuples
+    """
+    with open(path, encoding="utf-8") as json_file:
+        stream = JsonStream(json_file, chunk_size)
+        stream.seek(*keys)
+        for key in stream.iter_object_keys():
+            yield key, stream.read_value()
+
+
+class JsonArrayStream:
+    """
+    Re-iterable view of an array in a JSON file. Every pass re-reads the file, so the array is never held in memory.
+    Drop-in replacement for the lists in the fully loaded static data, as long as they're only looped over.
+    """
+
+    def __init__(self, path, *keys, chunk_size=JSON_STREAM_CHUNK_SIZE):
+        self.path = path
+        self.keys = keys
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        return iter_json_array(self.path, *self.keys, chunk_size=self.chunk_size)
+
+
+def open_static_data(path="static_data.json", chunk_size=JSON_STREAM_CHUNK_SIZE):
+    """
+    Open the static data for streaming instead of json.loads-ing the whole thing.
+
+    Stages, HeroTypes and SkillTypes are streamed from disk record by record each time they're iterated. Only the
+    localization map is loaded, since champ names and descriptions are looked up from it at random.
+
+    :param path: Path to static data json
+    :param chunk_size: Number of characters to read at a time
+    :return: dict shaped like the static data json object, with only the parts used by this script
+    """
+    return {
+        "StageData": {"Stages": JsonArrayStream(path, "StageData", "Stages", chunk_size=chunk_size)},
+        "HeroData": {"HeroTypes": JsonArrayStream(path, "HeroData", "HeroTypes", chunk_size=chunk_size)},
+        "SkillData": {"SkillTypes": JsonArrayStream(path, "SkillData", "SkillTypes", chunk_size=chunk_size)},
+        "StaticDataLocalization": dict(iter_json_object(path, "StaticDataLocalization", chunk_size=chunk_size)),
+    }
+
+
+def load_localization(path, keys=("StaticDataLocalization",), chunk_size=JSON_STREAM_CHUNK_SIZE):
+    """
+    Read just the localization map out of a json file, e.g. the static data of another language.
+
+    :param path: Path to the json
+    :param keys: Keys leading to the localization map. () if it's the whole file.
+    :param chunk_size: Number of characters to read at a time
+    :return: dict of localization key -> text
+    """
+    return dict(iter_json_object(path, *keys, chunk_size=chunk_size))
 
-    # Iterate stages
-    for stage_dict in data:
-        # Get internal ID.
-        id_string = str(stage_dict["Id"])
 
-        # Stage ID contains various bits of info. Stages not starting with "1" are non campaign stages. Ignore for
-        # our present purposes.
-        if id_string[0] != "1":
+# Values for the non-stat variables that show up in multiplier formulas. Stats (HP, ATK, DEF) come from the champ.
+FORMULA_DEFAULT_VARIABLES = {
+    "MAX_STAMINA": 100.0,  # Full turn meter
+    "HERO_LEVEL": 60.0,
+}
+
+# Which book bonus (column of the champ move table) boosts an effect's multiplier, by effect KindId. Damage includes
+# 5000 because bombs have multipliers. Anything not listed (presumably turn meter-y things) isn't boosted by books.
+EFFECT_BOOK_MULTIPLIERS = {
+    5000: "book_dmg_mul",
+    6000: "book_dmg_mul",
+    0: "book_heal_mul",
+    1000: "book_heal_mul",
+    4000: "book_shield_mul",
+}
+# The same, for looking up a whole column of effect kinds at once
+EFFECT_BOOK_MULTIPLIER_DECODER = CodeDecoder("book multiplier", EFFECT_BOOK_MULTIPLIERS, unknown=None,
+                                             count_unknown=False)
+
+_FORMULA_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+    |(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op>&&|\|\||<=|>=|==|!=|[-+*/%()<>!?:,])
+    )""", re.VERBOSE)
+
+
+def _formula_min(*args):
+    return functools.reduce(np.minimum, args)
+
+
+def _formula_max(*args):
+    return functools.reduce(np.maximum, args)
+
+
+# Functions callable from multiplier formulas, for plain numbers and for NumPy arrays respectively.
+# Names are matched case-insensitively. "if" also backs the ternary operator.
+_SCALAR_FORMULA_FUNCTIONS = {
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "round": round,
+    "sqrt": math.sqrt,
+    "pow": math.pow,
+    "clamp": lambda x, low, high: min(max(x, low), high),
+    "if": lambda condition, if_true, if_false: if_true if condition else if_false,
+    "and": lambda a, b: bool(a) and bool(b),
+    "or": lambda a, b: bool(a) or bool(b),
+    "not": lambda a: not a,
+}
+
+_VECTOR_FORMULA_FUNCTIONS = {
+    "min": _formula_min,
+    "max": _formula_max,
+    "abs": np.abs,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "round": np.round,
+    "sqrt": np.sqrt,
+    "pow": np.power,
+    "clamp": np.clip,
+    "if": np.where,
+    "and": np.logical_and,
+    "or": np.logical_or,
+    "not": np.logical_not,
+}
+
+
+class FormulaError(ValueError):
+    """
+    Raised when a multiplier formula can't be parsed, or can't be evaluated with the variables on hand.
+    """
+
+
+class _FormulaParser:
+    """
+    Recursive descent parser for skill multiplier formulas like "0.2*HP+3*ATK" or "min(4*ATK, 0.1*TRG_MAX_HP)".
+
+    Produces an AST of tuples:
+        ("num", text), ("var", name), ("call", function, [args]), ("unary", op, operand),
+        ("binary", op, left, right), ("if", condition, if_true, if_false)
+
+    Precedence, loosest to tightest: ?:, ||, &&, == !=, < > <= >=, + -, * / %, unary - + !
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = _FORMULA_TOKEN.match(text, pos)
+            if match is None or match.end() == pos:
+                raise FormulaError(f"Unexpected character {text[pos:].strip()[:1]!r} in formula {self.text!r}")
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            pos = match.end()
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, *ops):
+        kind, value = self._peek()
+        if kind == "op" and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def _expect(self, op):
+        if self._take(op) is None:
+            raise FormulaError(f"Expected {op!r} in formula {self.text!r}")
+
+    def parse(self):
+        node = self._ternary()
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"Unexpected {self._peek()[1]!r} in formula {self.text!r}")
+        return node
+
+    def _ternary(self):
+        condition = self._binary(0)
+        if self._take("?") is None:
+            return condition
+        if_true = self._ternary()
+        self._expect(":")
+        return "if", condition, if_true, self._ternary()
+
+    _BINARY_LEVELS = [("||",), ("&&",), ("==", "!="), ("<", ">", "<=", ">="), ("+", "-"), ("*", "/", "%")]
+
+    def _binary(self, level):
+        if level == len(self._BINARY_LEVELS):
+            return self._unary()
+        node = self._binary(level + 1)
+        op = self._take(*self._BINARY_LEVELS[level])
+        while op is not None:
+            node = "binary", op, node, self._binary(level + 1)
+            op = self._take(*self._BINARY_LEVELS[level])
+        return node
+
+    def _unary(self):
+        op = self._take("-", "+", "!")
+        if op is not None:
+            return "unary", op, self._unary()
+        return self._primary()
+
+    def _primary(self):
+        kind, value = self._peek()
+        self.pos += 1
+        if kind == "number":
+            return "num", value
+        if kind == "name":
+            if self._take("(") is None:
+                return "var", value
+            function = value.lower()
+            if function not in _SCALAR_FORMULA_FUNCTIONS:
+                raise FormulaError(f"Unknown function {value!r} in formula {self.text!r}")
+            args = []
+            if self._take(")") is None:
+                args.append(self._ternary())
+                while self._take(",") is not None:
+                    args.append(self._ternary())
+                self._expect(")")
+            return "call", function, args
+        if kind == "op" and value == "(":
+            node = self._ternary()
+            self._expect(")")
+            return node
+        raise FormulaError(f"Unexpected {value!r} in formula {self.text!r}" if value else
+                           f"Formula {self.text!r} ends unexpectedly")
+
+
+def _formula_source(node, variables):
+    """
+    Turn a formula AST back into Python source. Only ever emits numbers, arithmetic, comparisons, variable lookups
+    in _v and calls to the whitelisted formula functions, so the result is safe to compile.
+    Also collects the names of the variables used along the way.
+    """
+    kind = node[0]
+    if kind == "num":
+        # Written out again the way Python reads it ("05" isn't valid Python), but still int or float as written so
+        # the arithmetic is the same as it always was. Floats too big for a float come out as inf.
+        if node[1].isdigit():
+            return repr(int(node[1]))
+        value = float(node[1])
+        return repr(value) if math.isfinite(value) else "1e999"
+    if kind == "var":
+        variables.add(node[1])
+        return f"_v[{node[1]!r}]"
+    if kind == "call":
+        return f"_f_{node[1]}({', '.join(_formula_source(arg, variables) for arg in node[2])})"
+    if kind == "unary":
+        if node[1] == "!":
+            return f"_f_not({_formula_source(node[2], variables)})"
+        return f"({node[1]}{_formula_source(node[2], variables)})"
+    if kind == "binary":
+        left = _formula_source(node[2], variables)
+        right = _formula_source(node[3], variables)
+        if node[1] == "&&":
+            return f"_f_and({left}, {right})"
+        if node[1] == "||":
+            return f"_f_or({left}, {right})"
+        return f"({left} {node[1]} {right})"
+    # Ternary
+    return f"_f_if({', '.join(_formula_source(part, variables) for part in node[1:])})"
+
+
+class CompiledFormula:
+    """
+    A multiplier formula, parsed and compiled once. Evaluate it as many times as you like against different stats.
+    """
+
+    _scalar_globals = {"__builtins__": {}, **{f"_f_{k}": v for k, v in _SCALAR_FORMULA_FUNCTIONS.items()}}
+    _vector_globals = {"__builtins__": {}, **{f"_f_{k}": v for k, v in _VECTOR_FORMULA_FUNCTIONS.items()}}
+
+    def __init__(self, text):
+        """
+        :param text: Formula as found in the static data, e.g. "3.4*ATK"
+        :raises FormulaError: if the formula can't be parsed
+        """
+        self.text = text
+        self.variables = set()
+        self.source = _formula_source(_FormulaParser(text).parse(), self.variables)
+        try:
+            self._code = compile(self.source, "<multiplier formula>", "eval")
+        except SyntaxError as e:
+            raise FormulaError(f"Could not compile formula {text!r}: {e}") from e
+
+    def __repr__(self):
+        return f"CompiledFormula({self.text!r})"
+
+    def missing_variables(self, variables):
+        """
+        :param variables: dict of variable name -> value
+        :return: Sorted list of the variables this formula needs that aren't in variables
+        """
+        return sorted(self.variables.difference(variables))
+
+    def evaluate(self, variables):
+        """
+        :param variables: dict of variable name -> value, e.g. {"HP": 15000, "ATK": 1200, "DEF": 1000, ...}
+                          Values can be NumPy arrays, in which case so is the result.
+        :return: Result of the formula
+        :raises FormulaError: if the formula uses a variable not in variables
+        """
+        missing = self.missing_variables(variables)
+        if missing:
+            raise FormulaError(f"Formula {self.text!r} depends on unknown value(s): {', '.join(missing)}")
+        vectorized = any(isinstance(value, np.ndarray) for value in variables.values())
+        return eval(self._code, self._vector_globals if vectorized else self._scalar_globals, {"_v": variables})
+
+
+# Formula text -> CompiledFormula (or the FormulaError it raised, so broken formulas aren't re-parsed every time)
+_compiled_formulas = {}
+
+
+def compile_formula(text):
+    """
+    Parse and compile a multiplier formula, or fetch it from the cache if it's been seen before.
+
+    :param text: Formula as found in the static data
+    :return: CompiledFormula
+    :raises FormulaError: if the formula can't be parsed
+    """
+    compiled = _compiled_formulas.get(text)
+    if compiled is None:
+        RUN_STATS.count("formula_cache_misses")
+        try:
+            compiled = CompiledFormula(text)
+        except FormulaError as e:
+            compiled = e
+        _compiled_formulas[text] = compiled
+    else:
+        RUN_STATS.count("formula_cache_hits")
+
+    if isinstance(compiled, FormulaError):
+        raise compiled
+    return compiled
+
+
+@timed("formula_eval_batched")
+def evaluate_formulas_batched(formulas, variables):
+    """
+    Evaluate a whole column of multiplier formulas, one per row, against columns of variables. Rather than going row
+    by row, each distinct formula is evaluated once, over NumPy arrays of every row that uses it.
+
+    :param formulas: Sequence of formula text, one per row. None or "" for rows without a formula.
+    :param variables: dict of variable name -> array with one value per row, or a single value shared by all rows
+    :return: Tuple of (float array of results, NaN where there's no formula or it couldn't be evaluated,
+                       dict of formula text -> FormulaError for formulas that couldn't be evaluated)
+    """
+    codes, uniques = pd.factorize(np.asarray(formulas, dtype=object))
+    results = np.full(len(codes), np.nan)
+    failures = {}
+
+    # Sort row numbers by formula so each formula's rows are one contiguous slice
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    for code, formula in enumerate(uniques):
+        if not formula:
             continue
+        rows = order[bounds[code]:bounds[code + 1]]
+        try:
+            compiled = compile_formula(formula)
+            row_variables = {name: variables[name][rows] if np.ndim(variables[name]) else variables[name]
+                             for name in compiled.variables if name in variables}
+            with np.errstate(divide="ignore", invalid="ignore"):
+                results[rows] = compiled.evaluate(row_variables)
+        except FormulaError as e:
+            failures[formula] = e
+        except ArithmeticError as e:
+            # Only constant parts like 1/0 get this far, array arithmetic just gives inf/NaN
+            failures[formula] = FormulaError(f"Could not calculate formula {formula!r}: {e}")
+
+    results[~np.isfinite(results)] = np.nan
+    return results, failures
+
+
+# Python's round(), applied element-wise. np.round scales by 10**digits and rounds half to even, which puts the odd
+# result a cent off from what round() gives.
+_round_elementwise = np.frompyfunc(round, 2, 1)
+
+
+def calculate_damage_columns(champ_move_df, stats=None, extra_formula_variables=None):
+    """
+    Work out the calculated_damage and damage_per_turn columns for a whole champ move table in one go, the same way
+    champ_abilities_and_multipliers does effect by effect: formula * number of hits * book multiplier, and that over
+    the booked cooldown.
+
+    Handy for recalculating under different assumptions than level 60 base stats, e.g. other levels or gear.
+
+    :param champ_move_df: DataFrame laid out like champ_move_details.csv
+    :param stats: Optional dict of "HP"/"ATK"/"DEF" -> value or array (one per row) to use instead of the base stats
+    :param extra_formula_variables: Optional dict of other formula variables, on top of FORMULA_DEFAULT_VARIABLES,
+                                    e.g. {"HERO_LEVEL": 50.0, "TRG_HP": 50000}
+    :return: DataFrame with calculated_damage and damage_per_turn columns, same index as champ_move_df
+    """
+    variables = dict(FORMULA_DEFAULT_VARIABLES, **(extra_formula_variables or {}))
+    for name, column in [("HP", "hp"), ("ATK", "atk"), ("DEF", "def")]:
+        variables[name] = pd.to_numeric(champ_move_df[column]).to_numpy(dtype=float)
+    for name, value in (stats or {}).items():
+        variables[name] = np.asarray(value, dtype=float) if np.ndim(value) else value
 
-        # Resource "1" below is energy.
-        energy_cost = stage_dict["StartCondition"]["Price"]["RawValues"]["1"]
+    # Formulas are stored with a leading "'" so spreadsheets don't try to treat them as formulas themselves
+    formulas = champ_move_df["multiplier"].fillna("").str[1:].to_numpy()
+    values, failures = evaluate_formulas_batched(formulas, variables)
+    RUN_STATS.count("formula_failures", len(failures))
+    for error in failures.values():
+        logger.debug(f"Could not calculate multiplier formula: {error}")
 
-        # Substring of stage ID indicates which of the 12 areas it's in
+    # Pick the book multiplier that applies to each row's effect type
+    book_columns = EFFECT_BOOK_MULTIPLIER_DECODER.decode_array(
+        pd.to_numeric(champ_move_df["effect_type_code"], errors="coerce").to_numpy(dtype=float))
+    book_multipliers = np.ones(len(champ_move_df))
+    for column in set(EFFECT_BOOK_MULTIPLIERS.values()):
+        rows = book_columns == column
+        book_multipliers[rows] = pd.to_numeric(champ_move_df[column]).to_numpy(dtype=float)[rows]
+
+    calculated = values * pd.to_numeric(champ_move_df["num_hits"]).to_numpy(dtype=float) * book_multipliers
+    cooldowns = np.maximum(pd.to_numeric(champ_move_df["skill_cd_booked"]).to_numpy(dtype=float), 1)
+
+    return pd.DataFrame({"calculated_damage": _round_elementwise(calculated, 2).astype(float),
+                         "damage_per_turn": _round_elementwise(calculated / cooldowns, 2).astype(float)},
+                        index=champ_move_df.index)
+
+
+# Random rewards tracked for each stage, in column order of the "reward_weights" array from normalize_stage_rewards
+STAGE_REWARD_KINDS = ["artifact", "shard", "common", "uncommon", "rare"]
+
+# Columns written to raid_campaign_farming_data.csv
+CAMPAIGN_FARMING_COLUMNS = ["id", "xp/e", "com/e", "unc/e", "rare/e", "silver/e", "shard/e", "e return/e", "real xp/e"]
+
+
+class StageDecoder:
+    """
+    Reads the IDs of one family of stages (campaign, dungeons, ...). A stage ID starts with a digit for the area of the
+    game, then two digits for the zone (or dungeon, crypt, tower), one for the difficulty, and then the stage number.
+
+    For a family laid out some other way, subclass and override decode, and add an instance to STAGE_DECODERS.
+    """
+
+    def __init__(self, area, prefix, short_name, difficulties=None):
+        """
+        :param area: Name of the area, e.g. "Dungeons"
+        :param prefix: First digit of the IDs of its stages
+        :param short_name: Start of readable stage IDs
+        :param difficulties: dict of difficulty digit -> name. Digits not in it are kept as they are.
+        """
+        self.area = area
+        self.prefix = prefix
+        self.short_name = short_name
+        self.difficulties = difficulties or {}
+
+    def decode(self, id_string):
+        """
+        :param id_string: Stage ID, as a string
+        :return: (zone, difficulty, substage, readable ID)
+        """
         zone = id_string[1:3]
+        difficulty = self.difficulties.get(id_string[3:4], id_string[3:4])
+        substage = id_string[4:].lstrip("0") or "0"
+        return zone, difficulty, substage, f"{self.short_name} {zone}-{substage}-{difficulty[0:2]}"
 
-        # Difficulty is encoded by the fourth digit of the ID (1-4)
-        # Map this to something readable.
-        difficulty = DIFFICULTY_CODES[id_string[3]]
 
-        # End of id identifies which of the 7 stages it is
-        substage = id_string[5:]
+class CampaignStageDecoder(StageDecoder):
 
-        # Format the stage into something prettier.
+    def __init__(self):
+        super().__init__("Campaign", "1", "", DIFFICULTY_CODES)
+
+    def decode(self, id_string):
+        # Substring of stage ID indicates which of the 12 areas it's in. Difficulty is encoded by the fourth digit of
+        # the ID (1-4). End of id identifies which of the 7 stages it is.
+        zone = id_string[1:3]
+        difficulty = DIFFICULTY_CODES[id_string[3]]
+        substage = id_string[5:]
         # Difficulty currently uses first two chars to disambiguate Normal and Nightmare.
-        readable_id = f"{zone}-{substage}-{difficulty[0:2]}"
-        print(f"\nZone {zone} Stage {substage} {difficulty}")
+        return zone, difficulty, substage, f"{zone}-{substage}-{difficulty[0:2]}"
+
+
+# Decoders for every family of stages with drops worth farming. Only campaign's layout is checked against the game
+# data; the others assume the same area/zone/difficulty/stage layout.
+STAGE_DECODERS = [
+    CampaignStageDecoder(),
+    StageDecoder("Dungeons", "2", "Dungeon", {"1": "Normal", "2": "Hard"}),
+    StageDecoder("Faction Crypts", "3", "Crypt"),
+    StageDecoder("Doom Tower", "7", "Doom Tower", {"1": "Normal", "2": "Hard"}),
+]
+CAMPAIGN_STAGE_DECODERS = STAGE_DECODERS[:1]
+
+
+def _id_probabilities(probabilities_by_id, width):
+    # {"1-based ID": percent} -> array of chances by 0-based index. IDs past the end of the price tables are dropped.
+    # All zeros if the weights add up to nothing.
+    result = [0.0] * width
+    total = sum(probabilities_by_id.values())
+    if not total:
+        return result
+    for item_id, probability in probabilities_by_id.items():
+        if 0 < int(item_id) <= width:
+            result[int(item_id) - 1] = probability / total
+    return result
+
+
+@timed("normalize_stage_rewards")
+def normalize_stage_rewards(stages, decoders=CAMPAIGN_STAGE_DECODERS):
+    """
+    Flatten the rewards of all stages into NumPy arrays, one row per stage, so that stats for every stage can be
+    worked out at once with array math instead of stage by stage.
+
+    :param stages: static_data['StageData']['Stages'], or any iterable of stage dicts
+    :param decoders: StageDecoders of the families of stages to include, by default just campaign. STAGE_DECODERS
+                     for every area. Stages none of them handle are skipped.
+    :return: dict of arrays, all with one row per stage:
+             "id" (internal stage ID), "readable_id" (e.g. "12-7-Br"), "area", "zone", "difficulty", "substage",
+             "energy_cost", "silver" (average fixed silver reward), "account_xp", "hero_xp",
+             "reward_weights" (stage x STAGE_REWARD_KINDS drop weights), "total_weight" (sum of all drop weights),
+             "shard_quantity" (average shards per shard drop),
+             "rank_probabilities" (stage x 6 artifact ranks), "rarity_probabilities" (stage x 5 artifact rarities),
+             "set_probabilities", "kind_probabilities" (stage x artifact sets/kinds, chances of each in the order of
+             ARTIFACT_SET_BASE_PRICES and ITEM_TYPE_VALUE_MULTIPLIERS), and "artifact_set", "artifact_kind" (0-based
+             index of the first set and kind listed)
+    """
+    columns = {key: [] for key in ["id", "readable_id", "area", "zone", "difficulty", "substage", "energy_cost",
+                                   "silver", "account_xp", "hero_xp", "reward_weights", "total_weight",
+                                   "shard_quantity", "rank_probabilities", "rarity_probabilities",
+                                   "set_probabilities", "kind_probabilities", "artifact_set", "artifact_kind"]}
+    decoders_by_prefix = {decoder.prefix: decoder for decoder in decoders}
+
+    for stage_dict in stages:
+        # Get internal ID.
+        id_string = str(stage_dict["Id"])
+
+        # Stage ID contains various bits of info. The first digit is the area of the game (campaign, dungeons...),
+        # which says how to read the rest. Ignore areas we weren't asked for.
+        decoder = decoders_by_prefix.get(id_string[0])
+        if decoder is None:
+            continue
+        zone, difficulty, substage, readable_id = decoder.decode(id_string)
+
+        columns["id"].append(stage_dict["Id"])
+        columns["readable_id"].append(readable_id)
+        columns["area"].append(decoder.area)
+        columns["zone"].append(zone)
+        columns["difficulty"].append(difficulty)
+        columns["substage"].append(substage)
+
+        # Resource "1" below is energy. Stages paid for some other way (e.g. keys) cost no energy.
+        columns["energy_cost"].append(((stage_dict.get("StartCondition") or {}).get("Price") or {})
+                                      .get("RawValues", {}).get("1", 0))
 
         # Get amounts of account-level XP, champ XP and silver rewarded
         raw_silver_reward = 0
-        reward_account_xp = 0  # Presently unused
-
-        for rew in stage_dict["Rewards"]:
+        reward_account_xp = 0
+        for rew in stage_dict.get("Rewards") or []:
             if rew["Type"] == 3:
                 raw_silver_reward = (rew["MaxCount"] + rew["MinCount"]) / 2
             if rew["Type"] == 5:
                 reward_account_xp = (rew["MaxCount"] + rew["MinCount"]) / 2
-        reward_xp = stage_dict.get("RewardHeroXp") if stage_dict.get("RewardHeroXp") else 0
-
-        # Maintain the probabilities of each potential random reward
-        reward_total_weight = 0
-        reward_commmon_champ_weight = 0
-        reward_uncommmon_champ_weight = 0
-        reward_rare_champ_weight = 0
-        reward_shard_weight = 0
-        reward_shard_quantity = 0
-        reward_item_weight = 0
-        item_ranks = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-        item_rarities = [0.0, 0.0, 0.0, 0.0, 0.0]
-
-        for reward in stage_dict["Reward"]["Rewards"]:
+        columns["silver"].append(raw_silver_reward)
+        columns["account_xp"].append(reward_account_xp)
+        columns["hero_xp"].append(stage_dict.get("RewardHeroXp") or 0)
+
+        # Weights of each potential random reward, in STAGE_REWARD_KINDS order
+        random_rewards = stage_dict.get("Reward") or {}
+        weights = [0, 0, 0, 0, 0]
+        total_weight = 0
+        shard_quantity = 0
+        for reward in random_rewards.get("Rewards") or []:
             if reward["Type"] == 4:
                 # Artifact drops
-                reward_total_weight += reward["Probability"]
-                reward_item_weight = reward["Probability"]
+                total_weight += reward["Probability"]
+                weights[0] = reward["Probability"]
             elif reward["Type"] == 2:
                 # Mystery shard drops
                 # (or "Black Market" item drops, more generally, but in campaign this is always mystery shards)
-                reward_total_weight += reward["Probability"]
-                reward_shard_weight = reward["Probability"]
-                reward_shard_quantity = (reward["MinCount"] + reward["MaxCount"]) / 2
-            elif reward["Type"] == 1:
-                # Champion drops
-                if reward["HeroGrade"] == 1:
-                    reward_total_weight += reward["Probability"]
-                    reward_commmon_champ_weight += reward["Probability"]
-                elif reward["HeroGrade"] == 2:
-                    reward_total_weight += reward["Probability"]
-                    reward_uncommmon_champ_weight += reward["Probability"]
-                elif reward["HeroGrade"] == 3:
-                    reward_total_weight += reward["Probability"]
-                    reward_rare_champ_weight += reward["Probability"]
-
-        # Get item rank probabilities
-        for (rank, prob) in stage_dict["Reward"]["ArtifactProbsByRankId"].items():
+                total_weight += reward["Probability"]
+                weights[1] = reward["Probability"]
+                shard_quantity = (reward["MinCount"] + reward["MaxCount"]) / 2
+            elif reward["Type"] == 1 and reward["HeroGrade"] in (1, 2, 3):
+                # Champion drops. Common, uncommon and rare are the next three columns.
+                total_weight += reward["Probability"]
+                weights[1 + reward["HeroGrade"]] += reward["Probability"]
+        columns["reward_weights"].append(weights)
+        columns["total_weight"].append(total_weight)
+        columns["shard_quantity"].append(shard_quantity)
+
+        # Get item rank and rarity probabilities
+        item_ranks = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        for (rank, prob) in (random_rewards.get("ArtifactProbsByRankId") or {}).items():
             item_ranks[int(rank)-1] = prob/100.0
-
-        # Get item rarity probabilities
-        for (rarity, prob) in stage_dict["Reward"]["ArtifactProbsByRarityId"].items():
+        item_rarities = [0.0, 0.0, 0.0, 0.0, 0.0]
+        for (rarity, prob) in (random_rewards.get("ArtifactProbsByRarityId") or {}).items():
             item_rarities[int(rarity)-1] = prob/100.0
+        columns["rank_probabilities"].append(item_ranks)
+        columns["rarity_probabilities"].append(item_rarities)
+
+        # Get artifact sets and kinds (e.g. shield, helmet) as these affect the sell price. Dungeons can drop
+        # several of each.
+        kinds = random_rewards.get("ArtifactProbsByKindId") or {}
+        sets = random_rewards.get("ArtifactProbsBySetKindId") or {}
+        for name, weights in [("kind", kinds), ("set", sets)]:
+            if weights and not sum(weights.values()):
+                logger.debug(f"Stage {readable_id} ({stage_dict['Id']}): artifact {name} weights are all zero, its "
+                             f"artifacts are valued at 0")
+        columns["kind_probabilities"].append(_id_probabilities(kinds, len(ITEM_TYPE_VALUE_MULTIPLIERS)))
+        columns["set_probabilities"].append(_id_probabilities(sets, len(ARTIFACT_SET_BASE_PRICES)))
+        columns["artifact_kind"].append(int(next(iter(kinds), 1)) - 1)
+        columns["artifact_set"].append(int(next(iter(sets), 1)) - 1)
+
+    stage_rewards = {key: np.array(values) for key, values in columns.items()}
+    # Keep the 2D arrays 2D and the indices integers even when there are no stages
+    for key in ["artifact_set", "artifact_kind"]:
+        stage_rewards[key] = stage_rewards[key].astype(int)
+    for key, width in [("reward_weights", len(STAGE_REWARD_KINDS)), ("rank_probabilities", 6),
+                       ("rarity_probabilities", 5), ("set_probabilities", len(ARTIFACT_SET_BASE_PRICES)),
+                       ("kind_probabilities", len(ITEM_TYPE_VALUE_MULTIPLIERS))]:
+        stage_rewards[key] = stage_rewards[key].reshape(-1, width).astype(float)
+    return stage_rewards
+
+
+@timed("stage_metrics")
+def campaign_stage_metrics(stage_rewards):
+    """
+    Work out expected returns per run and per point of energy for every stage at once. Despite the name, works for
+    stages from any area (see stage_drop_info).
 
-        # Multiply item rank and rarity probabilities to get probability of each rank/rarity combo
-        item_probabilities = reward_item_weight / reward_total_weight * \
-            np.matmul(np.array(item_ranks).reshape((6, 1)), np.array(item_rarities).reshape((1, 5)))
+    :param stage_rewards: Output of normalize_stage_rewards
+    :return: DataFrame indexed by readable stage ID, with the CAMPAIGN_FARMING_COLUMNS, followed by "energy",
+             "xp/run" (XP per food champ, 2 food champs per run), "com/run", "unc/run", "rare/run", "silver/run"
+             (including expected artifact sell value) and "shard/run"
+    """
+    energy_cost = stage_rewards["energy_cost"]
+    hero_xp = stage_rewards["hero_xp"] / 2.0
+    # Stages that don't cost energy (keys etc.) have no per-energy returns, rather than infinite ones
+    per_energy_cost = np.where(energy_cost > 0, energy_cost, np.nan)
 
-        # Get artifact set and kind (e.g. shield, helmet) as these affect the sell price
-        item_kind = int(list(stage_dict["Reward"]["ArtifactProbsByKindId"].keys())[0])
-        item_set = int(list(stage_dict["Reward"]["ArtifactProbsBySetKindId"].keys())[0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Chance of each random reward per run
+        reward_chances = stage_rewards["reward_weights"] / stage_rewards["total_weight"][:, None]
+        shards = reward_chances[:, 1] * stage_rewards["shard_quantity"]
 
-        # Get the expected sell value of an artifact gained from the stage, weighted by drop chances
-        item_sell_expected_value = calculate_expected_sell_value(item_probabilities, item_set-1, item_kind-1)
-        # print(f"Expected item sell value per run: {item_sell_expected_value}")
+        # Multiply item rank and rarity probabilities to get probability of each rank/rarity combo
+        item_probabilities = reward_chances[:, 0, None, None] * \
+            (stage_rewards["rank_probabilities"][:, :, None] * stage_rewards["rarity_probabilities"][:, None, :])
+
+        # Get the expected sell value of an artifact gained from each stage, weighted by drop chances
+        item_sell_expected_value = expected_sell_values(item_probabilities, stage_rewards["set_probabilities"],
+                                                        stage_rewards["kind_probabilities"])
+        silver = stage_rewards["silver"] + item_sell_expected_value
 
         # This metric represents the amount of effective XP earned by picking up uncommons, rares, and mystery shards
         # in this stage. Each of those things can speed up your XP farming and has a rough energy worth, in terms of
         # the XP they effectively provide.
-        energy_return_per_energy = ((reward_rare_champ_weight/reward_total_weight / energy_cost) * (47+1/3) +
-                                    (reward_uncommmon_champ_weight/reward_total_weight / energy_cost) * (7+1/3) +
-                                    (reward_shard_weight / reward_total_weight * reward_shard_quantity / energy_cost) *
-                                    2.452)
-
-        # Wrap it all up
-        print(f"Energy cost: {energy_cost} " +
-              f"XP per food champ (2x): {reward_xp / 2.0} " +
-              f"Commons: {reward_commmon_champ_weight/reward_total_weight} " +
-              f"Uncommons: {reward_uncommmon_champ_weight/reward_total_weight} " +
-              f"Rares: {reward_rare_champ_weight/reward_total_weight} " +
-              f"Silver: {raw_silver_reward + item_sell_expected_value} " +
-              f"Shards: {reward_shard_weight/reward_total_weight * reward_shard_quantity}")
-
-        # "id", "xp/e", "com/e", "unc/e", "rare/e", "silver/e", "shard/e", "e/e", "real xp/e"
-        result_df.loc[readable_id] = [readable_id,
-                                      reward_xp / 2.0 / energy_cost,
-                                      reward_commmon_champ_weight/reward_total_weight / energy_cost,
-                                      reward_uncommmon_champ_weight/reward_total_weight / energy_cost,
-                                      reward_rare_champ_weight/reward_total_weight / energy_cost,
-                                      (raw_silver_reward + item_sell_expected_value) / energy_cost,
-                                      reward_shard_weight / reward_total_weight * reward_shard_quantity / energy_cost,
-                                      energy_return_per_energy,
-                                      reward_xp / 2.0 / (energy_cost-energy_return_per_energy)
-                                      ]
-
-    result_df.to_csv("raid_campaign_farming_data.csv")
+        energy_return_per_energy = ((reward_chances[:, 4] / per_energy_cost) * (47+1/3) +
+                                    (reward_chances[:, 3] / per_energy_cost) * (7+1/3) +
+                                    (shards / per_energy_cost) * 2.452)
+
+        result_df = pd.DataFrame({
+            "id": stage_rewards["readable_id"],
+            "xp/e": hero_xp / per_energy_cost,
+            "com/e": reward_chances[:, 2] / per_energy_cost,
+            "unc/e": reward_chances[:, 3] / per_energy_cost,
+            "rare/e": reward_chances[:, 4] / per_energy_cost,
+            "silver/e": silver / per_energy_cost,
+            "shard/e": shards / per_energy_cost,
+            "e return/e": energy_return_per_energy,
+            "real xp/e": hero_xp / (per_energy_cost - energy_return_per_energy),
+            "energy": energy_cost,
+            "xp/run": hero_xp,
+            "com/run": reward_chances[:, 2],
+            "unc/run": reward_chances[:, 3],
+            "rare/run": reward_chances[:, 4],
+            "silver/run": silver,
+            "shard/run": shards,
+        }, index=pd.Index(stage_rewards["readable_id"]))
+
+    return result_df
+
+
+@timed("campaign_drop_info")
+def campaign_drop_info(data):
+    """
+    Analyzes drop rates for rewards of all campaign stages, outputs a CSV with information on expected returns per
+    run and per point of energy spent.
+
+    :param data: static_data['StageData']['Stages']
+    :return: Nothing. Writes result to "raid_campaign_farming_data.csv". Logs every stage's returns at DEBUG level.
+    """
+
+    stage_rewards = normalize_stage_rewards(data)
+    result_df = campaign_stage_metrics(stage_rewards)
+    RUN_STATS.count("campaign_stages", len(result_df))
+
+    # Wrap it all up. Formatting every stage takes longer than working them out, so only if anyone's listening.
+    if not logger.isEnabledFor(logging.DEBUG):
+        write_campaign_farming_csv(result_df)
+        return
+    per_run = result_df[["energy", "xp/run", "com/run", "unc/run", "rare/run", "silver/run", "shard/run"]]
+    for zone, substage, difficulty, (energy_cost, xp, commons, uncommons, rares, silver, shards) in \
+            zip(stage_rewards["zone"], stage_rewards["substage"], stage_rewards["difficulty"],
+                per_run.itertuples(index=False)):
+        logger.debug(f"\nZone {zone} Stage {substage} {difficulty}")
+        logger.debug(f"Energy cost: {energy_cost} " +
+                     f"XP per food champ (2x): {xp} " +
+                     f"Commons: {commons} " +
+                     f"Uncommons: {uncommons} " +
+                     f"Rares: {rares} " +
+                     f"Silver: {silver} " +
+                     f"Shards: {shards}")
+
+    write_campaign_farming_csv(result_df)
+
+
+@timed("stage_drop_info")
+def stage_drop_info(data, decoders=STAGE_DECODERS, sort_by="real xp/e"):
+    """
+    Expected returns of every stage in every area (campaign, dungeons, faction crypts, Doom Tower...) in one go,
+    ranked by how much they give per energy. Outputs a CSV.
+
+    :param data: static_data['StageData']['Stages']
+    :param decoders: StageDecoders of the families of stages to include
+    :param sort_by: Column of campaign_stage_metrics to rank by, best first
+    :return: The ranked DataFrame, with "area", "zone", "difficulty" and "substage" columns in front of the metrics.
+             Also written to "raid_stage_farming_data.csv".
+    """
+    stage_rewards = normalize_stage_rewards(data, decoders)
+    result_df = campaign_stage_metrics(stage_rewards)
+    for position, key in enumerate(["area", "zone", "difficulty", "substage"], 1):
+        result_df.insert(position, key, stage_rewards[key])
+
+    # Same stage listed twice? Last one wins.
+    result_df = result_df[~result_df.index.duplicated(keep="last")]
+    result_df = result_df.sort_values(sort_by, ascending=False, kind="stable")
+    result_df.to_csv("raid_stage_farming_data.csv")
+    return result_df
+
+
+def write_campaign_farming_csv(result_df):
+    """
+    :param result_df: Stage metrics, as from campaign_stage_metrics
+    :return: Nothing. Writes the CAMPAIGN_FARMING_COLUMNS to "raid_campaign_farming_data.csv"
+    """
+    # Same stage listed twice? Last one wins.
+    result_df = result_df[~result_df.index.duplicated(keep="last")]
+    result_df[CAMPAIGN_FARMING_COLUMNS].to_csv("raid_campaign_farming_data.csv")
+
+
+def build_sell_price_tensor():
+    """
+    Work out the sell price of every possible artifact up front, from ARTIFACT_SET_BASE_PRICES and the ITEM_*
+    multiplier tables.
+
+    :return: Array of sell prices, indexed [set, kind, rank, rarity] (all 0-based), i.e. shaped 42 x 9 x 6 x 5
+    """
+    set_prices = np.array(ARTIFACT_SET_BASE_PRICES, dtype=float)
+    kind_multipliers = np.array(ITEM_TYPE_VALUE_MULTIPLIERS)
+    rank_multipliers = np.array(ITEM_RANK_VALUE_MULTIPLIERS) * np.array(ITEM_RANK_SELL_VALUE_MULTIPLIERS)
+    rarity_multipliers = np.array(ITEM_RARITY_VALUE_MULTIPLIERS)
+    return set_prices[:, None, None, None] * kind_multipliers[None, :, None, None] * \
+        rank_multipliers[None, None, :, None] * rarity_multipliers[None, None, None, :]
+
+
+# Sell price of every artifact, indexed [set, kind, rank, rarity]. See build_sell_price_tensor.
+ARTIFACT_SELL_PRICES = build_sell_price_tensor()
+
+
+def expected_sell_values(probabilities, item_sets, item_kinds):
+    """
+    Expected sell value of an artifact drop, for any number of drops at once. Works for any source of artifacts
+    (campaign, dungeons, faction wars...) given their rank/rarity probabilities.
+
+    :param probabilities: Stack of 6 x 5 rank/rarity probability matrices, shaped n x 6 x 5. Each should sum to the
+                          chance of an artifact dropping at all (1 if it's a guaranteed drop).
+    :param item_sets: Either n 0-based artifact set indices, or an n x 42 array of probabilities of each set
+    :param item_kinds: Either n 0-based artifact kind (e.g. shield, helmet) indices, or an n x 9 array of
+                       probabilities of each kind
+    :return: Array of n expected sell values
+    """
+    return np.einsum("nrc,nrc->n", np.asarray(probabilities), artifact_sell_prices(item_sets, item_kinds))
+
+
+def artifact_sell_prices(item_sets, item_kinds):
+    """
+    :param item_sets: See expected_sell_values
+    :param item_kinds: See expected_sell_values
+    :return: Sell prices of each rank/rarity for each drop's set and kind (n x 6 x 5). Straight lookup when the set
+             and kind are known, otherwise averaged over the set and kind probabilities.
+    """
+    item_sets = np.asarray(item_sets)
+    item_kinds = np.asarray(item_kinds)
+
+    if item_sets.ndim == 1 and item_kinds.ndim == 1:
+        prices = ARTIFACT_SELL_PRICES[item_sets, item_kinds]
+    elif item_sets.ndim == 1:
+        prices = np.einsum("nk,nkrc->nrc", item_kinds, ARTIFACT_SELL_PRICES[item_sets])
+    elif item_kinds.ndim == 1:
+        prices = np.einsum("ns,nsrc->nrc", item_sets, ARTIFACT_SELL_PRICES[:, item_kinds].swapaxes(0, 1))
+    else:
+        prices = np.einsum("ns,nk,skrc->nrc", item_sets, item_kinds, ARTIFACT_SELL_PRICES, optimize=True)
+    return prices
 
 
 def calculate_expected_sell_value(probabilities, item_set, item_type):
@@ -502,127 +1875,529 @@ def calculate_expected_sell_value(probabilities, item_set, item_type):
 
     # Probability matrix should have 6 rows, 5 columns since there are 6 ranks and 5 rarities
 
-    values = ARTIFACT_SET_BASE_PRICES[item_set] * probabilities * ITEM_TYPE_VALUE_MULTIPLIERS[item_type]
-    for i in range(len(values)):
-        for j in range(len(values[i])):
-            values[i][j] = values[i][j] *\
-                           ITEM_RARITY_VALUE_MULTIPLIERS[j] *\
-                           ITEM_RANK_VALUE_MULTIPLIERS[i] *\
-                           ITEM_RANK_SELL_VALUE_MULTIPLIERS[i]
-    return np.sum(values)
+    return expected_sell_values(np.asarray(probabilities)[None], [item_set], [item_type])[0]
+
+
+# Columns of champ_basic_info.csv
+CHAMP_INFO_COLUMNS = ["id", "name", "rarity", "affinity", "role", "faction",
+                      "hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc",
+                      "aura_stat", "aura_amt", "aura_area", "aura_affinity",
+                      "champ_status", "released", "hidden_name"  # , "cr_heal"
+                      ]
+
+# Columns of champ_moves_basic.csv
+CHAMP_BASICS_COLUMNS = [
+    "champ_name", "rarity", "affinity", "role", "faction",
+    "hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc",
+    "aura_stat", "aura_amt", "aura_area", "aura_affinity",
+    "skill_index", "skill_name", "skill_cd_booked", "skill_cd_unbooked",
+    "skill_desc", "book_effects", "multiplier(s)",
+    "skill_name_hidden", "skill_desc_hidden",
+    "champ_status", "released", "hidden_name"  # , "cr_heal"
+]
+
+# Columns of champ_move_details.csv
+CHAMP_MOVE_COLUMNS = ["id", "name", "rarity", "affinity", "role", "faction",
+
+                      "skill_index", "skill_name", "skill_cd_booked", "skill_cd_unbooked",
+                      "skill_desc", "book_effects", "multiplier", "num_hits",
+                      "book_dmg_mul", "book_heal_mul", "book_shield_mul",
+                      "calculated_damage", "damage_per_turn",
+                      "status_type", "status_duration", "cd_minus_duration",
+                      "effect_chance_booked", "effect_chance_unbooked",
+                      "target_type", "target_type_code",
+                      "effect_type_desc", "effect_type_code", "effect_id",
+                      "skill_name_hidden", "skill_desc_hidden", "skill_id",
+
+                      "hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc",
+                      "aura_stat", "aura_amt", "aura_area", "aura_affinity",
+                      "champ_status", "released", "hidden_name"  # , "cr_heal"
+                      ]
 
+# Columns of champ_basic_info, champ_move_details and champ_moves_basic that hold localized text. The rest come out
+# the same in every language.
+CHAMP_LOCALIZED_COLUMNS = (["name"], ["name", "skill_name", "skill_desc"], ["champ_name", "skill_name", "skill_desc"])
 
-def champ_abilities_and_multipliers(data):
+# Entries kept by each of a SkillMemo's caches
+SKILL_MEMO_SIZE = 4096
+
+# Color tags stripped from skill descriptions
+_DESCRIPTION_COLOR_TAGS = ["<color=#1ee600>", "<color=#F3BC02>", "<color=#E85CFC>", "</color>"]
+
+
+class LRUCache:
+    """
+    dict with a size limit. Once it's full, adding an entry drops the one that was used longest ago.
     """
-    Output way too much data on champs and their moves... but still not all of it.
-    Writes to csv's.
-    (As a side note, it bothers me so that the plural of an acronym requires an apostrophe. It just feels so dirty.)
 
-    :param data: static data json object
-    :return: nothing
+    def __init__(self, maxsize, name):
+        """
+        :param maxsize: Most entries to keep
+        :param name: Hits and misses are counted in RUN_STATS as "<name>_hits" and "<name>_misses"
+        """
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._hits = f"{name}_hits"
+        self._misses = f"{name}_misses"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        :return: Entry for key, or None if there isn't one
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            RUN_STATS.count(self._misses)
+        else:
+            RUN_STATS.count(self._hits)
+            self._entries.move_to_end(key)
+        return entry
+
+    def __setitem__(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _decode_skill_code(name, code, unknown):
+    # Decode a code, noting it in unknown if the decoder doesn't know it
+    decoder = CODE_DECODERS[name]
+    if code not in decoder:
+        unknown.append((name, code))
+    return decoder.decode(code)
+
+
+def _clean_skill_description(skill_desc):
+    # One line, without the text color tags
+    skill_desc = skill_desc.replace("\\r", " ").replace("\\n", " ").replace("\r", " ").replace("\n", " ")
+    for tag in _DESCRIPTION_COLOR_TAGS:
+        skill_desc = skill_desc.replace(tag, "")
+    return skill_desc
+
+
+class _LocalizationKeys:
+    """
+    Stands in for a localization map, handing back the keys themselves instead of their text. Champ rows worked out
+    with it have localization keys in their CHAMP_LOCALIZED_COLUMNS, for _localize_columns to fill in per language.
     """
 
-    # Create dict for quickly locating skill info
-    skill_data_by_id = {}
-    for skill in data["SkillData"]["SkillTypes"]:
-        skill_data_by_id[skill.get("Id")] = skill
+    def get(self, key, default=None):
+        return key
 
-    # Initialize
-    champ_info_df = pd.DataFrame(columns=["id", "name", "rarity", "affinity", "role", "faction",
-                                          "hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc",
-                                          "aura_stat", "aura_amt", "aura_area", "aura_affinity",
-                                          "champ_status", "released", "hidden_name"  # , "cr_heal"
-                                          ])
-
-    # Initialize
-    basics_df = pd.DataFrame(columns=[
-        "champ_name", "rarity", "affinity", "role", "faction",
-        "hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc",
-        "aura_stat", "aura_amt", "aura_area", "aura_affinity",
-        "skill_index", "skill_name", "skill_cd_booked", "skill_cd_unbooked",
-        "skill_desc", "book_effects", "multiplier(s)",
-        "skill_name_hidden", "skill_desc_hidden",
-        "champ_status", "released", "hidden_name"  # , "cr_heal"
-    ])
-
-    # Initialize
-    champ_move_df = pd.DataFrame(columns=["id", "name", "rarity", "affinity", "role", "faction",
-
-                                          "skill_index", "skill_name", "skill_cd_booked", "skill_cd_unbooked",
-                                          "skill_desc", "book_effects", "multiplier", "num_hits",
-                                          "book_dmg_mul", "book_heal_mul", "book_shield_mul",
-                                          "calculated_damage", "damage_per_turn",
-                                          "status_type", "status_duration", "cd_minus_duration",
-                                          "effect_chance_booked", "effect_chance_unbooked",
-                                          "target_type", "target_type_code",
-                                          "effect_type_desc", "effect_type_code", "effect_id",
-                                          "skill_name_hidden", "skill_desc_hidden", "skill_id",
-
-                                          "hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc",
-                                          "aura_stat", "aura_amt", "aura_area", "aura_affinity",
-                                          "champ_status", "released", "hidden_name"  # , "cr_heal"
-                                          ])
-
-    # Here goes nothing
-    for champ in data["HeroData"]["HeroTypes"]:
-        if not (champ.get("Id") % 10 == 6 or champ.get("Rarity") == 1) or not(champ.get("Fraction")):
-            # Skip not-fully-ascended champs, common champs, factionless (i.e. non-playable) champs
-            # Champs without factions seem to be bosses and NPCs.
-            continue
 
-        # Get localized name and default internal name
-        champ_name = data.get("StaticDataLocalization").get(champ.get("Name").get("Key"))
-        champ_name_hidden = champ.get("Name").get("DefaultValue")
-
-        # Get basic info, map it to something human-friendly
-        champ_rarity = CHAMP_RARITIES[champ.get("Rarity")]
-        champ_affinity = AFFINITIES[champ.get("Element")]
-        champ_type = CHAMP_TYPES[champ.get("Role")]
-        champ_faction = FACTIONS[champ.get("Fraction")]
-
-        # The "status" value seems to be related to whether or not a champ is in development.
-        # 40 = champ is visible/playable. Shows up in champ Index.
-        # 35 = champ not yet visible in game. Has all names and descriptions; seems like it just needs to be "turned on"
-        # 30, 10 = seems farther from release, may be missing names and descriptions.
-        champ_status = champ.get("Status")
-
-        # Get aura info
-        champ_aura_info = champ.get("LeaderSkill")
-        champ_aura_stat = STAT_TYPES[champ_aura_info.get("StatKindId") - 1] if champ_aura_info else ""
-        champ_aura_amt = champ_aura_info.get("Amount") / 4294967296 if champ_aura_info else ""
-        if champ_aura_info and champ_aura_info.get("isAbsolute") == 0:
-            champ_aura_amt *= 100
-        if champ_aura_info and champ_aura_info.get("Element"):
-            champ_aura_affinity = AFFINITIES[champ_aura_info.get("Element")]
+def _localize_columns(columns_data, localized_columns, localization):
+    """
+    :param columns_data: RowAccumulator.columns_data() of rows worked out with _LocalizationKeys
+    :param localized_columns: The columns holding localization keys
+    :param localization: Localization map of the language to fill in
+    :return: columns_data with the keys in localized_columns replaced by their text. Other columns are shared with
+             the input, not copied.
+    """
+    columns, data = columns_data
+    data = dict(data)
+    for column in localized_columns:
+        # Each key is looked up once, however many rows it's on
+        texts = {}
+        for key in data[column]:
+            if key not in texts:
+                text = localization.get(key)
+                if column == "skill_desc" and text is not None:
+                    text = _clean_skill_description(text)
+                texts[key] = text
+        data[column] = [texts[key] for key in data[column]]
+    return columns, data
+
+
+def _summarize_skill(skill_id, skill_data, localization):
+    """
+    Work out everything about a skill that doesn't depend on the champ: names, descriptions, cooldowns, book bonuses
+    and the columns of each of its effects.
+
+    :return: dict of "columns" (skill columns shared by all its rows), "multipliers" (for champ_moves_basic), "effects"
+             (list of (effect columns, status columns, formula, hit count, book multiplier column)) and
+             "unknown_codes" (list of (decoder name, code) decoded along the way that the decoders didn't know)
+    """
+    # Initialize book bonuses
+    book_damage_multiplier = 1.0
+    book_heal_multiplier = 1.0
+    book_shield_multiplier = 1.0
+    book_effect_increase = 0.0
+    book_cdr = 0
+
+    # Get basic skill info - names, descriptions, etc
+    columns = {
+        "skill_name": localization.get(skill_data.get("Name").get("Key")),
+        "skill_name_hidden": skill_data.get("Name").get("DefaultValue"),
+        "skill_desc": _clean_skill_description(localization.get(skill_data.get("Description").get("Key"))),
+        "skill_desc_hidden": skill_data.get("Description").get("DefaultValue").
+        replace("\\r", " ").replace("\\n", " ").replace("\r", " ").replace("\n", " "),
+    }
+
+    # Get unbooked CD
+    skill_cooldown = skill_data.get("Cooldown")
+    columns["skill_cd_unbooked"] = skill_cooldown
+
+    book_increase_descriptions = []
+    for book in skill_data.get("SkillLevelBonuses", []):
+
+        if book.get("SkillBonusType") == 0:  # Damage
+            increase = book.get("Value") / 4294967296
+            book_damage_multiplier += increase
+            book_increase_descriptions.append(f"+{round(increase*100)}% Damage")
+
+        elif book.get("SkillBonusType") == 1:  # Heal
+            increase = book.get("Value") / 4294967296
+            book_heal_multiplier += increase
+            book_increase_descriptions.append(f"+{round(increase*100)}% Heal")
+
+        elif book.get("SkillBonusType") == 2:  # Effect chance
+            increase = book.get("Value") / 4294967296
+            book_effect_increase += increase
+            book_increase_descriptions.append(f"+{round(increase*100)}% Buff/Debuff Chance")
+
+        elif book.get("SkillBonusType") == 3:  # Cooldown
+            decrease = book.get("Value") / 4294967296
+            book_cdr += decrease
+            book_increase_descriptions.append(f"-{int(round(decrease))} Cooldown")
+
+        elif book.get("SkillBonusType") == 4:  # Shield. Recently split off from Heal/Shield.
+            increase = book.get("Value") / 4294967296
+            book_shield_multiplier += increase
+            book_increase_descriptions.append(f"+{round(increase*100)}% Shield")
+
+        elif book.get("SkillBonusType"):
+            # This shouldn't happen, but it'd be very interesting if it did...
+            logger.warning(f"Non standard book effect {repr(book.get('SkillBonusType'))} found for skill ID "
+                           f"{skill_id}")
+
+    # Get aggregate effects of skill increases
+    booked_cooldown = skill_cooldown - round(book_cdr)
+    columns["skill_cd_booked"] = booked_cooldown
+    columns["book_effects"] = ", ".join(book_increase_descriptions)
+    columns["book_dmg_mul"] = round(book_damage_multiplier, 2)
+    columns["book_heal_mul"] = round(book_heal_multiplier, 2)
+    columns["book_shield_mul"] = round(book_shield_multiplier, 2)
+
+    # Make list of multipliers for condensed view
+    multipliers = []
+    effects = []
+    unknown = []
+    for effect in skill_data.get("Effects", []):
+        # Get target type. This indicates which champs are affected.
+        target_type_ind = effect.get('TargetParams').get('TargetType', None)
+        target_type = _decode_skill_code("target", target_type_ind, unknown)
+        if target_type_ind not in CODE_DECODERS["target"]:
+            # We're breaking new ground!
+            target_type = str(target_type_ind)
+
+        ###
+
+        # Dead code, ew.
+        # This is from when I was first writing this and only interested in AoE damage statistics.
+        # Here for posterity's sake.
+        # From humble beginnings.
+
+        # if effect.get('MultiplierFormula'):
+        #     print(f"MULTIPLIER: ({effect.get('MultiplierFormula', 0)}) * {effect.get('Count', 1)}")
+        # print(f"TARGET: {target_type}")
+        # if target_type_ind == 8 and effect.get('MultiplierFormula'):
+        #     formula = effect.get('MultiplierFormula')
+        #     formatted_formula = formula.replace("HP", str(int(champ_hp))).\
+        #         replace("ATK", str(int(champ_atk))).\
+        #         replace("DEF", str(int(champ_def)))
+        #     formatted_formula_complete = f"({formatted_formula})" +\
+        #                                  f"*{effect.get('Count', 1)}" +\
+        #                                  f"*{round(book_damage_multiplier,2)}"
+        #     try:
+        #         result = eval(parser.expr(formatted_formula_complete).compile())
+        #         print(f"{formatted_formula_complete} = {result}")
+        #         print(f"{champ_name},{champ_rarity},{champ_affinity},A{skill_index},{round(result,3)}" +
+        #               f",{formatted_formula_complete},{formula}," +
+        #               f"{skill_cooldown - round(book_cdr)},\"{skill_desc}\"")
+        #     except:
+        #         print(f"Could not parse multiplier formula: {formatted_formula}")
+        #         pass
+
+        ###
+
+        # Effect KindId tells what the skill does. See the module level constant EFFECT_TYPES for details.
+        effect_kind = effect.get("KindId", None)
+        effect_columns = {
+            "target_type_code": target_type_ind,
+            "effect_id": effect.get("Id", None),
+            "target_type": target_type,
+            "multiplier": "'" + effect.get('MultiplierFormula', ""),
+            "num_hits": effect.get("Count", 1),
+            "effect_type_desc": _decode_skill_code("kind", effect_kind, unknown),
+            "effect_type_code": effect_kind,
+        }
+
+        if effect.get('MultiplierFormula'):
+            multipliers.append(effect.get('MultiplierFormula'))
+
+        # Add chance of bonus effect, if applicable
+        if effect.get("Chance"):
+            effect_columns["effect_chance_unbooked"] = round(effect.get("Chance") / (2**32), 2)
+            effect_columns["effect_chance_booked"] = round(effect.get("Chance") / (2**32) + book_effect_increase, 2)
         else:
-            champ_aura_affinity = "All"
-        if champ_aura_info and champ_aura_info.get("Area"):
-            champ_aura_area = AURA_AREAS[champ_aura_info.get("Area")]
+            effect_columns["effect_chance_unbooked"] = 1.00
+            effect_columns["effect_chance_booked"] = 1.00
+
+        # Get info on the buff or debuff that is applied, if applicable. One row per status, or one for the effect.
+        statuses = None
+        if effect.get("ApplyStatusEffectParams"):
+            statuses = [{"status_type": _decode_skill_code("status", status.get("TypeId"), unknown),
+                         "status_duration": status.get("Duration"),
+                         "cd_minus_duration": booked_cooldown - status.get("Duration")}
+                        for status in effect.get("ApplyStatusEffectParams").get("StatusEffectInfos")]
+
+        # Damage, heal and shield effects are boosted by the matching books, other effects aren't
+        effects.append((effect_columns, statuses, effect.get('MultiplierFormula'), effect.get('Count', 1),
+                        EFFECT_BOOK_MULTIPLIERS.get(effect_kind)))
+
+    return {"columns": columns, "multipliers": ", ".join(multipliers), "effects": effects, "unknown_codes": unknown}
+
+
+def _evaluate_skill_multipliers(skill, formula_variables):
+    """
+    :param skill: Output of _summarize_skill
+    :param formula_variables: The champ's formula variables
+    :return: List with, for each effect of the skill, a dict of its calculated_damage and damage_per_turn columns.
+             Effects without a formula get an empty dict, ones whose formula couldn't be worked out a blank damage.
+    """
+    results = []
+    # Timed per skill rather than per formula, so timing doesn't cost more than the formulas do
+    with RUN_STATS.phase("formula_eval"):
+        for effect_columns, statuses, formula, count, book_column in skill["effects"]:
+            if not formula:
+                results.append({})
+                continue
+
+            try:
+                # Formulas are parsed once and cached, then just evaluated against this champ's stats
+                result = compile_formula(formula).evaluate(formula_variables) * count
+                if book_column:
+                    result = result * skill["columns"][book_column]
+                # Get damage (or healing etc) per turn using booked cooldown
+                results.append({"calculated_damage": round(result, 2),
+                                "damage_per_turn": round(result/(max(skill["columns"]["skill_cd_booked"], 1)), 2)})
+            except FormulaError as e:
+                # Encountered some nonstandard multiplier, usually one that depends on the state of the
+                # battle (e.g. the target's HP).
+                logger.debug(f"Could not calculate multiplier formula: {e}")
+                RUN_STATS.count("formula_failures")
+                results.append({"calculated_damage": None})
+            except ArithmeticError as e:
+                logger.debug(f"Could not calculate multiplier formula {formula!r}: {e}")
+                RUN_STATS.count("formula_failures")
+                results.append({"calculated_damage": None})
+    return results
+
+
+class SkillMemo:
+    """
+    Remembers what _add_champ_rows works out for each skill, so a skill that comes up again (a champ's variants share
+    skills, and repeated exports see every one again) costs a dict lookup rather than another pass over its books,
+    descriptions and effects.
+
+    Everything that doesn't depend on the champ is kept by skill ID. Multiplier results also depend on the champ's
+    stats, so they're kept by (skill ID, formula variables). Both caches are LRU, with at most maxsize entries each.
+
+    Entries are only valid for the static data and localization they were worked out from, so use a new memo for
+    different ones.
+    """
+
+    def __init__(self, maxsize=SKILL_MEMO_SIZE):
+        self.skills = LRUCache(maxsize, "skill_memo")
+        self.multipliers = LRUCache(maxsize, "multiplier_memo")
+
+    def skill(self, skill_id, skill_data_by_id, localization):
+        """
+        :return: _summarize_skill output for the skill
+        """
+        skill = self.skills.get(skill_id)
+        if skill is None:
+            skill = _summarize_skill(skill_id, skill_data_by_id.get(skill_id), localization)
+            self.skills[skill_id] = skill
+        else:
+            # Count unknown codes the same as if they'd been decoded again
+            for name, code in skill["unknown_codes"]:
+                CODE_DECODERS[name].unknown_counts[code] += 1
+        return skill
+
+    def skill_multipliers(self, skill_id, skill, formula_variables, variables_key):
+        """
+        :param variables_key: Hashable form of formula_variables, e.g. a tuple of its items
+        :return: _evaluate_skill_multipliers output for the skill and formula variables
+        """
+        key = (skill_id, variables_key)
+        results = self.multipliers.get(key)
+        if results is None:
+            results = _evaluate_skill_multipliers(skill, formula_variables)
+            self.multipliers[key] = results
         else:
-            champ_aura_area = "All Battles"
-
-        # Get base stats, before dividing
-        raw_hp = champ.get("BaseStats").get("Health")
-        raw_atk = champ.get("BaseStats").get("Attack")
-        raw_def = champ.get("BaseStats").get("Defence")
-
-        # print(f'{champ_name},{raw_hp},{raw_atk},{raw_def}')
-
-        # Get base stats
-        champ_hp = raw_hp / 26004993.4368775  # Divisors here estimated using several dozen champs.
-        champ_atk = raw_atk / 390018709.167108  # Should be within 0.001% of actual value or so.
-        champ_def = raw_def / 390018709.167108  # Probably safe to round to the millions.
-        champ_spd = champ.get("BaseStats").get("Speed") / 4294967296.  # Note: divisor is 2^32
-        champ_res = champ.get("BaseStats").get("Resistance") / 4294967296.
-        champ_acc = champ.get("BaseStats").get("Accuracy") / 4294967296.
-        champ_crch = champ.get("BaseStats").get("CriticalChance") / 4294967296.
-        champ_cd = champ.get("BaseStats").get("CriticalDamage") / 4294967296.
-        # champ_cr_heal = champ.get("BaseStats").get("CriticalHeal") / 4294967296.  # Always 50. BOOORINGGGG.
-
-        # Make our row
-        this_champ = {
-            "id": champ.get("Id"),
-            "name": champ_name,
+            # Still count formulas that couldn't be worked out once per effect row, as if they'd been tried again
+            failures = sum(1 for result in results if "calculated_damage" in result and
+                           result["calculated_damage"] is None)
+            if failures:
+                RUN_STATS.count("formula_failures", failures)
+        return results
+
+    def clear(self):
+        self.skills.clear()
+        self.multipliers.clear()
+
+
+def _add_champ_rows(champ, skill_data_by_id, localization, extra_formula_variables, batch_multipliers,
+                   champ_info_rows, champ_move_rows, basics_rows, skill_memo=None):
+    """
+    Work out every row one champ contributes to the three champ tables.
+
+    :param champ: Hero record from static_data["HeroData"]["HeroTypes"]
+    :param skill_data_by_id: dict of skill ID -> skill record
+    :param localization: Localization map, anything with a .get(key)
+    :param extra_formula_variables: See champ_abilities_and_multipliers
+    :param batch_multipliers: See champ_abilities_and_multipliers
+    :param champ_info_rows: RowAccumulator for champ_basic_info.csv
+    :param champ_move_rows: RowAccumulator for champ_move_details.csv
+    :param basics_rows: RowAccumulator for champ_moves_basic.csv
+    :param skill_memo: SkillMemo to look skills up in. Pass the same one for every champ, so skills are only worked out
+                       once. A new one if not given.
+    """
+    if skill_memo is None:
+        skill_memo = SkillMemo()
+    if not (champ.get("Id") % 10 == 6 or champ.get("Rarity") == 1) or not(champ.get("Fraction")):
+        # Skip not-fully-ascended champs, common champs, factionless (i.e. non-playable) champs
+        # Champs without factions seem to be bosses and NPCs.
+        RUN_STATS.count("heroes_skipped")
+        return
+    RUN_STATS.count("heroes_processed")
+
+    # Get localized name and default internal name
+    champ_name = localization.get(champ.get("Name").get("Key"))
+    champ_name_hidden = champ.get("Name").get("DefaultValue")
+
+    # Get basic info, map it to something human-friendly
+    champ_rarity = CODE_DECODERS["rarity"].decode(champ.get("Rarity"))
+    champ_affinity = CODE_DECODERS["affinity"].decode(champ.get("Element"))
+    champ_type = CODE_DECODERS["role"].decode(champ.get("Role"))
+    champ_faction = CODE_DECODERS["faction"].decode(champ.get("Fraction"))
+
+    # The "status" value seems to be related to whether or not a champ is in development.
+    # 40 = champ is visible/playable. Shows up in champ Index.
+    # 35 = champ not yet visible in game. Has all names and descriptions; seems like it just needs to be "turned on"
+    # 30, 10 = seems farther from release, may be missing names and descriptions.
+    champ_status = champ.get("Status")
+
+    # Get aura info
+    champ_aura_info = champ.get("LeaderSkill")
+    champ_aura_stat = CODE_DECODERS["aura_stat"].decode(champ_aura_info.get("StatKindId")) if champ_aura_info else ""
+    champ_aura_amt = champ_aura_info.get("Amount") / 4294967296 if champ_aura_info else ""
+    if champ_aura_info and champ_aura_info.get("isAbsolute") == 0:
+        champ_aura_amt *= 100
+    if champ_aura_info and champ_aura_info.get("Element"):
+        champ_aura_affinity = CODE_DECODERS["affinity"].decode(champ_aura_info.get("Element"))
+    else:
+        champ_aura_affinity = "All"
+    if champ_aura_info and champ_aura_info.get("Area"):
+        champ_aura_area = CODE_DECODERS["aura_area"].decode(champ_aura_info.get("Area"))
+    else:
+        champ_aura_area = "All Battles"
+
+    # Get base stats, before dividing
+    raw_hp = champ.get("BaseStats").get("Health")
+    raw_atk = champ.get("BaseStats").get("Attack")
+    raw_def = champ.get("BaseStats").get("Defence")
+
+    # print(f'{champ_name},{raw_hp},{raw_atk},{raw_def}')
+
+    # Get base stats
+    champ_hp = raw_hp / 26004993.4368775  # Divisors here estimated using several dozen champs.
+    champ_atk = raw_atk / 390018709.167108  # Should be within 0.001% of actual value or so.
+    champ_def = raw_def / 390018709.167108  # Probably safe to round to the millions.
+    champ_spd = champ.get("BaseStats").get("Speed") / 4294967296.  # Note: divisor is 2^32
+    champ_res = champ.get("BaseStats").get("Resistance") / 4294967296.
+    champ_acc = champ.get("BaseStats").get("Accuracy") / 4294967296.
+    champ_crch = champ.get("BaseStats").get("CriticalChance") / 4294967296.
+    champ_cd = champ.get("BaseStats").get("CriticalDamage") / 4294967296.
+    # champ_cr_heal = champ.get("BaseStats").get("CriticalHeal") / 4294967296.  # Always 50. BOOORINGGGG.
+
+    # Values for multiplier formulas. Stats are rounded, same as what's shown in game.
+    formula_variables = dict(FORMULA_DEFAULT_VARIABLES, **(extra_formula_variables or {}))
+    formula_variables.update(HP=round(champ_hp), ATK=round(champ_atk), DEF=round(champ_def))
+    variables_key = tuple(sorted(formula_variables.items()))
+
+    # Make our row
+    this_champ = {
+        "id": champ.get("Id"),
+        "name": champ_name,
+        "rarity": champ_rarity,
+        "affinity": champ_affinity,
+        "role": champ_type,
+        "faction": champ_faction,
+        "hp": round(champ_hp),
+        "atk": round(champ_atk),
+        "def": round(champ_def),
+        "spd": round(champ_spd),
+        "cr_rate": round(champ_crch),
+        "cr_dmg": round(champ_cd),
+        "res": round(champ_res),
+        "acc": round(champ_acc),
+        "aura_stat": champ_aura_stat,
+        "aura_amt": "" if isinstance(champ_aura_amt, str) else round(champ_aura_amt, 2),
+        "aura_area": champ_aura_area if (champ_aura_stat != "") else "",
+        "aura_affinity": champ_aura_affinity if (champ_aura_stat != "") else "",
+        "hidden_name": champ_name_hidden,
+        "champ_status": champ_status,
+        "released": "Y" if champ_status == 40 else "N",
+        # "cr_heal": champ_cr_heal
+    }
+
+    # Add row for champ to basic champ info DF
+    champ_info_rows.append(this_champ)
+
+    # Get skill info for current champ
+    skill_index = 0
+    for skill_id in champ.get("SkillTypeIds"):
+
+        this_champ_move = dict(this_champ)
+
+        skill_index += 1  # A1, A2, A3, etc.
+        this_champ_move["skill_index"] = "A" + str(skill_index)
+        this_champ_move["skill_id"] = skill_id
+
+        # Everything about the skill that doesn't depend on the champ, worked out once per skill
+        skill = skill_memo.skill(skill_id, skill_data_by_id, localization)
+        this_champ_move.update(skill["columns"])
+        if not batch_multipliers:
+            multiplier_results = skill_memo.skill_multipliers(skill_id, skill, formula_variables, variables_key)
+
+        # Add a row for each effect
+        RUN_STATS.count("skills")
+        RUN_STATS.count("effects", len(skill["effects"]))
+        for effect_number, (effect_columns, statuses, *_) in enumerate(skill["effects"]):
+
+            this_champ_effect = dict(this_champ_move)
+            this_champ_effect.update(effect_columns)
+            if not batch_multipliers:
+                this_champ_effect.update(multiplier_results[effect_number])
+
+            if statuses is not None:
+                for status in statuses:
+                    this_champ_effect.update(status)
+                    champ_move_rows.append(this_champ_effect)
+            else:
+                champ_move_rows.append(this_champ_effect)
+
+        # Add row to basics df
+        new_row = {
+            "champ_name": champ_name,
             "rarity": champ_rarity,
             "affinity": champ_affinity,
             "role": champ_type,
@@ -642,289 +2417,361 @@ def champ_abilities_and_multipliers(data):
             "hidden_name": champ_name_hidden,
             "champ_status": champ_status,
             "released": "Y" if champ_status == 40 else "N",
-            # "cr_heal": champ_cr_heal
+
+            "skill_index": "A" + str(skill_index),
+            "skill_name": skill["columns"]["skill_name"],
+            "skill_cd_booked": skill["columns"]["skill_cd_booked"],
+            "skill_cd_unbooked": skill["columns"]["skill_cd_unbooked"],
+
+            "skill_desc": skill["columns"]["skill_desc"],
+            "book_effects": skill["columns"]["book_effects"],
+            "multiplier(s)": skill["multipliers"],
+
+            "skill_name_hidden": skill["columns"]["skill_name_hidden"],
+            "skill_desc_hidden": skill["columns"]["skill_desc_hidden"]
+
         }
 
-        # Add row for champ to basic champ info DF
-        champ_info_df = champ_info_df.append(this_champ, ignore_index=True)
-
-        # Get skill info for current champ
-        skill_index = 0
-        for skill_id in champ.get("SkillTypeIds"):
-
-            this_champ_move = dict(this_champ)
-
-            skill_index += 1  # A1, A2, A3, etc.
-            this_champ_move["skill_index"] = "A" + str(skill_index)
-            this_champ_move["skill_id"] = skill_id
-
-            # Use that handy dict we made earlier
-            skill_data = skill_data_by_id.get(skill_id)
-
-            # Initialize book bonuses
-            book_damage_multiplier = 1.0
-            book_heal_multiplier = 1.0
-            book_shield_multiplier = 1.0
-            book_effect_increase = 0.0
-            book_cdr = 0
-
-            # Get basic skill info - names, descriptions, etc
-            skill_name = data.get("StaticDataLocalization").get(skill_data.get("Name").get("Key"))
-            this_champ_move["skill_name"] = skill_name
-            skill_name_hidden = skill_data.get("Name").get("DefaultValue")
-            this_champ_move["skill_name_hidden"] = skill_name_hidden
-            skill_desc = data.get("StaticDataLocalization").get(skill_data.get("Description").get("Key")).\
-                replace("\\r", " ").replace("\\n", " ").replace("\r", " ").replace("\n", " ")
-            # Clean text color tags from skill descriptions
-            this_champ_move["skill_desc"] = skill_desc.\
-                replace("<color=#1ee600>", "").\
-                replace("<color=#F3BC02>", "").\
-                replace("<color=#E85CFC>", "").\
-                replace("</color>", "")
-
-            skill_desc_hidden = skill_data.get("Description").get("DefaultValue").\
-                replace("\\r", " ").replace("\\n", " ").replace("\r", " ").replace("\n", " ")
-            this_champ_move["skill_desc_hidden"] = skill_desc_hidden
-
-            # Get unbooked CD
-            skill_cooldown = skill_data.get("Cooldown")
-            this_champ_move["skill_cd_unbooked"] = skill_cooldown
-
-            book_increase_descriptions = []
-            for book in skill_data.get("SkillLevelBonuses", []):
-
-                if book.get("SkillBonusType") == 0:  # Damage
-                    increase = book.get("Value") / 4294967296
-                    book_damage_multiplier += increase
-                    book_increase_descriptions.append(f"+{round(increase*100)}% Damage")
-
-                elif book.get("SkillBonusType") == 1:  # Heal
-                    increase = book.get("Value") / 4294967296
-                    book_heal_multiplier += increase
-                    book_increase_descriptions.append(f"+{round(increase*100)}% Heal")
-
-                elif book.get("SkillBonusType") == 2:  # Effect chance
-                    increase = book.get("Value") / 4294967296
-                    book_effect_increase += increase
-                    book_increase_descriptions.append(f"+{round(increase*100)}% Buff/Debuff Chance")
-
-                elif book.get("SkillBonusType") == 3:  # Cooldown
-                    decrease = book.get("Value") / 4294967296
-                    book_cdr += decrease
-                    book_increase_descriptions.append(f"-{int(round(decrease))} Cooldown")
-
-                elif book.get("SkillBonusType") == 4:  # Shield. Recently split off from Heal/Shield.
-                    increase = book.get("Value") / 4294967296
-                    book_shield_multiplier += increase
-                    book_increase_descriptions.append(f"+{round(increase*100)}% Shield")
-
-                elif book.get("SkillBonusType"):
-                    # This shouldn't happen, but it'd be very interesting if it did...
-                    print(f"Non standard book effect {repr(book.get('SkillBonusType'))} found for skill ID {skill_id}")
-
-            # Get aggregate effects of skill increases
-            this_champ_move["skill_cd_booked"] = skill_cooldown - round(book_cdr)
-            this_champ_move["book_effects"] = ", ".join(book_increase_descriptions)
-            this_champ_move["book_dmg_mul"] = round(book_damage_multiplier, 2)
-            this_champ_move["book_heal_mul"] = round(book_heal_multiplier, 2)
-            this_champ_move["book_shield_mul"] = round(book_shield_multiplier, 2)
-
-            # Make list of multipliers for condensed view
-            multipliers = []
-
-            # Add a row for each effect
-            for effect in skill_data.get("Effects", []):
-
-                this_champ_effect = dict(this_champ_move)
-
-                # Get target type. This indicates which champs are affected.
-                target_type_ind = effect.get('TargetParams').get('TargetType', None)
-
-                # Make it readable.
-                this_champ_effect["target_type_code"] = target_type_ind
-                this_champ_effect["effect_id"] = effect.get("Id", None)
-
-                # We're breaking new ground!
-                if target_type_ind <= len(EFFECT_TARGET_TYPES):
-                    target_type = EFFECT_TARGET_TYPES[target_type_ind]
-                else:
-                    target_type = str(target_type_ind)
-
-                ###
-
-                # Dead code, ew.
-                # This is from when I was first writing this and only interested in AoE damage statistics.
-                # Here for posterity's sake.
-                # From humble beginnings.
-
-                # if effect.get('MultiplierFormula'):
-                #     print(f"MULTIPLIER: ({effect.get('MultiplierFormula', 0)}) * {effect.get('Count', 1)}")
-                # print(f"TARGET: {target_type}")
-                # if target_type_ind == 8 and effect.get('MultiplierFormula'):
-                #     formula = effect.get('MultiplierFormula')
-                #     formatted_formula = formula.replace("HP", str(int(champ_hp))).\
-                #         replace("ATK", str(int(champ_atk))).\
-                #         replace("DEF", str(int(champ_def)))
-                #     formatted_formula_complete = f"({formatted_formula})" +\
-                #                                  f"*{effect.get('Count', 1)}" +\
-                #                                  f"*{round(book_damage_multiplier,2)}"
-                #     try:
-                #         result = eval(parser.expr(formatted_formula_complete).compile())
-                #         print(f"{formatted_formula_complete} = {result}")
-                #         print(f"{champ_name},{champ_rarity},{champ_affinity},A{skill_index},{round(result,3)}" +
-                #               f",{formatted_formula_complete},{formula}," +
-                #               f"{skill_cooldown - round(book_cdr)},\"{skill_desc}\"")
-                #     except:
-                #         print(f"Could not parse multiplier formula: {formatted_formula}")
-                #         pass
-
-                ###
-
-                this_champ_effect["target_type"] = target_type
-                this_champ_effect['multiplier'] = "'" + effect.get('MultiplierFormula', "")
-                this_champ_effect['num_hits'] = effect.get("Count", 1)
-
-                if effect.get('MultiplierFormula'):
-                    multipliers.append(effect.get('MultiplierFormula'))
-
-                # Effect KindId tells what the skill does. See the module level constant EFFECT_TYPES for details.
-                effect_kind = effect.get("KindId", None)
-                this_champ_effect["effect_type_desc"] = EFFECT_TYPES[effect_kind]
-                this_champ_effect["effect_type_code"] = effect_kind
-
-                # Add chance of bonus effect, if applicable
-                if effect.get("Chance"):
-                    this_champ_effect["effect_chance_unbooked"] = round(effect.get("Chance") / (2**32), 2)
-                    this_champ_effect["effect_chance_booked"] = round(effect.get("Chance") / (2**32) +
-                                                                      book_effect_increase, 2)
-                else:
-                    this_champ_effect["effect_chance_unbooked"] = 1.00
-                    this_champ_effect["effect_chance_booked"] = 1.00
-
-                if effect.get('MultiplierFormula'):
-                    formula = effect.get('MultiplierFormula')
-                    formatted_formula = formula.replace("MAX_STAMINA", "100.0"). \
-                        replace("HERO_LEVEL", "60.0")
-
-                    # There's surely a better way to do the below regex sub but I can't be bothered
-
-                    formatted_formula = re.sub(r"^HP$", str(round(champ_hp)), formatted_formula)
-                    formatted_formula = re.sub(r"^ATK$", str(round(champ_atk)), formatted_formula)
-                    formatted_formula = re.sub(r"^DEF$", str(round(champ_def)), formatted_formula)
-                    formatted_formula = re.sub(r"^HP([-*+/ ()])", str(round(champ_hp)) + r"\g<1>", formatted_formula)
-                    formatted_formula = re.sub(r"^ATK([-*+/ ()])", str(round(champ_atk)) + r"\g<1>", formatted_formula)
-                    formatted_formula = re.sub(r"^DEF([-*+/ ()])", str(round(champ_def)) + r"\g<1>", formatted_formula)
-                    formatted_formula = re.sub(r"([-*+/ ()])HP$", r"\g<1>" + str(round(champ_hp)), formatted_formula)
-                    formatted_formula = re.sub(r"([-*+/ ()])ATK$", r"\g<1>" + str(round(champ_atk)), formatted_formula)
-                    formatted_formula = re.sub(r"([-*+/ ()])DEF$", r"\g<1>" + str(round(champ_def)), formatted_formula)
-                    formatted_formula = re.sub(r"([-*+/ ()])HP([-*+/ ()])",
-                                               r"\g<1>" + str(round(champ_hp)) + r"\g<2>", formatted_formula)
-                    formatted_formula = re.sub(r"([-*+/ ()])ATK([-*+/ ()])",
-                                               r"\g<1>" + str(round(champ_atk)) + r"\g<2>", formatted_formula)
-                    formatted_formula = re.sub(r"([-*+/ ()])DEF([-*+/ ()])",
-                                               r"\g<1>" + str(round(champ_def)) + r"\g<2>", formatted_formula)
-
-                    if effect_kind in [5000, 6000]:
-                        # do damage-y things
-                        # 5000 included because bombs have multipliers
-                        formatted_formula_complete = f"({formatted_formula})" +\
-                                                     f"*{effect.get('Count', 1)}" +\
-                                                     f"*{round(book_damage_multiplier,2)}"
-                    elif effect_kind in [0, 1000]:
-                        # do revive-y heal-y things
-                        formatted_formula_complete = f"({formatted_formula})" +\
-                                                     f"*{effect.get('Count', 1)}" +\
-                                                     f"*{round(book_heal_multiplier,2)}"
-                    elif effect_kind in [4000]:
-                        # do shield-y things
-                        formatted_formula_complete = f"({formatted_formula})" +\
-                                                     f"*{effect.get('Count', 1)}" +\
-                                                     f"*{round(book_shield_multiplier,2)}"
-                    else:
-                        # do other, presumably turn meter-y things
-                        formatted_formula_complete = f"({formatted_formula})" + \
-                                                     f"*{effect.get('Count', 1)}"
-
-                    try:
-                        # Parse the multiplier formula and calculate result
-                        result = eval(parser.expr(formatted_formula_complete).compile())
-                        this_champ_effect['calculated_damage'] = round(result, 2)
-                        # Get damage (or healing etc) per turn using booked cooldown
-                        this_champ_effect['damage_per_turn'] = round(result/(max(skill_cooldown - round(book_cdr), 1)),
-                                                                     2)
-                    except:
-                        # Encountered some nonstandard multiplier. There are many of these.
-                        print(f"Could not parse multiplier formula: {formatted_formula}")
-                        this_champ_effect['calculated_damage'] = None
-
-                # Get info on the buff or debuff that is applied, if applicable
-                if effect.get("ApplyStatusEffectParams"):
-                    for status in effect.get("ApplyStatusEffectParams").get("StatusEffectInfos"):
-                        this_champ_effect['status_type'] = STATUS_TYPES.get(status.get("TypeId"))
-                        this_champ_effect['status_duration'] = status.get("Duration")
-                        this_champ_effect['cd_minus_duration'] = skill_cooldown - round(book_cdr) -\
-                            status.get("Duration")
-                        champ_move_df = champ_move_df.append(this_champ_effect, ignore_index=True)
-                else:
-                    champ_move_df = champ_move_df.append(this_champ_effect, ignore_index=True)
-
-            # Add row to basics df
-            new_row = {
-                "champ_name": champ_name,
-                "rarity": champ_rarity,
-                "affinity": champ_affinity,
-                "role": champ_type,
-                "faction": champ_faction,
-                "hp": round(champ_hp),
-                "atk": round(champ_atk),
-                "def": round(champ_def),
-                "spd": round(champ_spd),
-                "cr_rate": round(champ_crch),
-                "cr_dmg": round(champ_cd),
-                "res": round(champ_res),
-                "acc": round(champ_acc),
-                "aura_stat": champ_aura_stat,
-                "aura_amt": "" if isinstance(champ_aura_amt, str) else round(champ_aura_amt, 2),
-                "aura_area": champ_aura_area if (champ_aura_stat != "") else "",
-                "aura_affinity": champ_aura_affinity if (champ_aura_stat != "") else "",
-                "hidden_name": champ_name_hidden,
-                "champ_status": champ_status,
-                "released": "Y" if champ_status == 40 else "N",
-
-                "skill_index": "A" + str(skill_index),
-                "skill_name": skill_name,
-                "skill_cd_booked": skill_cooldown - round(book_cdr),
-                "skill_cd_unbooked": skill_cooldown,
-
-                "skill_desc": skill_desc.\
-                    replace("<color=#1ee600>", "").
-                    replace("<color=#F3BC02>", "").
-                    replace("<color=#E85CFC>", "").
-                    replace("</color>", ""),
-                "book_effects": ", ".join(book_increase_descriptions),
-                "multiplier(s)": ", ".join(multipliers),
-
-                "skill_name_hidden": skill_name_hidden,
-                "skill_desc_hidden": skill_desc_hidden
-
-            }
-
-            basics_df = basics_df.append(new_row, ignore_index=True)
-
-    champ_info_df.drop_duplicates(inplace=True, ignore_index=True)
-    champ_move_df.drop_duplicates(inplace=True, ignore_index=True)
-    basics_df.drop_duplicates(inplace=True, ignore_index=True)
-
-    champ_info_df.to_csv("champ_basic_info.csv")
-    champ_move_df.to_csv("champ_move_details.csv")
-    basics_df.to_csv("champ_moves_basic.csv")
+        basics_rows.append(new_row)
 
 
-if __name__ == '__main__':
+def _process_champs(heroes, skill_data_by_id, localization, extra_formula_variables, batch_multipliers, tables=None,
+                    skill_memo=None):
+    """
+    :param tables: Tuple of (champ info, champ moves, basics) RowAccumulators or TableWriters to add the rows to.
+                   New RowAccumulators if not given.
+    :param skill_memo: SkillMemo shared by the heroes. A new one if not given.
+    :return: tables, with the rows for the given heroes added
+    """
+    if tables is None:
+        tables = (RowAccumulator(CHAMP_INFO_COLUMNS), RowAccumulator(CHAMP_MOVE_COLUMNS),
+                  RowAccumulator(CHAMP_BASICS_COLUMNS))
+    champ_info_rows, champ_move_rows, basics_rows = tables
+    if skill_memo is None:
+        skill_memo = SkillMemo()
+
+    with RUN_STATS.phase("champ_rows"):
+        for champ in heroes:
+            _add_champ_rows(champ, skill_data_by_id, localization, extra_formula_variables, batch_multipliers,
+                            champ_info_rows, champ_move_rows, basics_rows, skill_memo)
+
+    return tables
+
+
+# Per-process state for parallel champ processing, set up once per worker by _init_champ_worker
+_champ_worker = {}
+
+
+def _init_champ_worker(source, extra_formula_variables, batch_multipliers, localization=None):
+    """
+    Set up a worker process. source is either the path of a static data cache, which the worker opens itself (the
+    skill tables and localization are memory-mapped, so the OS shares them between workers), or a tuple of
+    (skill_data_by_id, localization), which is pickled over once per worker rather than once per task. localization,
+    if given, is used instead of the cache's.
+    """
+    if isinstance(source, str):
+        from raid_static_data_cache import CachedStaticData
+        cached_static_data = CachedStaticData(source)
+        _champ_worker["heroes"] = cached_static_data["HeroData"]["HeroTypes"]
+        _champ_worker["skill_data_by_id"] = {skill.get("Id"): skill
+                                             for skill in cached_static_data["SkillData"]["SkillTypes"]}
+        _champ_worker["localization"] = cached_static_data["StaticDataLocalization"] if localization is None \
+            else localization
+    else:
+        _champ_worker["skill_data_by_id"], _champ_worker["localization"] = source
+    _champ_worker["extra_formula_variables"] = extra_formula_variables
+    _champ_worker["batch_multipliers"] = batch_multipliers
+    # Kept for every task the worker does, so each skill is only worked out once per worker
+    _champ_worker["skill_memo"] = SkillMemo()
+
+
+def _champ_worker_task(heroes):
+    """
+    :param heroes: List of hero records, or a (start, stop) range of hero rows in the worker's static data cache
+    :return: Columns of the three row accumulators for those heroes, the unknown codes found in them, and the
+             RUN_STATS of the task
+    """
+    if isinstance(heroes, tuple):
+        heroes = _champ_worker["heroes"][heroes[0]:heroes[1]]
+    reset_unknown_codes()
+    RUN_STATS.reset()
+    accumulators = _process_champs(heroes, _champ_worker["skill_data_by_id"], _champ_worker["localization"],
+                                   _champ_worker["extra_formula_variables"], _champ_worker["batch_multipliers"],
+                                   skill_memo=_champ_worker["skill_memo"])
+    return [accumulator.columns_data() for accumulator in accumulators], unknown_codes(), RUN_STATS.snapshot()
+
+
+def _process_champs_parallel(data, skill_data_by_id, extra_formula_variables, batch_multipliers, workers,
+                             heroes_per_task, tables, localization=None):
+    """
+    Same as _process_champs, but shards the heroes across a pool of worker processes. Shards are added to tables in
+    their original order, so the output is identical to a serial run.
+
+    :param localization: Localization map to use instead of the static data's
+    """
+    cache_dir = getattr(data, "cache_dir", None)
+    if cache_dir:
+        # Workers read heroes straight out of the cache, so all a task needs to say is which rows
+        hero_count = len(data["HeroData"]["HeroTypes"])
+        source = cache_dir
+        tasks = [(start, min(start + heroes_per_task, hero_count)) for start in range(0, hero_count, heroes_per_task)]
+    else:
+        source = (skill_data_by_id, dict(data.get("StaticDataLocalization")) if localization is None else localization)
+        heroes = iter(data["HeroData"]["HeroTypes"])
+        tasks = iter(lambda: list(itertools.islice(heroes, heroes_per_task)), [])
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_champ_worker,
+                                                initargs=(source, extra_formula_variables, batch_multipliers,
+                                                          localization)) as executor:
+        # map() hands results back in task order, whatever order they finish in
+        for columns, new_codes, stats in executor.map(_champ_worker_task, tasks):
+            for table, shard in zip(tables, columns):
+                table.extend_columns(shard)
+            add_unknown_codes(new_codes)
+            RUN_STATS.merge(stats)
+
+    return tables
+
+
+@timed("champ_abilities_and_multipliers")
+def champ_abilities_and_multipliers(data, extra_formula_variables=None, batch_multipliers=False, workers=1,
+                                    heroes_per_task=50, file_format="csv", skill_memo=None):
+    """
+    Output way too much data on champs and their moves... but still not all of it.
+    Writes to csv's.
+    (As a side note, it bothers me so that the plural of an acronym requires an apostrophe. It just feels so dirty.)
+
+    :param data: static data json object
+    :param extra_formula_variables: Optional dict of values to assume for the battle-dependent variables some
+                                    multiplier formulas use, e.g. {"TRG_HP": 50000}. Effects whose formulas still
+                                    can't be evaluated are left blank.
+    :param batch_multipliers: If True, evaluate all the multiplier formulas in one vectorized pass at the end (see
+                              calculate_damage_columns) instead of effect by effect. calculated_damage and
+                              damage_per_turn always come out as floats this way.
+    :param workers: Number of processes to spread the champs over. 1 (the default) does everything in this process.
+                    Output is the same either way. Works best with static data from the binary cache
+                    (raid_static_data_cache.load_static_data), since workers can read it directly.
+    :param heroes_per_task: Number of champs handed to a worker process at a time
+    :param file_format: "csv", or "parquet" to write .parquet files instead (needs pyarrow)
+    :param skill_memo: Optional SkillMemo to reuse skills worked out by an earlier run on the same static data, e.g.
+                       when exporting it again in another format. Only used when workers is 1.
+    :return: nothing. Codes the decoders didn't know are listed at the end, and left in unknown_codes(). Formulas
+             that couldn't be worked out are logged at DEBUG level, and counted at INFO.
+    """
+
+    # Create dict for quickly locating skill info
+    skill_data_by_id = {}
+    for skill in data["SkillData"]["SkillTypes"]:
+        skill_data_by_id[skill.get("Id")] = skill
+
+    # Here goes nothing. Rows go straight out to the files as they're made.
+    reset_unknown_codes()
+    formula_failures = RUN_STATS.counters["formula_failures"]
+    tables = open_champ_tables(file_format, extra_formula_variables, batch_multipliers)
+    try:
+        if workers > 1:
+            _process_champs_parallel(data, skill_data_by_id, extra_formula_variables, batch_multipliers, workers,
+                                     heroes_per_task, tables)
+        else:
+            _process_champs(data["HeroData"]["HeroTypes"], skill_data_by_id, data.get("StaticDataLocalization"),
+                            extra_formula_variables, batch_multipliers, tables, skill_memo)
+    finally:
+        for table in tables:
+            table.close()
+
+    # New codes from a patch, to add to the tables at the top
+    log_unknown_codes()
+    formula_failures = RUN_STATS.counters["formula_failures"] - formula_failures
+    if formula_failures:
+        logger.info(f"Could not calculate {formula_failures} multiplier formulas (log level DEBUG for which)")
+
+
+class _LocalizedTables:
+    """
+    Stands in for one champ table of every language at once, for rows worked out with _LocalizationKeys. Each batch
+    of rows handed to extend_columns is filled in with each language's text and passed on to that language's
+    TableWriter, so only a batch is held in memory at a time.
+    """
 
-    with open("static_data.json") as json_in:
-        static_data = json.loads(json_in.read())
+    def __init__(self, writers, localized_columns, localizations, transform=None):
+        """
+        :param writers: TableWriter for each language, in the same order as localizations
+        :param localized_columns: The columns holding localization keys
+        :param localizations: Localization maps
+        :param transform: Optional function applied to each batch's columns_data before it's localized, for work that
+                          doesn't depend on the language
+        """
+        self.writers = writers
+        self.localized_columns = localized_columns
+        self.localizations = localizations
+        self.transform = transform
+
+    def extend_columns(self, columns_data):
+        if self.transform is not None:
+            columns_data = self.transform(columns_data)
+        with RUN_STATS.phase("localized_tables"):
+            for writer, localization in zip(self.writers, self.localizations):
+                writer.extend_columns(_localize_columns(columns_data, self.localized_columns, localization))
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+@timed("champ_abilities_and_multipliers_by_locale")
+def champ_abilities_and_multipliers_by_locale(data, localizations, extra_formula_variables=None,
+                                              batch_multipliers=False, workers=1, heroes_per_task=50,
+                                              file_format="csv"):
+    """
+    champ_abilities_and_multipliers for several languages in one go. Stats, books, effects, statuses and multiplier
+    formulas are only worked out once, with localization keys in place of names and descriptions. Then for each
+    language the keys are looked up in its localization and its tables written, e.g. champ_basic_info_de.csv.
+
+    Tables are the same as running champ_abilities_and_multipliers with that language's localization. Rows go out to
+    every language's files heroes_per_task champs at a time, so they're never all held in memory.
+
+    :param data: static data json object
+    :param localizations: dict of language (added to the file names) -> localization map, anything with a .get(key).
+                          See raid_static_data_cache.load_localization_store.
+    :param extra_formula_variables: See champ_abilities_and_multipliers
+    :param batch_multipliers: See champ_abilities_and_multipliers
+    :param workers: See champ_abilities_and_multipliers
+    :param heroes_per_task: See champ_abilities_and_multipliers. Also how many champs are written out at a time.
+    :param file_format: "csv" or "parquet"
+    :return: nothing
+    """
+    skill_data_by_id = {skill.get("Id"): skill for skill in data["SkillData"]["SkillTypes"]}
+
+    def add_damage_columns(columns_data):
+        # Rows only differ between languages in their text, so the same rows are duplicates in every language. Drop
+        # them first and the formulas are evaluated once for the rows that get written, same as a single language.
+        rows = RowAccumulator(CHAMP_MOVE_COLUMNS)
+        rows.extend_columns(columns_data)
+        champ_move_df = rows.to_dataframe().drop_duplicates(ignore_index=True)
+        champ_move_df[["calculated_damage", "damage_per_turn"]] = \
+            calculate_damage_columns(champ_move_df, extra_formula_variables=extra_formula_variables)
+        return list(champ_move_df.columns), {column: champ_move_df[column].tolist() for column in champ_move_df.columns}
+
+    reset_unknown_codes()
+    formula_failures = RUN_STATS.counters["formula_failures"]
+    writers = [open_champ_tables(file_format, file_suffix=f"_{language}") for language in localizations]
+    tables = tuple(_LocalizedTables([language_writers[table] for language_writers in writers], localized_columns,
+                                    list(localizations.values()),
+                                    add_damage_columns if batch_multipliers and table == 1 else None)
+                   for table, localized_columns in enumerate(CHAMP_LOCALIZED_COLUMNS))
+    try:
+        if workers > 1:
+            _process_champs_parallel(data, skill_data_by_id, extra_formula_variables, batch_multipliers, workers,
+                                     heroes_per_task, tables, _LocalizationKeys())
+        else:
+            skill_memo = SkillMemo()
+            heroes = iter(data["HeroData"]["HeroTypes"])
+            for batch in iter(lambda: list(itertools.islice(heroes, heroes_per_task)), []):
+                accumulators = _process_champs(batch, skill_data_by_id, _LocalizationKeys(), extra_formula_variables,
+                                               batch_multipliers, skill_memo=skill_memo)
+                for table, rows in zip(tables, accumulators):
+                    table.extend_columns(rows.columns_data())
+    finally:
+        for table in tables:
+            table.close()
+
+    log_unknown_codes()
+    formula_failures = RUN_STATS.counters["formula_failures"] - formula_failures
+    if formula_failures:
+        logger.info(f"Could not calculate {formula_failures} multiplier formulas (log level DEBUG for which)")
+
+
+def open_champ_tables(file_format="csv", extra_formula_variables=None, batch_multipliers=False, file_suffix=""):
+    """
+    :param file_format: "csv" or "parquet"
+    :param extra_formula_variables: See champ_abilities_and_multipliers
+    :param batch_multipliers: See champ_abilities_and_multipliers
+    :param file_suffix: Added to the file names, e.g. "_de" for champ_basic_info_de.csv
+    :return: TableWriters for champ_basic_info, champ_move_details and champ_moves_basic, in that order
+    """
+    def add_damage_columns(champ_move_df):
+        champ_move_df[["calculated_damage", "damage_per_turn"]] = \
+            calculate_damage_columns(champ_move_df, extra_formula_variables=extra_formula_variables)
+        return champ_move_df
+
+    return (TableWriter(f"champ_basic_info{file_suffix}.{file_format}", CHAMP_INFO_COLUMNS, file_format),
+            TableWriter(f"champ_move_details{file_suffix}.{file_format}", CHAMP_MOVE_COLUMNS, file_format,
+                        transform=add_damage_columns if batch_multipliers else None),
+            TableWriter(f"champ_moves_basic{file_suffix}.{file_format}", CHAMP_BASICS_COLUMNS, file_format))
 
-    campaign_drop_info(static_data['StageData']['Stages'])
 
-    champ_abilities_and_multipliers(static_data)
+def write_champ_tables(champ_info_rows, champ_move_rows, basics_rows, extra_formula_variables=None,
+                       batch_multipliers=False, file_format="csv"):
+    """
+    Write champ rows that have already been collected to champ_basic_info, champ_move_details and champ_moves_basic.
+
+    :param champ_info_rows: RowAccumulator of CHAMP_INFO_COLUMNS rows
+    :param champ_move_rows: RowAccumulator of CHAMP_MOVE_COLUMNS rows
+    :param basics_rows: RowAccumulator of CHAMP_BASICS_COLUMNS rows
+    :param extra_formula_variables: See champ_abilities_and_multipliers
+    :param batch_multipliers: See champ_abilities_and_multipliers
+    :param file_format: "csv" or "parquet"
+    :return: nothing
+    """
+    tables = open_champ_tables(file_format, extra_formula_variables, batch_multipliers)
+    for table, rows in zip(tables, (champ_info_rows, champ_move_rows, basics_rows)):
+        with table:
+            table.extend_columns(rows.columns_data())
+
+
+def main(argv=None):
+    import argparse
+    import contextlib
+
+    from raid_instrumentation import profiled
+    from raid_static_data_cache import load_localization_store, load_static_data
+
+    arg_parser = argparse.ArgumentParser(description="Write the campaign and champion csv's from the static data")
+    arg_parser.add_argument("static_data", nargs="?", default="static_data.json", help="Static data json")
+    arg_parser.add_argument("--log-level", default="INFO",
+                            help="DEBUG to list every campaign stage and every formula that couldn't be worked out")
+    arg_parser.add_argument("--report", default="raid_run_report.json",
+                            help="Where to write the timings and counters of the run (JSON)")
+    arg_parser.add_argument("--locale", action="append", metavar="LANGUAGE=JSON",
+                            help="Write the champion csv's for this language (e.g. de=static_data_de.json, the static "
+                                 "data of the game in that language) instead of in the static data's own. Can be "
+                                 "given several times; champions are only worked out once for all of them.")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="Number of processes to work out the champions in (default 1, this one)")
+    arg_parser.add_argument("--profile", nargs="?", const="raid_run.prof",
+                            help="Run under cProfile, add the slowest functions to the report and save the full "
+                                 "profile to this file")
+    args = arg_parser.parse_args(argv)
+    if args.workers < 1:
+        arg_parser.error("--workers must be at least 1")
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+
+    RUN_STATS.reset()
+    with profiled(args.profile) if args.profile else contextlib.nullcontext():
+        # Read the game data through the binary cache next to static_data.json. The cache is (re)built by streaming
+        # the json whenever the game data has changed since the last run.
+        with RUN_STATS.phase("load_static_data"):
+            static_data = load_static_data(args.static_data)
+
+        campaign_drop_info(static_data["StageData"]["Stages"])
+
+        if args.locale:
+            # Each language's text is read through a LocalizationStore kept next to its json, so none of them have to
+            # be loaded into memory
+            localizations = {}
+            for locale in args.locale:
+                language, path = locale.split("=", 1)
+                with RUN_STATS.phase("load_localization"):
+                    if os.path.abspath(path) == os.path.abspath(args.static_data):
+                        localizations[language] = static_data["StaticDataLocalization"]
+                    else:
+                        localizations[language] = load_localization_store(path)
+            champ_abilities_and_multipliers_by_locale(static_data, localizations, workers=args.workers)
+        else:
+            champ_abilities_and_multipliers(static_data, workers=args.workers)
+
+    RUN_STATS.write_report(args.report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,724 @@
+"""
+Binary cache of the parts of the Raid static data this project uses.
+
+Parsing the full static_data.json takes seconds. This flattens the hero, skill, effect and stage records into
+normalized tables, one .npy file per column, in a directory next to the JSON. The localization map goes in a
+LocalizationStore file. Later runs memory-map those instead of parsing anything. The cache is keyed by a hash of the
+JSON, so it's rebuilt when a new game patch comes out and left alone otherwise.
+
+    from raid_static_data_cache import load_static_data
+    static_data = load_static_data("static_data.json")
+    campaign_drop_info(static_data["StageData"]["Stages"])
+    champ_abilities_and_multipliers(static_data)
+"""
+
+import bisect
+from collections.abc import Mapping
+import hashlib
+import json
+import mmap
+import numpy as np
+import os
+import shutil
+import tempfile
+
+from raid_static_data_analysis import iter_json_array, iter_json_object
+
+# Bump this whenever CACHE_SCHEMA or the file layout changes, so old caches get rebuilt
+CACHE_FORMAT_VERSION = 2
+
+# The tables in the cache, and how they map onto the static data json.
+#   table: Name of the table. Files are named "<table>.<column>.npy".
+#   path: Keys leading to the list of records. For top level tables, from the root of the json. For child tables,
+#         from their parent record.
+#   kind: "records" (list of dicts), "values" (list of plain values) or "items" (dict of key -> plain value)
+#   columns: Dotted paths of the fields kept from each record
+#   flags: Dotted paths of sub-objects whose presence is recorded, since the code checks for them
+#          (e.g. `if effect.get("ApplyStatusEffectParams")`). Children below a missing flagged object are skipped.
+#   children: Nested tables. Each child row has a "parent" column holding the row number of its parent.
+CACHE_SCHEMA = [
+    {
+        "table": "heroes",
+        "path": ("HeroData", "HeroTypes"),
+        "kind": "records",
+        "columns": ["Id", "Name.Key", "Name.DefaultValue", "Rarity", "Element", "Role", "Fraction", "Status",
+                    "BaseStats.Health", "BaseStats.Attack", "BaseStats.Defence", "BaseStats.Speed",
+                    "BaseStats.Resistance", "BaseStats.Accuracy", "BaseStats.CriticalChance",
+                    "BaseStats.CriticalDamage", "BaseStats.CriticalHeal",
+                    "LeaderSkill.StatKindId", "LeaderSkill.Amount", "LeaderSkill.isAbsolute", "LeaderSkill.Element",
+                    "LeaderSkill.Area"],
+        "flags": ["LeaderSkill"],
+        "children": [
+            {"table": "hero_skill_ids", "path": ("SkillTypeIds",), "kind": "values"},
+        ],
+    },
+    {
+        "table": "skills",
+        "path": ("SkillData", "SkillTypes"),
+        "kind": "records",
+        "columns": ["Id", "Name.Key", "Name.DefaultValue", "Description.Key", "Description.DefaultValue",
+                    "Cooldown"],
+        "children": [
+            {"table": "skill_bonuses", "path": ("SkillLevelBonuses",), "kind": "records",
+             "columns": ["SkillBonusType", "Value"]},
+            {"table": "effects", "path": ("Effects",), "kind": "records",
+             "columns": ["Id", "KindId", "TargetParams.TargetType", "MultiplierFormula", "Count", "Chance"],
+             "flags": ["ApplyStatusEffectParams"],
+             "children": [
+                 {"table": "effect_statuses", "path": ("ApplyStatusEffectParams", "StatusEffectInfos"),
+                  "kind": "records", "columns": ["TypeId", "Duration"]},
+             ]},
+        ],
+    },
+    {
+        "table": "stages",
+        "path": ("StageData", "Stages"),
+        "kind": "records",
+        "columns": ["Id", "StartCondition.Price.RawValues.1", "RewardHeroXp"],
+        "children": [
+            {"table": "stage_fixed_rewards", "path": ("Rewards",), "kind": "records",
+             "columns": ["Type", "MinCount", "MaxCount"]},
+            {"table": "stage_rewards", "path": ("Reward", "Rewards"), "kind": "records",
+             "columns": ["Type", "Probability", "MinCount", "MaxCount", "HeroGrade"]},
+            {"table": "stage_rank_probs", "path": ("Reward", "ArtifactProbsByRankId"), "kind": "items"},
+            {"table": "stage_rarity_probs", "path": ("Reward", "ArtifactProbsByRarityId"), "kind": "items"},
+            {"table": "stage_kind_probs", "path": ("Reward", "ArtifactProbsByKindId"), "kind": "items"},
+            {"table": "stage_set_probs", "path": ("Reward", "ArtifactProbsBySetKindId"), "kind": "items"},
+        ],
+    },
+]
+
+
+def _localization_hash(key_bytes):
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+
+
+class LocalizationStore(Mapping):
+    """
+    Read-only localization map (key -> text) kept in a single memory-mapped file. Strings are only decoded when
+    they're looked up, so holding a language open costs next to no memory until it's used. Several languages can be
+    open at once.
+
+    File layout (little-endian):
+        8 bytes   magic, b"RSDLOC01"
+        8 bytes   number of entries, n
+        8 bytes   size of the text blob
+        n x 8     64-bit hashes of the keys, sorted
+        n x 16    (key offset, key length, text offset, text length) for each hash, as 32-bit ints
+        ...       UTF-8 keys and texts
+    """
+
+    MAGIC = b"RSDLOC01"
+    _HEADER_SIZE = 24
+
+    def __init__(self, path):
+        """
+        :param path: Path to a file written by LocalizationStore.build
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != self.MAGIC:
+            raise ValueError(f"{path} is not a localization store")
+
+        # Plain memoryviews rather than NumPy arrays, so that lookups are just a bisect over Python ints.
+        # (Assumes a little-endian machine, like everything Raid runs on.)
+        count = int.from_bytes(self._mmap[8:16], "little")
+        self._count = count
+        self._view = memoryview(self._mmap)
+        self._hashes = self._view[self._HEADER_SIZE:self._HEADER_SIZE + count * 8].cast("Q")
+        self._entries = self._view[self._HEADER_SIZE + count * 8:self._HEADER_SIZE + count * 24].cast("I")
+        self._blob_offset = self._HEADER_SIZE + count * 24
+
+    @classmethod
+    def build(cls, path, items):
+        """
+        Write a localization store. Texts are spooled to disk as they come in, so only the index is held in memory.
+
+        :param path: File to write
+        :param items: Iterable of (key, text) pairs,
+                      e.g. iter_json_object("static_data.json", "StaticDataLocalization")
+        :return: LocalizationStore for the new file
+        """
+        hashes = []
+        entries = []
+        blob_size = 0
+        with tempfile.TemporaryFile() as blob:
+            for key, text in items:
+                key_bytes = key.encode("utf-8")
+                text_bytes = ("" if text is None else str(text)).encode("utf-8")
+                hashes.append(_localization_hash(key_bytes))
+                entries.append((blob_size, len(key_bytes), blob_size + len(key_bytes), len(text_bytes)))
+                blob.write(key_bytes)
+                blob.write(text_bytes)
+                blob_size += len(key_bytes) + len(text_bytes)
+
+            if blob_size >= 2 ** 32:
+                raise ValueError("Localization text too large for a localization store (4 GB max)")
+
+            hashes = np.array(hashes, dtype="<u8")
+            order = np.argsort(hashes, kind="stable")
+            with open(path, "wb") as f:
+                f.write(cls.MAGIC)
+                f.write(np.array([len(hashes), blob_size], dtype="<u8").tobytes())
+                f.write(hashes[order].tobytes())
+                f.write(np.array(entries, dtype="<u4").reshape(-1, 4)[order].tobytes())
+                blob.seek(0)
+                shutil.copyfileobj(blob, f)
+
+        return cls(path)
+
+    def _text(self, start, length):
+        start += self._blob_offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def __getitem__(self, key):
+        key_bytes = key.encode("utf-8")
+        key_hash = _localization_hash(key_bytes)
+        row = bisect.bisect_left(self._hashes, key_hash)
+        found = None
+        # Hash collisions are vanishingly unlikely, but check the actual key anyway. If the same key was written
+        # twice the last one wins, same as a dict.
+        while row < self._count and self._hashes[row] == key_hash:
+            key_start, key_length, text_start, text_length = self._entries[row * 4:row * 4 + 4]
+            start = self._blob_offset + key_start
+            if self._mmap[start:start + key_length] == key_bytes:
+                found = (text_start, text_length)
+            row += 1
+        if found is None:
+            raise KeyError(key)
+        return self._text(*found)
+
+    def __iter__(self):
+        seen = set()
+        for row in range(self._count):
+            key_start, key_length = self._entries[row * 4:row * 4 + 2]
+            key = self._text(key_start, key_length)
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+    def __len__(self):
+        return len(set(self))
+
+    def close(self):
+        # Views into the map have to go before it can be closed
+        self._hashes.release()
+        self._entries.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def build_localization_store(json_path, store_path=None, keys=("StaticDataLocalization",)):
+    """
+    Build a LocalizationStore from the localization map in a json file, streaming it.
+
+    :param json_path: Static data json, or any json file with a key -> text object in it
+    :param store_path: File to write. Defaults to the json's path with a ".loc" extension.
+    :param keys: Keys leading to the localization object. Use () if it's the whole file.
+    :return: LocalizationStore
+    """
+    store_path = store_path or os.path.splitext(json_path)[0] + ".loc"
+    return LocalizationStore.build(store_path, iter_json_object(json_path, *keys))
+
+
+def load_localization_store(json_path, store_path=None, keys=("StaticDataLocalization",), rebuild=False):
+    """
+    Open the localization map of a json file as a LocalizationStore, building the store first if the json has changed
+    since it was last built. Like load_static_data, but for when only the text is needed, e.g. for the static data of
+    another language.
+
+    :param json_path: Static data json, or any json file with a key -> text object in it
+    :param store_path: Where the store lives. Defaults to the json's path with a ".loc" extension. What it was built
+                       from is kept next to it, in store_path + ".json".
+    :param keys: Keys leading to the localization object. Use () if it's the whole file.
+    :param rebuild: Rebuild the store even if it looks up to date
+    :return: LocalizationStore
+    """
+    store_path = store_path or os.path.splitext(json_path)[0] + ".loc"
+    manifest_path = f"{store_path}.json"
+
+    source_hash = None
+    if not rebuild and os.path.exists(store_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("keys") == list(keys):
+            up_to_date, source_hash = _check_source(manifest, manifest_path, json_path)
+            if up_to_date:
+                return LocalizationStore(store_path)
+
+    # Build next to the old one and swap it in, so a half-written store is never picked up
+    build_path = f"{store_path}.building-{os.getpid()}"
+    try:
+        manifest = {"keys": list(keys), "source": _source_info(json_path, source_hash)}
+        build_localization_store(json_path, build_path, keys).close()
+        os.replace(build_path, store_path)
+    finally:
+        if os.path.exists(build_path):
+            os.remove(build_path)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return LocalizationStore(store_path)
+
+
+def static_data_cache_path(json_path):
+    """
+    :param json_path: Path to static data json
+    :return: Where its cache lives, e.g. "static_data.cache" for "static_data.json"
+    """
+    return os.path.splitext(json_path)[0] + ".cache"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    :return: Hex SHA-256 of a file, read a chunk at a time
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_info(json_path, source_hash=None):
+    """
+    :param source_hash: SHA-256 of the json, if already known
+    :return: What a cache manifest records about the json it was built from
+    """
+    stat = os.stat(json_path)
+    return {
+        "path": os.path.abspath(json_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": source_hash or file_sha256(json_path),
+    }
+
+
+def _check_source(manifest, manifest_path, json_path):
+    """
+    Check whether a json is still the one a cache was built from. It's only hashed if its size or modification time
+    differ from the manifest's. If it was touched but its contents are the same, the manifest is updated so it isn't
+    hashed again next time.
+
+    :return: (True if the json is unchanged, its SHA-256 if it had to be worked out, otherwise None)
+    """
+    source = manifest["source"]
+    stat = os.stat(json_path)
+    if (stat.st_size, stat.st_mtime_ns) == (source["size"], source["mtime_ns"]):
+        return True, None
+    source_hash = file_sha256(json_path)
+    if source_hash != source["sha256"]:
+        return False, source_hash
+    source.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return True, source_hash
+
+
+def _get_path(record, parts):
+    for part in parts:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(part)
+    return record
+
+
+def _set_path(record, parts, value):
+    for part in parts[:-1]:
+        record = record.setdefault(part, {})
+    record[parts[-1]] = value
+
+
+def _spec_columns(spec):
+    # Columns of a table as (name, path parts) pairs
+    if spec["kind"] == "records":
+        return [(column, column.split(".")) for column in spec["columns"]]
+    if spec["kind"] == "values":
+        return [("value", [])]
+    return [("key", None), ("value", None)]
+
+
+def _column_kind(values):
+    types = {type(value) for value in values if value is not None}
+    if types <= {int, bool}:
+        return "int"
+    if types <= {int, float, bool}:
+        return "float"
+    if types == {str}:
+        return "str"
+    # Anything else (mixed types, nested objects) is kept as JSON text
+    return "json"
+
+
+def _write_column(directory, table, column, values):
+    """
+    Write one column of a table. Numbers go in a plain array, text goes in a UTF-8 blob plus an array of offsets.
+    A boolean ".null" array marks missing values, if there are any.
+
+    :return: Kind of column written: "int", "float", "str" or "json"
+    """
+    kind = _column_kind(values)
+    prefix = os.path.join(directory, f"{table}.{column}")
+    nulls = np.array([value is None for value in values], dtype=bool)
+
+    if kind in ("int", "float"):
+        dtype = np.int64 if kind == "int" else np.float64
+        np.save(f"{prefix}.npy", np.array([0 if value is None else value for value in values], dtype=dtype))
+    else:
+        if kind == "json":
+            encoded = [b"" if value is None else json.dumps(value).encode("utf-8") for value in values]
+        else:
+            encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(f"{prefix}.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(f"{prefix}.offsets.npy", offsets)
+
+    if nulls.any():
+        np.save(f"{prefix}.null.npy", nulls)
+    return kind
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Empty arrays can't be memory-mapped
+        return np.load(path)
+
+
+class _TableBuilder:
+    """
+    Accumulates the rows of one cache table while the json is being read.
+    """
+
+    def __init__(self, spec, is_child=False):
+        self.spec = spec
+        self.is_child = is_child
+        self.columns = _spec_columns(spec)
+        self.values = {name: [] for name, _ in self.columns}
+        self.flags = {flag: [] for flag in spec.get("flags", [])}
+        self.parents = []
+        self.children = [_TableBuilder(child, is_child=True) for child in spec.get("children", [])]
+
+    def add(self, source, parent=None):
+        """
+        Add every row found in source: the list (or dict) this table is made from.
+        """
+        if not source:
+            return
+        if self.spec["kind"] == "items":
+            rows = [{"key": key, "value": value} for key, value in source.items()]
+        else:
+            rows = source
+
+        for record in rows:
+            row = len(self.parents)
+            self.parents.append(parent)
+            if self.spec["kind"] == "records":
+                for name, parts in self.columns:
+                    self.values[name].append(_get_path(record, parts))
+            elif self.spec["kind"] == "values":
+                self.values["value"].append(record)
+            else:
+                self.values["key"].append(record["key"])
+                self.values["value"].append(record["value"])
+
+            for flag, present in self.flags.items():
+                present.append(int(_get_path(record, flag.split(".")) is not None))
+
+            for child in self.children:
+                child.add(_get_path(record, child.spec["path"]), row)
+
+    def write(self, directory, manifest_tables):
+        columns = {}
+        for name, values in self.values.items():
+            columns[name] = _write_column(directory, self.spec["table"], name, values)
+        for flag, present in self.flags.items():
+            columns[f"has.{flag}"] = _write_column(directory, self.spec["table"], f"has.{flag}", present)
+        if self.is_child:
+            columns["parent"] = _write_column(directory, self.spec["table"], "parent", self.parents)
+
+        manifest_tables[self.spec["table"]] = {"rows": len(self.parents), "columns": columns}
+        for child in self.children:
+            child.write(directory, manifest_tables)
+
+
+def build_static_data_cache(json_path="static_data.json", cache_dir=None, source_hash=None):
+    """
+    (Re)build the binary cache for a static data json. The json is streamed, one record at a time.
+
+    :param json_path: Path to static data json
+    :param cache_dir: Where to put the cache. Defaults to static_data_cache_path(json_path).
+    :param source_hash: SHA-256 of the json, if already known
+    :return: CachedStaticData for the new cache
+    """
+    cache_dir = cache_dir or static_data_cache_path(json_path)
+    manifest = {
+        "format": CACHE_FORMAT_VERSION,
+        "source": _source_info(json_path, source_hash),
+        "tables": {},
+    }
+
+    # Build into a scratch directory and swap it in at the end, so a half-written cache is never picked up
+    build_dir = f"{cache_dir}.building-{os.getpid()}"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    try:
+        for spec in CACHE_SCHEMA:
+            builder = _TableBuilder(spec)
+            for record in iter_json_array(json_path, *spec["path"]):
+                builder.add([record])
+            builder.write(build_dir, manifest["tables"])
+
+        build_localization_store(json_path, os.path.join(build_dir, "localization.loc")).close()
+
+        with open(os.path.join(build_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        old_dir = f"{cache_dir}.old-{os.getpid()}"
+        if os.path.exists(cache_dir):
+            os.rename(cache_dir, old_dir)
+        os.rename(build_dir, cache_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    return CachedStaticData(cache_dir)
+
+
+def load_static_data(json_path="static_data.json", cache_dir=None, rebuild=False):
+    """
+    Open the static data through its binary cache, building or rebuilding the cache first if the json has changed.
+
+    The json is only hashed if its size or modification time differ from when the cache was built.
+
+    :param json_path: Path to static data json
+    :param cache_dir: Where the cache lives. Defaults to static_data_cache_path(json_path).
+    :param rebuild: Rebuild the cache even if it looks up to date
+    :return: CachedStaticData
+    """
+    cache_dir = cache_dir or static_data_cache_path(json_path)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+
+    if rebuild or not os.path.exists(manifest_path):
+        return build_static_data_cache(json_path, cache_dir)
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != CACHE_FORMAT_VERSION:
+        return build_static_data_cache(json_path, cache_dir)
+
+    # Only rebuild if the contents actually changed, not just because the file was touched
+    up_to_date, source_hash = _check_source(manifest, manifest_path, json_path)
+    if not up_to_date:
+        return build_static_data_cache(json_path, cache_dir, source_hash)
+
+    return CachedStaticData(cache_dir)
+
+
+class CacheTable:
+    """
+    One table of the cache. Columns are memory-mapped on first use.
+    """
+
+    def __init__(self, cache_dir, name, meta):
+        self.cache_dir = cache_dir
+        self.name = name
+        self.rows = meta["rows"]
+        self.column_kinds = meta["columns"]
+        self._arrays = {}
+
+    def __len__(self):
+        return self.rows
+
+    def _array(self, file_name):
+        if file_name not in self._arrays:
+            self._arrays[file_name] = _load_array(os.path.join(self.cache_dir, f"{self.name}.{file_name}.npy"))
+        return self._arrays[file_name]
+
+    def nulls(self, column):
+        """
+        :return: Boolean array, True where the column has no value (None if it's never missing)
+        """
+        if not os.path.exists(os.path.join(self.cache_dir, f"{self.name}.{column}.null.npy")):
+            return None
+        return self._array(f"{column}.null")
+
+    def column(self, column):
+        """
+        :return: Memory-mapped array of a numeric column. Missing values read as 0; see nulls().
+        """
+        if self.column_kinds[column] not in ("int", "float"):
+            raise TypeError(f"{self.name}.{column} is a text column, use values() instead")
+        return self._array(column)
+
+    def string(self, column, row):
+        """
+        :return: One value of a text column, decoded on the spot
+        """
+        offsets = self._array(f"{column}.offsets")
+        nulls = self.nulls(column)
+        if nulls is not None and nulls[row]:
+            return None
+        text = self._array(column)[offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+        return json.loads(text) if self.column_kinds[column] == "json" else text
+
+    def values(self, column, start=0, stop=None):
+        """
+        :param start: First row to read
+        :param stop: Row to stop before (default: the end of the table)
+        :return: Column (or rows start to stop of it) as a list of plain Python values, None where missing
+        """
+        stop = self.rows if stop is None else stop
+        kind = self.column_kinds[column]
+        if kind in ("int", "float"):
+            values = self._array(column)[start:stop].tolist()
+        else:
+            offsets = self._array(f"{column}.offsets")[start:stop + 1].tolist()
+            blob = self._array(column)[offsets[0]:offsets[-1]].tobytes() if offsets else b""
+            base = offsets[0] if offsets else 0
+            values = [blob[begin - base:end - base].decode("utf-8") for begin, end in zip(offsets, offsets[1:])]
+            if kind == "json":
+                values = [json.loads(value) if value else None for value in values]
+
+        nulls = self.nulls(column)
+        if nulls is not None:
+            values = [None if null else value for value, null in zip(values, nulls[start:stop].tolist())]
+        return values
+
+    def group_bounds(self, parent_rows):
+        """
+        Child rows are stored grouped by parent, in parent order.
+
+        :param parent_rows: Number of rows in the parent table
+        :return: Array b where the children of parent row i are rows b[i] to b[i+1]
+        """
+        if not self.rows:
+            return np.zeros(parent_rows + 1, dtype=np.int64)
+        return np.searchsorted(self.column("parent"), np.arange(parent_rows + 1))
+
+
+# Records rebuilt at a time when iterating over a cached table
+CACHED_RECORDS_BATCH_ROWS = 1000
+
+
+class CachedRecords:
+    """
+    Re-iterable list of records rebuilt from a cache table, shaped like the matching list in the static data json
+    (e.g. static_data["HeroData"]["HeroTypes"]).
+    """
+
+    def __init__(self, cached_static_data, spec):
+        self._cached_static_data = cached_static_data
+        self.spec = spec
+
+    def __len__(self):
+        return len(self._cached_static_data.tables[self.spec["table"]])
+
+    def __iter__(self):
+        # A batch at a time, so iterating doesn't rebuild the whole table in memory at once
+        for start in range(0, len(self), CACHED_RECORDS_BATCH_ROWS):
+            yield from self._cached_static_data.records(self.spec, start, start + CACHED_RECORDS_BATCH_ROWS)
+
+    def __getitem__(self, rows):
+        # Only slices are supported; rebuilding a single record costs about as much as a small slice anyway
+        start, stop, step = rows.indices(len(self))
+        records = self._cached_static_data.records(self.spec, start, stop)
+        return records[::step] if step != 1 else records
+
+
+class CachedStaticData(Mapping):
+    """
+    The static data, read from its binary cache. Behaves like the dict from json.loads for the parts of the static
+    data this project uses: static_data["HeroData"]["HeroTypes"], static_data["SkillData"]["SkillTypes"],
+    static_data["StageData"]["Stages"] and static_data["StaticDataLocalization"].
+
+    The normalized tables themselves are in .tables, for anything that wants whole columns.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.source_hash = self.manifest["source"]["sha256"]
+        self.tables = {name: CacheTable(cache_dir, name, meta) for name, meta in self.manifest["tables"].items()}
+        self._localization = None
+
+    @property
+    def localization(self):
+        """
+        :return: LocalizationStore of localization key -> text
+        """
+        if self._localization is None:
+            self._localization = LocalizationStore(os.path.join(self.cache_dir, "localization.loc"))
+        return self._localization
+
+    def __getitem__(self, key):
+        if key == "StaticDataLocalization":
+            return self.localization
+        for spec in CACHE_SCHEMA:
+            if spec["path"][0] == key and spec["kind"] == "records":
+                return {spec["path"][1]: CachedRecords(self, spec)}
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter([spec["path"][0] for spec in CACHE_SCHEMA])
+
+    def __len__(self):
+        return len(CACHE_SCHEMA)
+
+    def _rows(self, spec, start=0, stop=None):
+        """
+        Rebuild rows start to stop (default: all of them) of a table as a dict (records) or plain value (values) or
+        (key, value) pair (items), with child tables filled in.
+        """
+        table = self.tables[spec["table"]]
+        stop = table.rows if stop is None else min(stop, table.rows)
+        columns = [(parts, table.values(name, start, stop)) for name, parts in _spec_columns(spec)]
+        flags = [(flag.split("."), table.values(f"has.{flag}", start, stop)) for flag in spec.get("flags", [])]
+
+        # Children of every row, grouped by parent row
+        children = []
+        for child_spec in spec.get("children", []):
+            bounds = self.tables[child_spec["table"]].group_bounds(table.rows)[start:stop + 1]
+            child_rows = self._rows(child_spec, int(bounds[0]), int(bounds[-1]))
+            children.append((child_spec, child_rows, (bounds - bounds[0]).tolist()))
+
+        rows = []
+        for row in range(stop - start):
+            if spec["kind"] == "values":
+                rows.append(columns[0][1][row])
+                continue
+            if spec["kind"] == "items":
+                rows.append((columns[0][1][row], columns[1][1][row]))
+                continue
+
+            record = {}
+            missing = []
+            for parts, present in flags:
+                if present[row]:
+                    _set_path(record, parts, {})
+                else:
+                    missing.append(parts)
+            for parts, values in columns:
+                value = values[row]
+                if value is not None:
+                    _set_path(record, parts, value)
+
+            for child_spec, child_rows, bounds in children:
+                path = list(child_spec["path"])
+                if any(path[:len(parts)] == parts for parts in missing):
+                    continue
+                found = child_rows[bounds[row]:bounds[row + 1]]
+                _set_path(record, path, dict(found) if child_spec["kind"] == "items" else found)
+            rows.append(record)
+        return rows
+
+    def records(self, spec, start=0, stop=None):
+        """
+        :param start: First row to rebuild
+        :param stop: Row to stop before (default: the end of the table)
+        :return: List of records of a top level table, shaped like the static data json
+        """
+        return self._rows(spec, start, stop)
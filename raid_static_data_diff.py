@@ -0,0 +1,393 @@
+"""
+Incremental updates between static data patches.
+
+Most game patches only touch a few champs, skills and stages. update_outputs fingerprints every HeroTypes, SkillTypes
+and Stages record, compares them with the manifest saved by the previous run and only works out champ rows for the
+records that changed; rows for everything else come out of the manifest. Stages are cheap enough to all be worked out
+again every run. All four csv's are still written in full, and come out the same as a from-scratch run would.
+
+It also writes static_data_changelog.csv, listing what moved since the last run: new and removed champs, skills and
+stages, releases (champ status going to 40), buffed or nerfed multipliers, cooldown changes and so on.
+
+    python raid_static_data_diff.py [static_data.json] [--log-level WARNING]
+"""
+import hashlib
+import json
+import logging
+import math
+import numbers
+import os
+
+import pandas as pd
+
+import raid_static_data_analysis
+from raid_static_data_analysis import (CAMPAIGN_FARMING_COLUMNS, CHAMP_BASICS_COLUMNS, CHAMP_INFO_COLUMNS,
+                                       CHAMP_MOVE_COLUMNS, RowAccumulator, SkillMemo, _add_champ_rows,
+                                       campaign_stage_metrics, normalize_stage_rewards, write_campaign_farming_csv,
+                                       write_champ_tables)
+
+logger = logging.getLogger("raid_static_data_diff")
+
+DIFF_MANIFEST_VERSION = 1
+DIFF_MANIFEST_FILE = "static_data_manifest.json"
+CHANGELOG_FILE = "static_data_changelog.csv"
+
+CHANGELOG_COLUMNS = ["change", "kind", "id", "name", "field", "old", "new"]
+
+# Per-skill and per-effect columns of champ_move_details.csv worth reporting on. True if a bigger number is better
+# for the champ (so going up is a buff), False if smaller is better, None if it's neither.
+CHANGELOG_SKILL_FIELDS = {"skill_name": None, "skill_cd_unbooked": False, "skill_cd_booked": False,
+                          "book_effects": None, "skill_desc": None}
+CHANGELOG_EFFECT_FIELDS = {"multiplier": None, "num_hits": True, "calculated_damage": True, "damage_per_turn": True,
+                           "status_type": None, "status_duration": True, "effect_chance_unbooked": True,
+                           "effect_chance_booked": True, "target_type": None, "effect_type_desc": None}
+# Champ stat columns of champ_basic_info.csv where more is better
+CHANGELOG_CHAMP_STATS = ["hp", "atk", "def", "spd", "cr_rate", "cr_dmg", "res", "acc", "aura_amt"]
+
+
+def fingerprint(*parts):
+    """
+    :param parts: Anything json can serialize
+    :return: Short hex digest that changes whenever any part does
+    """
+    text = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _record_keys(records):
+    """
+    Key each record by its ID. The odd record sharing an ID with an earlier one gets "#2", "#3"... on the end so
+    nothing gets lost.
+
+    :return: List of (key, record) in the original order
+    """
+    seen = {}
+    keyed = []
+    for record in records:
+        key = str(record.get("Id"))
+        seen[key] = seen.get(key, 0) + 1
+        keyed.append((key if seen[key] == 1 else f"{key}#{seen[key]}", record))
+    return keyed
+
+
+def _pipeline_settings(data, extra_formula_variables, batch_multipliers):
+    # Rows saved by a run with different settings, or different code, can't be reused
+    return {"version": DIFF_MANIFEST_VERSION,
+            "code": fingerprint(open(raid_static_data_analysis.__file__, encoding="utf-8").read()),
+            "source": "cache" if getattr(data, "cache_dir", None) else "json",
+            "extra_formula_variables": extra_formula_variables or {},
+            "batch_multipliers": bool(batch_multipliers)}
+
+
+def load_manifest(path=DIFF_MANIFEST_FILE):
+    """
+    :return: The manifest saved by the last run, or None if there isn't one
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(path, manifest):
+    # Write then rename, so a crash halfway through doesn't leave a broken manifest behind
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        # dumps rather than dump, which doesn't get to use the C encoder
+        f.write(json.dumps(manifest, separators=(",", ":")))
+    os.replace(temp_path, path)
+
+
+def _champ_row_blocks(heroes, skill_data_by_id, localization, extra_formula_variables, batch_multipliers):
+    """
+    Work out the rows of the three champ tables for some heroes.
+
+    :param heroes: List of (key, hero record)
+    :return: dict of key -> {"info": rows, "moves": rows, "basics": rows}, rows being lists of values in column order
+    """
+    accumulators = {"info": RowAccumulator(CHAMP_INFO_COLUMNS), "moves": RowAccumulator(CHAMP_MOVE_COLUMNS),
+                    "basics": RowAccumulator(CHAMP_BASICS_COLUMNS)}
+    bounds = []
+    skill_memo = SkillMemo()
+    for key, hero in heroes:
+        starts = {table: len(rows) for table, rows in accumulators.items()}
+        _add_champ_rows(hero, skill_data_by_id, localization, extra_formula_variables, batch_multipliers,
+                        accumulators["info"], accumulators["moves"], accumulators["basics"], skill_memo)
+        bounds.append((key, starts, {table: len(rows) for table, rows in accumulators.items()}))
+
+    tables = {}
+    for table, rows in accumulators.items():
+        columns, values = rows.columns_data()
+        tables[table] = [values[column] for column in columns]
+
+    blocks = {}
+    for key, starts, stops in bounds:
+        blocks[key] = {table: [list(row) for row in zip(*[column[starts[table]:stops[table]]
+                                                          for column in tables[table]])]
+                       for table in tables}
+    return blocks
+
+
+def _stage_rows(stages):
+    """
+    Work out the campaign csv rows for stages. The artifact values are sums over the whole batch of stages at once,
+    whose last bits can depend on how many stages there are, so pass all of them to get the same rows as a full run.
+
+    :param stages: List of (key, stage record)
+    :return: dict of key -> [readable ID, CAMPAIGN_FARMING_COLUMNS values...], for campaign stages only
+    """
+    stage_rewards = normalize_stage_rewards([stage for _, stage in stages])
+    result_df = campaign_stage_metrics(stage_rewards)[CAMPAIGN_FARMING_COLUMNS]
+    keys_by_id = {stage.get("Id"): key for key, stage in stages}
+    return {keys_by_id[stage_id]: [readable_id] + list(values)
+            for stage_id, readable_id, values in zip(stage_rewards["id"].tolist(), result_df.index,
+                                                     result_df.itertuples(index=False))}
+
+
+def _direction(old, new, higher_is_better):
+    """
+    :return: "buff" or "nerf" if a number moved the way that's good or bad for the player, otherwise "changed"
+    """
+    if higher_is_better is None:
+        return "changed"
+    try:
+        old_number, new_number = float(old), float(new)
+    except (TypeError, ValueError):
+        return "changed"
+    if old_number == new_number or old_number != old_number or new_number != new_number:
+        return "changed"
+    return "buff" if (new_number > old_number) == higher_is_better else "nerf"
+
+
+def _same_value(old, new):
+    # Numbers that only differ in the last bits (float rounding) are the same; so are two NaNs
+    if isinstance(old, numbers.Real) and isinstance(new, numbers.Real):
+        return math.isclose(old, new, rel_tol=1e-9, abs_tol=1e-12) or (old != old and new != new)
+    return old == new
+
+
+def _changed_fields(old_row, new_row, fields):
+    for field, higher_is_better in fields.items():
+        old, new = old_row.get(field), new_row.get(field)
+        if not _same_value(old, new):
+            yield field, old, new, _direction(old, new, higher_is_better)
+
+
+def _champ_changes(old_block, new_block):
+    """
+    :return: Changelog rows for one champ, comparing its rows from the last run with the new ones
+    """
+    def rows_of(block, table, columns):
+        return [dict(zip(columns, row)) for row in (block or {}).get(table, [])]
+
+    old_info = rows_of(old_block, "info", CHAMP_INFO_COLUMNS)
+    new_info = rows_of(new_block, "info", CHAMP_INFO_COLUMNS)
+    if not old_info and not new_info:
+        # Not a playable champ, or not the fully ascended one
+        return []
+
+    champ = (new_info or old_info)[0]
+    champ_id = champ["id"]
+    champ_name = champ["name"] or champ["hidden_name"]
+    if not old_info:
+        changes = [["added", "champ", champ_id, champ_name, "", "", ""]]
+        if champ["champ_status"] == 40:
+            changes.append(["released", "champ", champ_id, champ_name, "champ_status", "", 40])
+        return changes
+    if not new_info:
+        return [["removed", "champ", champ_id, champ_name, "", "", ""]]
+
+    changes = []
+    old_champ, new_champ = old_info[0], new_info[0]
+    if old_champ["champ_status"] != new_champ["champ_status"]:
+        change = "released" if new_champ["champ_status"] == 40 else "changed"
+        changes.append([change, "champ", champ_id, champ_name, "champ_status", old_champ["champ_status"],
+                        new_champ["champ_status"]])
+    champ_fields = {column: column in CHANGELOG_CHAMP_STATS or None for column in CHAMP_INFO_COLUMNS
+                    if column not in ("id", "champ_status", "released")}
+    for field, old, new, change in _changed_fields(old_champ, new_champ, champ_fields):
+        changes.append([change, "champ", champ_id, champ_name, field, old, new])
+
+    # Skills by skill ID, effects by effect ID (plus a count, since an effect has a row per status it applies)
+    def moves_of(block):
+        skills, effects = {}, {}
+        for row in rows_of(block, "moves", CHAMP_MOVE_COLUMNS):
+            skills.setdefault(row["skill_id"], row)
+            effect_key = (row["skill_id"], row["effect_id"])
+            effects.setdefault(effect_key, []).append(row)
+        effects = {(skill_id, effect_id, index): row for (skill_id, effect_id), rows in effects.items()
+                   for index, row in enumerate(rows)}
+        return skills, effects
+
+    old_skills, old_effects = moves_of(old_block)
+    new_skills, new_effects = moves_of(new_block)
+
+    def skill_label(row):
+        return f"{champ_name} {row['skill_index']} {row['skill_name'] or row['skill_name_hidden']}"
+
+    for skill_id in list(new_skills) + [skill_id for skill_id in old_skills if skill_id not in new_skills]:
+        old, new = old_skills.get(skill_id), new_skills.get(skill_id)
+        if old is None or new is None:
+            changes.append(["added" if old is None else "removed", "skill", skill_id, skill_label(new or old), "", "",
+                            ""])
+            continue
+        for field, old_value, new_value, change in _changed_fields(old, new, CHANGELOG_SKILL_FIELDS):
+            changes.append([change, "skill", skill_id, skill_label(new), field, old_value, new_value])
+
+    for effect_key in list(new_effects) + [effect_key for effect_key in old_effects if effect_key not in new_effects]:
+        old, new = old_effects.get(effect_key), new_effects.get(effect_key)
+        if old is None or new is None:
+            row = new or old
+            changes.append(["added" if old is None else "removed", "effect", row["effect_id"], skill_label(row),
+                            "effect_type_desc", old["effect_type_desc"] if old else "",
+                            new["effect_type_desc"] if new else ""])
+            continue
+        # A new formula is a buff or nerf if it hits harder or softer
+        damage_direction = _direction(old["calculated_damage"], new["calculated_damage"], True)
+        for field, old_value, new_value, change in _changed_fields(old, new, CHANGELOG_EFFECT_FIELDS):
+            if field == "multiplier":
+                change = damage_direction
+            changes.append([change, "effect", new["effect_id"], skill_label(new), field, old_value, new_value])
+
+    return changes
+
+
+def _stage_changes(old_row, new_row):
+    if old_row is None and new_row is None:
+        return []
+    readable_id = (new_row or old_row)[0]
+    if old_row is None or new_row is None:
+        return [["added" if old_row is None else "removed", "stage", readable_id, readable_id, "", "", ""]]
+    fields = {column: True for column in CAMPAIGN_FARMING_COLUMNS if column != "id"}
+    old = dict(zip(CAMPAIGN_FARMING_COLUMNS, old_row[1:]))
+    new = dict(zip(CAMPAIGN_FARMING_COLUMNS, new_row[1:]))
+    return [[change, "stage", readable_id, readable_id, field, old_value, new_value]
+            for field, old_value, new_value, change in _changed_fields(old, new, fields)]
+
+
+def update_outputs(data, manifest_path=DIFF_MANIFEST_FILE, changelog_path=CHANGELOG_FILE,
+                   extra_formula_variables=None, batch_multipliers=False):
+    """
+    Bring the four csv's up to date with the given static data, only redoing the champs that changed since the run
+    that saved manifest_path. A champ is redone if its own record or the name, or any skill it lists in SkillTypeIds,
+    changed. With no usable manifest (first run, or different settings or code) everything is redone.
+
+    :param data: static data json object
+    :param manifest_path: Where the fingerprints and rows of the last run are kept between runs
+    :param changelog_path: Where to write the changelog. Not written on a first run, when there's nothing to compare.
+    :param extra_formula_variables: See champ_abilities_and_multipliers
+    :param batch_multipliers: See champ_abilities_and_multipliers
+    :return: Changelog DataFrame with CHANGELOG_COLUMNS, or None on a first run
+    """
+    settings = _pipeline_settings(data, extra_formula_variables, batch_multipliers)
+    old_manifest = load_manifest(manifest_path)
+    if old_manifest is not None and old_manifest.get("settings") != settings:
+        logger.info("Settings or code changed since the last run, redoing everything")
+        old_manifest = None
+    old_manifest = old_manifest or {"skills": {}, "heroes": {}, "stages": {}}
+    localization = data.get("StaticDataLocalization")
+
+    # Skills first, since champs depend on them
+    skill_data_by_id = {}
+    skill_fingerprints = {}
+    for key, skill in _record_keys(data["SkillData"]["SkillTypes"]):
+        skill_data_by_id[skill.get("Id")] = skill
+        skill_fingerprints[key] = fingerprint(skill, localization.get(skill.get("Name", {}).get("Key")),
+                                              localization.get(skill.get("Description", {}).get("Key")))
+    changed_skills = {key for key, value in skill_fingerprints.items()
+                      if old_manifest["skills"].get(key) != value}
+
+    heroes = _record_keys(data["HeroData"]["HeroTypes"])
+    hero_fingerprints = {}
+    redo_heroes = []
+    for key, hero in heroes:
+        skill_keys = [str(skill_id) for skill_id in hero.get("SkillTypeIds") or []]
+        hero_fingerprints[key] = fingerprint(hero, localization.get(hero.get("Name", {}).get("Key")),
+                                             [skill_fingerprints.get(skill_key) for skill_key in skill_keys])
+        old_hero = old_manifest["heroes"].get(key)
+        if old_hero is None or old_hero["fingerprint"] != hero_fingerprints[key] or \
+                any(skill_key in changed_skills for skill_key in skill_keys):
+            redo_heroes.append((key, hero))
+    new_blocks = _champ_row_blocks(redo_heroes, skill_data_by_id, localization, extra_formula_variables,
+                                   batch_multipliers)
+
+    # Every stage is worked out again (see _stage_rows), the fingerprints only pick which go in the changelog
+    stages = _record_keys(data["StageData"]["Stages"])
+    stage_fingerprints = {key: fingerprint(stage) for key, stage in stages}
+    changed_stages = {key for key, _ in stages
+                      if old_manifest["stages"].get(key, {}).get("fingerprint") != stage_fingerprints[key]}
+    # Non campaign stages have no row
+    new_stage_rows = dict.fromkeys([key for key, _ in stages])
+    new_stage_rows.update(_stage_rows(stages))
+    logger.info(f"Redoing {len(redo_heroes)} of {len(heroes)} champs, {len(changed_stages)} of {len(stages)} stages "
+                f"changed")
+
+    # Put the new rows and the saved ones back together, in the order of the new static data
+    manifest = {"settings": settings, "skills": skill_fingerprints, "heroes": {}, "stages": {}}
+    row_accumulators = {"info": RowAccumulator(CHAMP_INFO_COLUMNS), "moves": RowAccumulator(CHAMP_MOVE_COLUMNS),
+                        "basics": RowAccumulator(CHAMP_BASICS_COLUMNS)}
+    table_rows = {table: [] for table in row_accumulators}
+    for key, _ in heroes:
+        block = new_blocks[key] if key in new_blocks else old_manifest["heroes"][key]["rows"]
+        manifest["heroes"][key] = {"fingerprint": hero_fingerprints[key], "rows": block}
+        for table, rows in table_rows.items():
+            rows.extend(block[table])
+    for table, rows in row_accumulators.items():
+        columns = list(zip(*table_rows[table])) or [[] for _ in rows.columns]
+        rows.extend_columns((rows.columns, {column: list(values) for column, values in zip(rows.columns, columns)}))
+
+    stage_rows = []
+    for key, _ in stages:
+        row = new_stage_rows[key]
+        manifest["stages"][key] = {"fingerprint": stage_fingerprints[key], "row": row}
+        if row is not None:
+            stage_rows.append(row)
+
+    write_champ_tables(row_accumulators["info"], row_accumulators["moves"], row_accumulators["basics"],
+                       extra_formula_variables, batch_multipliers)
+    result_df = pd.DataFrame([row[1:] for row in stage_rows], index=[row[0] for row in stage_rows],
+                             columns=CAMPAIGN_FARMING_COLUMNS)
+    write_campaign_farming_csv(result_df)
+
+    changelog = None
+    if old_manifest["heroes"] or old_manifest["stages"]:
+        changes = []
+        for key, _ in heroes:
+            if key in new_blocks:
+                changes += _champ_changes(old_manifest["heroes"].get(key, {}).get("rows"), new_blocks[key])
+        for key in old_manifest["heroes"]:
+            if key not in manifest["heroes"]:
+                changes += _champ_changes(old_manifest["heroes"][key]["rows"], None)
+        for key, _ in stages:
+            if key not in changed_stages:
+                continue
+            changes += _stage_changes(old_manifest["stages"].get(key, {}).get("row"), manifest["stages"][key]["row"])
+        for key in old_manifest["stages"]:
+            if key not in manifest["stages"]:
+                changes += _stage_changes(old_manifest["stages"][key]["row"], None)
+
+        changelog = pd.DataFrame(changes, columns=CHANGELOG_COLUMNS, dtype=object)
+        changelog.to_csv(changelog_path, index=False)
+        logger.info(f"{len(changelog)} changes written to {changelog_path}")
+
+    _save_manifest(manifest_path, manifest)
+    return changelog
+
+
+def main(argv=None):
+    import argparse
+
+    from raid_static_data_cache import load_static_data
+
+    arg_parser = argparse.ArgumentParser(description="Update the csv's for what changed in the static data since the "
+                                                     "last run")
+    arg_parser.add_argument("static_data", nargs="?", default="static_data.json", help="Static data json")
+    arg_parser.add_argument("--log-level", default="INFO", help="WARNING to leave out the progress messages")
+    args = arg_parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+
+    update_outputs(load_static_data(args.static_data))
+
+
+if __name__ == '__main__':
+    main()
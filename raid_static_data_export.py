@@ -0,0 +1,168 @@
+"""
+Normalized export of the champ data.
+
+champ_move_details.csv repeats every champ column (stats, aura, status...) on every effect row, and
+champ_moves_basic.csv repeats them again per skill. export_normalized_tables writes the same data as four tables with
+each fact stored once instead:
+
+    heroes               one row per champ, keyed by id (same columns as champ_basic_info.csv)
+    skills               one row per champ skill, keyed by id + skill_id
+    effects              one row per skill effect, keyed by id + effect_id (skill_id links it to its skill)
+    status_applications  one row per buff/debuff an effect places, linked to its effect by id + effect_id
+
+as csv or Parquet files, and/or tables in a SQLite database with indexes on the keys.
+
+    python raid_static_data_export.py [static_data.json] [champ_data.sqlite] [--format csv|parquet|none]
+"""
+import argparse
+
+from raid_static_data_analysis import CHAMP_INFO_COLUMNS, SkillMemo, TableWriter, _add_champ_rows
+
+HERO_COLUMNS = CHAMP_INFO_COLUMNS
+SKILL_COLUMNS = ["id", "skill_id", "skill_index", "skill_name", "skill_cd_unbooked", "skill_cd_booked",
+                 "book_effects", "book_dmg_mul", "book_heal_mul", "book_shield_mul", "multipliers",
+                 "skill_desc", "skill_name_hidden", "skill_desc_hidden"]
+EFFECT_COLUMNS = ["id", "skill_id", "effect_id", "effect_type_code", "effect_type_desc", "target_type_code",
+                  "target_type", "multiplier", "num_hits", "effect_chance_unbooked", "effect_chance_booked",
+                  "calculated_damage", "damage_per_turn"]
+STATUS_APPLICATION_COLUMNS = ["id", "effect_id", "status_type", "status_duration", "cd_minus_duration"]
+
+# Table name -> (columns, columns to index in SQLite)
+NORMALIZED_TABLES = {
+    "heroes": (HERO_COLUMNS, ["id"]),
+    "skills": (SKILL_COLUMNS, ["id", "skill_id"]),
+    "effects": (EFFECT_COLUMNS, ["id", "skill_id", "effect_id"]),
+    "status_applications": (STATUS_APPLICATION_COLUMNS, ["id", "effect_id"]),
+}
+
+
+class _RowSink:
+    """
+    Anything with an append(row), to hand to _add_champ_rows in place of a RowAccumulator
+    """
+
+    def __init__(self, append):
+        self.append = append
+
+
+class _ChampSkillMemo(SkillMemo):
+    """
+    SkillMemo that also keeps the summary of every skill looked up for the current champ, for the skill columns the
+    champ_moves_basic rows don't have (the book multipliers)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.champ_skills = {}
+
+    def skill(self, skill_id, skill_data_by_id, localization):
+        skill = super().skill(skill_id, skill_data_by_id, localization)
+        self.champ_skills[skill_id] = skill
+        return skill
+
+
+class _NormalizedChampRows:
+    """
+    Splits the denormalized rows _add_champ_rows makes into rows of the normalized tables, and passes them on to a
+    list of TableWriters per table.
+    """
+
+    def __init__(self, writers):
+        """
+        :param writers: dict of table name -> list of TableWriters
+        """
+        self.writers = writers
+        self.champ = None
+        # Pass to _add_champ_rows, so skill rows can get at the whole summary of their skill
+        self.skill_memo = _ChampSkillMemo()
+        self.hero_rows = _RowSink(self._add_hero)
+        self.move_rows = _RowSink(self._add_move)
+        self.skill_rows = _RowSink(self._add_skill)
+
+    def _write(self, table, row):
+        for writer in self.writers[table]:
+            writer.append(row)
+
+    def start_champ(self, champ):
+        self.champ = champ
+        self.skill_memo.champ_skills = {}
+
+    def _add_hero(self, row):
+        self._write("heroes", row)
+
+    def _add_move(self, row):
+        effect = {column: row.get(column) for column in EFFECT_COLUMNS}
+        # The quote is only there to stop spreadsheets from treating formulas as formulas
+        effect["multiplier"] = row["multiplier"][1:]
+        self._write("effects", effect)
+        if "status_duration" in row:
+            self._write("status_applications", {column: row.get(column) for column in STATUS_APPLICATION_COLUMNS})
+
+    def _add_skill(self, row):
+        # Skill rows come in SkillTypeIds order, numbered from A1
+        skill_id = self.champ["SkillTypeIds"][int(row["skill_index"][1:]) - 1]
+        skill_columns = self.skill_memo.champ_skills[skill_id]["columns"]
+        skill = {column: row.get(column, skill_columns.get(column)) for column in SKILL_COLUMNS}
+        skill.update(id=self.champ.get("Id"), skill_id=skill_id, multipliers=row["multiplier(s)"])
+        self._write("skills", skill)
+
+
+def export_normalized_tables(data, file_format="csv", sqlite_path=None, file_prefix="champ_",
+                             extra_formula_variables=None):
+    """
+    Write the champ data as normalized heroes, skills, effects and status_applications tables. Values are worked out
+    the same way as for the csv's from champ_abilities_and_multipliers.
+
+    :param data: static data json object
+    :param file_format: "csv" or "parquet" for one file per table (e.g. champ_heroes.csv), or None for no files
+    :param sqlite_path: Optional SQLite database to write the tables into. Tables already there are replaced.
+    :param file_prefix: Start of the file names
+    :param extra_formula_variables: See champ_abilities_and_multipliers
+    :return: dict of table name -> rows written
+    """
+    writers = {table: [] for table in NORMALIZED_TABLES}
+    for table, (columns, index_columns) in NORMALIZED_TABLES.items():
+        if file_format:
+            writers[table].append(TableWriter(f"{file_prefix}{table}.{file_format}", columns, file_format,
+                                              index=False))
+        if sqlite_path:
+            writers[table].append(TableWriter(sqlite_path, columns, "sqlite", table_name=table,
+                                              index_columns=index_columns))
+
+    skill_data_by_id = {skill.get("Id"): skill for skill in data["SkillData"]["SkillTypes"]}
+    localization = data.get("StaticDataLocalization")
+    rows = _NormalizedChampRows(writers)
+    try:
+        for champ in data["HeroData"]["HeroTypes"]:
+            rows.start_champ(champ)
+            _add_champ_rows(champ, skill_data_by_id, localization, extra_formula_variables, False,
+                            rows.hero_rows, rows.move_rows, rows.skill_rows, rows.skill_memo)
+    finally:
+        for table_writers in writers.values():
+            for writer in table_writers:
+                writer.close()
+
+    return {table: table_writers[0].rows_written for table, table_writers in writers.items() if table_writers}
+
+
+def main(argv=None):
+    from raid_static_data_cache import load_static_data
+
+    arg_parser = argparse.ArgumentParser(description="Write the champion data as normalized heroes, skills, effects "
+                                                     "and status_applications tables")
+    arg_parser.add_argument("static_data", nargs="?", default="static_data.json", help="Static data json")
+    arg_parser.add_argument("sqlite", nargs="?", help="SQLite database to write the tables into as well")
+    arg_parser.add_argument("--format", default="csv", choices=["csv", "parquet", "none"],
+                            help="File format of the tables (parquet needs pyarrow), or none for no files")
+    arg_parser.add_argument("--prefix", default="champ_", help="Start of the file names")
+    args = arg_parser.parse_args(argv)
+
+    rows_written = export_normalized_tables(load_static_data(args.static_data),
+                                            file_format=None if args.format == "none" else args.format,
+                                            sqlite_path=args.sqlite, file_prefix=args.prefix)
+    for table, rows in rows_written.items():
+        print(f"{table}: {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+In-memory index over champs, skills and effects, for answering questions like "which champs have an AoE Decrease DEF
+on a skill with cooldown 4 or less?" without going through the csv's.
+
+    index = StaticDataIndex(load_static_data("static_data.json"))
+    for champ_id in index.find_heroes(status="Decrease DEF", target="All enemies", max_cooldown=4):
+        print(index.heroes[champ_id]["name"])
+
+Every filter value is looked up in an inverted index (value -> set of IDs) built up front, and filters are combined
+by intersecting those sets, so queries take microseconds.
+
+Filter values can be given as a code (e.g. status=151) or a name (status="Decrease DEF"), or a list of either to
+accept any of them. Names match exactly if they can, otherwise every name containing the text (ignoring case)
+counts, so "Decrease DEF" means both the 30% and 60% versions.
+"""
+import functools
+import itertools
+
+from raid_static_data_analysis import CODE_DECODERS
+
+# Filter name -> code -> readable name, for the filters that take codes
+INDEX_CODE_NAMES = {name: decoder.names for name, decoder in CODE_DECODERS.items()}
+
+HERO_FILTERS = ["faction", "affinity", "rarity", "role", "aura_stat", "aura_area"]
+EFFECT_FILTERS = ["status", "kind", "target"]
+
+# Every combination of effect filters that gets its own index. Skills and champs are indexed on combinations too, as
+# those filters have to match on one and the same effect.
+EFFECT_FILTER_COMBINATIONS = [combination for size in range(1, len(EFFECT_FILTERS) + 1)
+                              for combination in itertools.combinations(EFFECT_FILTERS, size)]
+
+
+def _add(index, key, item):
+    index.setdefault(key, set()).add(item)
+
+
+def _freeze(index):
+    return {key: frozenset(items) for key, items in index.items()}
+
+
+def _intersect(sets):
+    # Smallest first, so every step is as cheap as it can be
+    sets = sorted(sets, key=len)
+    result = sets[0]
+    for other in sets[1:]:
+        if not result:
+            break
+        result = result & other
+    return result
+
+
+@functools.lru_cache(maxsize=1024)
+def _codes(filter_name, value):
+    names = INDEX_CODE_NAMES[filter_name]
+    if not isinstance(value, str):
+        return frozenset([value])
+    exact = frozenset(code for code, name in names.items() if name == value)
+    if exact:
+        return exact
+    return frozenset(code for code, name in names.items() if value.lower() in name.lower())
+
+
+class StaticDataIndex:
+    """
+    Champs, skills and effects from the static data, with inverted indexes on:
+
+    - champs: faction, affinity, rarity, role, aura stat and aura area
+    - effects: effect kind (EFFECT_TYPES), target (EFFECT_TARGET_TYPES) and buffs/debuffs placed (STATUS_TYPES)
+    - skills: booked and unbooked cooldown, plus every combination of those effect filters (e.g. status and target)
+    - champs again: everything their skills are indexed on
+
+    .heroes, .skills and .effects are dicts of ID -> summary dict.
+    """
+
+    def __init__(self, data, playable_only=True):
+        """
+        :param data: static data json object (or the cached version from raid_static_data_cache)
+        :param playable_only: Only index the champs that make it into champ_basic_info.csv: fully ascended (or
+                              common), with a faction
+        """
+        localization = data.get("StaticDataLocalization")
+        self.heroes = {}
+        self.skills = {}
+        self.effects = {}
+
+        hero_index = {name: {} for name in HERO_FILTERS}
+        effect_index = {name: {} for name in EFFECT_FILTERS}
+        skill_index = {combination: {} for combination in EFFECT_FILTER_COMBINATIONS}
+        skill_cooldown_index = {"cooldown": {}, "cooldown_unbooked": {}}
+        heroes_by_skill = {}
+
+        for skill in data["SkillData"]["SkillTypes"]:
+            skill_id = skill.get("Id")
+            # Same cooldown reduction as champ_abilities_and_multipliers
+            book_cdr = sum(book.get("Value") / 4294967296 for book in skill.get("SkillLevelBonuses") or []
+                           if book.get("SkillBonusType") == 3)
+            effect_ids = []
+            for effect in skill.get("Effects") or []:
+                effect_id = effect.get("Id")
+                target = (effect.get("TargetParams") or {}).get("TargetType")
+                statuses = [(status.get("TypeId"), status.get("Duration")) for status in
+                            (effect.get("ApplyStatusEffectParams") or {}).get("StatusEffectInfos") or []]
+                self.effects[effect_id] = {"id": effect_id, "skill_id": skill_id, "kind": effect.get("KindId"),
+                                           "target": target, "statuses": statuses,
+                                           "multiplier": effect.get("MultiplierFormula"),
+                                           "num_hits": effect.get("Count", 1)}
+                effect_ids.append(effect_id)
+
+                keys = {"status": [status_id for status_id, _ in statuses], "kind": [effect.get("KindId")],
+                        "target": [target]}
+                for name in EFFECT_FILTERS:
+                    for key in keys[name]:
+                        _add(effect_index[name], key, effect_id)
+                for combination in EFFECT_FILTER_COMBINATIONS:
+                    for key in itertools.product(*[keys[name] for name in combination]):
+                        _add(skill_index[combination], key, skill_id)
+
+            cooldown = skill.get("Cooldown")
+            self.skills[skill_id] = {"id": skill_id, "name": localization.get(skill.get("Name", {}).get("Key")),
+                                     "cooldown_unbooked": cooldown, "cooldown": cooldown - round(book_cdr),
+                                     "effect_ids": effect_ids, "hero_ids": []}
+            _add(skill_cooldown_index["cooldown"], cooldown - round(book_cdr), skill_id)
+            _add(skill_cooldown_index["cooldown_unbooked"], cooldown, skill_id)
+
+        for champ in data["HeroData"]["HeroTypes"]:
+            if playable_only and (not (champ.get("Id") % 10 == 6 or champ.get("Rarity") == 1) or
+                                  not champ.get("Fraction")):
+                continue
+            champ_id = champ.get("Id")
+            aura = champ.get("LeaderSkill") or {}
+            record = {"id": champ_id, "name": localization.get(champ.get("Name", {}).get("Key")),
+                      "faction": champ.get("Fraction"), "affinity": champ.get("Element"),
+                      "rarity": champ.get("Rarity"), "role": champ.get("Role"),
+                      "aura_stat": aura.get("StatKindId"), "aura_area": (aura.get("Area") or 0) if aura else None,
+                      "status": champ.get("Status"), "skill_ids": list(champ.get("SkillTypeIds") or [])}
+            self.heroes[champ_id] = record
+            for name in HERO_FILTERS:
+                if record[name] is not None:
+                    _add(hero_index[name], record[name], champ_id)
+            for skill_id in record["skill_ids"]:
+                _add(heroes_by_skill, skill_id, champ_id)
+                if skill_id in self.skills:
+                    self.skills[skill_id]["hero_ids"].append(champ_id)
+
+        self._heroes_by_skill = _freeze(heroes_by_skill)
+
+        def champs_with(skill_ids):
+            return frozenset(champ_id for skill_id in skill_ids for champ_id in self._heroes_by_skill.get(skill_id, ()))
+
+        self._hero_index = {name: _freeze(index) for name, index in hero_index.items()}
+        self._effect_index = {name: _freeze(index) for name, index in effect_index.items()}
+        self._skill_index = {name: _freeze(index) for name, index in skill_index.items()}
+        self._skill_cooldown_index = {name: _freeze(index) for name, index in skill_cooldown_index.items()}
+        # The same again for champs, by the skills they have
+        self._hero_skill_index = {name: {key: champs_with(skill_ids) for key, skill_ids in index.items()}
+                                  for name, index in self._skill_index.items()}
+        self._hero_cooldown_index = {name: {key: champs_with(skill_ids) for key, skill_ids in index.items()}
+                                     for name, index in self._skill_cooldown_index.items()}
+        self.all_heroes = frozenset(self.heroes)
+        self.all_skills = frozenset(self.skills)
+        self.all_effects = frozenset(self.effects)
+
+    @staticmethod
+    def codes(filter_name, value):
+        """
+        Turn a filter value into the codes it stands for.
+
+        :param filter_name: One of INDEX_CODE_NAMES
+        :param value: Code, name, part of a name, or a list/set/tuple of any of those
+        :return: frozenset of codes
+        """
+        if isinstance(value, (list, set, frozenset, tuple)):
+            return frozenset().union(*[_codes(filter_name, item) for item in value])
+        return _codes(filter_name, value)
+
+    def _lookup(self, index, filter_name, value):
+        # IDs matching any of the codes a filter value stands for
+        keys = self.codes(filter_name, value)
+        if len(keys) == 1:
+            return index[filter_name].get(next(iter(keys)), frozenset())
+        return frozenset().union(*[index[filter_name].get(key, ()) for key in keys])
+
+    def _lookup_combination(self, index, status, kind, target):
+        """
+        :return: IDs in a skill or champ effect index matching every effect filter given, or None if none were given
+        """
+        filters = [(name, value) for name, value in (("status", status), ("kind", kind), ("target", target))
+                   if value is not None]
+        if not filters:
+            return None
+        combination_index = index[tuple(name for name, _ in filters)]
+        keys = list(itertools.product(*[self.codes(name, value) for name, value in filters]))
+        if len(keys) == 1:
+            return combination_index.get(keys[0], frozenset())
+        return frozenset().union(*[combination_index.get(key, ()) for key in keys])
+
+    @staticmethod
+    def _in_range(index, min_value, max_value):
+        low = float("-inf") if min_value is None else min_value
+        high = float("inf") if max_value is None else max_value
+        return frozenset().union(*[ids for value, ids in index.items() if low <= value <= high])
+
+    def find_effects(self, status=None, kind=None, target=None):
+        """
+        :return: frozenset of IDs of effects matching every filter given
+        """
+        sets = [self._lookup(self._effect_index, name, value) for name, value in
+                (("status", status), ("kind", kind), ("target", target)) if value is not None]
+        return _intersect(sets) if sets else self.all_effects
+
+    def find_skills(self, status=None, kind=None, target=None, min_cooldown=None, max_cooldown=None, booked=True):
+        """
+        :param status: Skill has an effect that places this buff/debuff (STATUS_TYPES)
+        :param kind: Skill has an effect of this kind (EFFECT_TYPES)
+        :param target: Skill has an effect aimed at this target (EFFECT_TARGET_TYPES). When combined with status or
+                       kind, it has to be the same effect, e.g. status="Decrease DEF", target="All enemies" is an AoE
+                       Decrease DEF, not a single target one on a skill that also does something else to all enemies.
+        :param min_cooldown: Lowest cooldown, inclusive
+        :param max_cooldown: Highest cooldown, inclusive
+        :param booked: Whether the cooldown limits are for the fully booked skill or not
+        :return: frozenset of matching skill IDs
+        """
+        result = self._lookup_combination(self._skill_index, status, kind, target)
+        if min_cooldown is None and max_cooldown is None:
+            return self.all_skills if result is None else result
+
+        column = "cooldown" if booked else "cooldown_unbooked"
+        if result is not None and len(result) < 256:
+            # Quicker to check a few skills than to put together every skill in the cooldown range
+            low = float("-inf") if min_cooldown is None else min_cooldown
+            high = float("inf") if max_cooldown is None else max_cooldown
+            skills = self.skills
+            return frozenset([skill_id for skill_id in result if low <= skills[skill_id][column] <= high])
+        in_range = self._in_range(self._skill_cooldown_index[column], min_cooldown, max_cooldown)
+        return in_range if result is None else result & in_range
+
+    def find_heroes(self, faction=None, affinity=None, rarity=None, role=None, aura_stat=None, aura_area=None,
+                    status=None, kind=None, target=None, min_cooldown=None, max_cooldown=None, booked=True):
+        """
+        :param faction: Champ's faction (FACTIONS)
+        :param affinity: Champ's affinity (AFFINITIES)
+        :param rarity: Champ's rarity (CHAMP_RARITIES)
+        :param role: Champ's role (CHAMP_TYPES)
+        :param aura_stat: Stat the champ's aura boosts (STAT_TYPES, counting from 1)
+        :param aura_area: Where the champ's aura works (AURA_AREAS)
+        :param status: See find_skills. The skill filters all have to match on the same skill.
+        :param kind: See find_skills
+        :param target: See find_skills
+        :param min_cooldown: See find_skills
+        :param max_cooldown: See find_skills
+        :param booked: See find_skills
+        :return: frozenset of matching champ IDs
+        """
+        sets = [self._lookup(self._hero_index, name, value) for name, value in
+                (("faction", faction), ("affinity", affinity), ("rarity", rarity), ("role", role),
+                 ("aura_stat", aura_stat), ("aura_area", aura_area)) if value is not None]
+
+        has_effect_filter = status is not None or kind is not None or target is not None
+        has_cooldown_filter = min_cooldown is not None or max_cooldown is not None
+        column = "cooldown" if booked else "cooldown_unbooked"
+        if has_effect_filter and has_cooldown_filter:
+            # Has to be the same skill, so go through skills
+            skill_ids = self.find_skills(status=status, kind=kind, target=target, min_cooldown=min_cooldown,
+                                         max_cooldown=max_cooldown, booked=booked)
+            heroes_by_skill = self._heroes_by_skill
+            sets.append(frozenset().union(*[heroes_by_skill.get(skill_id, ()) for skill_id in skill_ids]))
+        elif has_effect_filter:
+            sets.append(self._lookup_combination(self._hero_skill_index, status, kind, target))
+        elif has_cooldown_filter:
+            sets.append(self._in_range(self._hero_cooldown_index[column], min_cooldown, max_cooldown))
+
+        return _intersect(sets) if sets else self.all_heroes
+
+    def describe_hero(self, champ_id):
+        """
+        :return: The champ's summary with codes swapped for readable names
+        """
+        record = dict(self.heroes[champ_id])
+        for name in HERO_FILTERS:
+            if record[name] is not None:
+                record[name] = INDEX_CODE_NAMES[name].get(record[name], record[name])
+        return record
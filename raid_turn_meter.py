@@ -0,0 +1,527 @@
+"""
+Turn order simulator, for working out speed tunes: who takes which turn, and how much of the time buffs and debuffs
+are up, for a team against a boss.
+
+Every tick of battle time, each champ's turn meter fills by TURN_METER_TICK x their SPD. Whoever has a full turn meter
+takes a turn (the fullest first if several do), and their turn meter goes back to 0. Rather than stepping through
+ticks, the battle jumps from turn to turn: each champ is in a priority queue under the tick their turn meter fills up
+on, and only champs whose turn meter or SPD changed are put back in it under a new tick.
+
+On their turn, a champ uses the first skill in their skill priority that's off cooldown, and the skill's effects
+happen:
+
+- 4001 "Fill turn meter" and 5001 "Decrease Turn Meter", by the effect's formula (e.g. 0.15*MAX_STAMINA)
+- 4007 "Extra turn", for the champ taking the turn
+- 4000 "Place buff" and 5000 "Place debuff". Every status is tracked for uptime, and 160/161 "Increase SPD" and
+  170/171 "Decrease SPD" change the holder's SPD by a percentage of their base SPD (the biggest buff and biggest
+  debuff count, they don't stack).
+
+Statuses and cooldowns count down at the end of the holder's turns. Statuses placed during the holder's own turn
+don't count down at the end of it. Effects with less than 100% chance land at random (seeded, so results repeat).
+Accuracy and resistance aren't taken into account, and neither is anything else (damage, deaths...).
+
+    team = [battle_unit(champ_move_df, name, speed) for name, speed in [("Kael", 180), ("Apothecary", 230)]]
+    boss = BattleUnit("Clan Boss", 190)
+    result = simulate_battle(team, boss, boss_turns=50)
+    result.turn_sequence()   # Team turns between boss turns
+    result.boss_turn_uptime  # (champ, status) -> share of boss turns it was up for
+
+speed_tune_search tries every combination of speeds for a team, spread over a process pool.
+
+    python raid_turn_meter.py [static_data.json] boss_speed champ=speed [champ=speed ...]
+"""
+import concurrent.futures
+import functools
+import heapq
+import itertools
+import math
+import random
+import sys
+
+import pandas as pd
+
+from raid_static_data_analysis import FORMULA_DEFAULT_VARIABLES, STATUS_TYPES, FormulaError, compile_formula
+
+# Full turn meter, same scale as the MAX_STAMINA formula variable
+TURN_METER_FULL = FORMULA_DEFAULT_VARIABLES["MAX_STAMINA"]
+# Turn meter gained per tick, per point of SPD
+TURN_METER_TICK = 0.07
+
+# Effect KindIds the simulator acts on
+TURN_METER_FILL = 4001
+TURN_METER_DECREASE = 5001
+EXTRA_TURN = 4007
+PLACE_BUFF = 4000
+PLACE_DEBUFF = 5000
+
+# Status TypeId -> change in SPD, as a fraction of base SPD
+SPEED_STATUSES = {160: 0.15, 161: 0.30, 170: -0.15, 171: -0.30}
+
+# Who an effect lands on, by target type code (EFFECT_TARGET_TYPES). "Single Target" and "Target(s) of main effect"
+# depend on the effect: an ally for buffs and turn meter fills, the enemy otherwise.
+TARGET_GROUPS = {1: "self", 4: "self", 7: "allies", 5: "ally", 19: "ally", 30: "ally", 32: "ally", 8: "enemies",
+                 6: "enemy", 20: "enemy", 22: "enemy", 38: "enemy", 39: "enemy", 29: "everyone"}
+_ALLY_EFFECTS = {TURN_METER_FILL, EXTRA_TURN, PLACE_BUFF}
+
+# Combinations of speeds handed to a worker process at a time
+SPEED_TUNE_COMBINATIONS_PER_TASK = 256
+
+_STATUS_CODES = {name: code for code, name in STATUS_TYPES.items()}
+
+
+class BattleSkill:
+    """
+    A skill, as far as turn order goes.
+
+    effects is a list of (kind, target, value, duration, chance): kind is one of the effect KindIds above, target one
+    of "self", "ally", "allies", "enemy", "enemies", "everyone", value is the turn meter amount for turn meter
+    effects and the status TypeId for buffs and debuffs, duration is in turns, chance from 0 to 1.
+    """
+
+    def __init__(self, name, cooldown=0, effects=()):
+        self.name = name
+        self.cooldown = cooldown
+        self.effects = list(effects)
+
+    def __repr__(self):
+        return f"BattleSkill({self.name!r}, {self.cooldown}, {self.effects!r})"
+
+
+class BattleUnit:
+    """
+    A champ (or boss) in the turn order simulation.
+    """
+
+    def __init__(self, name, speed, skills=(), base_speed=None, turn_meter=0.0):
+        """
+        :param name: Name to report turns and uptime under
+        :param speed: Total SPD
+        :param skills: BattleSkills in the order the champ uses them when they're off cooldown. The last one should
+                       have no cooldown (usually the A1). A champ with no skills just takes turns.
+        :param base_speed: SPD before gear etc, which SPD buffs and debuffs are a percentage of. speed if not given.
+        :param turn_meter: Turn meter at the start of the battle
+        """
+        self.name = name
+        self.speed = speed
+        self.skills = list(skills)
+        self.base_speed = speed if base_speed is None else base_speed
+        self.turn_meter = turn_meter
+
+    def __repr__(self):
+        return f"BattleUnit({self.name!r}, {self.speed})"
+
+    def with_speed(self, speed):
+        """
+        :return: Copy of this unit with another total SPD
+        """
+        return BattleUnit(self.name, speed, self.skills, self.base_speed, self.turn_meter)
+
+
+def _effect_target(kind, target_code):
+    try:
+        target_code = int(target_code)
+    except (TypeError, ValueError):
+        return None
+    if target_code in (0, 2):
+        return "ally" if kind in _ALLY_EFFECTS else "enemy"
+    return TARGET_GROUPS.get(target_code)
+
+
+def battle_unit(champ_move_df, champ, speed=None, name=None, skill_priority=None, turn_meter=0.0):
+    """
+    Make a BattleUnit out of a champ's rows of the champ move table.
+
+    :param champ_move_df: DataFrame laid out like champ_move_details.csv
+    :param champ: Champ name or ID
+    :param speed: Total SPD. Base SPD if not given.
+    :param name: Name to report the champ under. The champ's name if not given.
+    :param skill_priority: Skill indexes in the order to use them in, e.g. ["A3", "A1"]. If not given, skills with
+                           a cooldown go first, last skill first, then the A1.
+    :param turn_meter: Turn meter at the start of the battle
+    :return: BattleUnit
+    """
+    rows = champ_move_df[(champ_move_df["name"] == champ).to_numpy() |
+                         (champ_move_df["id"].astype(str) == str(champ)).to_numpy()]
+    if not len(rows):
+        raise KeyError(f"No champ {champ!r} in the move table")
+    rows = rows[rows["id"] == rows["id"].iloc[0]]
+    base_speed = float(pd.to_numeric(rows["spd"]).iloc[0])
+
+    stat_variables = dict(FORMULA_DEFAULT_VARIABLES, HP=float(rows["hp"].iloc[0]), ATK=float(rows["atk"].iloc[0]),
+                          DEF=float(rows["def"].iloc[0]))
+    skills = {}
+    for skill_index, skill_rows in rows.groupby("skill_index", sort=False):
+        effects = []
+        # The move table has a row per status, so other effects of an effect with several statuses come up again
+        seen = set()
+        for row in skill_rows.itertuples(index=False):
+            kind = pd.to_numeric(row.effect_type_code, errors="coerce")
+            target = _effect_target(kind, row.target_type_code)
+            if target is None:
+                continue
+            chance = float(row.effect_chance_booked) if pd.notna(row.effect_chance_booked) else 1.0
+            if kind in (TURN_METER_FILL, TURN_METER_DECREASE):
+                try:
+                    amount = float(compile_formula(row.multiplier[1:]).evaluate(stat_variables))
+                except (FormulaError, ArithmeticError, TypeError):
+                    continue
+                effect = (int(kind), target, amount, 0, chance)
+            elif kind == EXTRA_TURN:
+                effect = (int(kind), target, 0, 0, chance)
+            elif kind in (PLACE_BUFF, PLACE_DEBUFF) and row.status_type in _STATUS_CODES:
+                effect = (int(kind), target, _STATUS_CODES[row.status_type], int(row.status_duration), chance)
+            else:
+                continue
+            if (row.effect_id, effect) not in seen:
+                seen.add((row.effect_id, effect))
+                effects.append(effect)
+        skills[skill_index] = BattleSkill(skill_index, int(pd.to_numeric(skill_rows["skill_cd_booked"]).iloc[0]),
+                                          effects)
+
+    if skill_priority is None:
+        skill_priority = [index for index in reversed(list(skills)) if skills[index].cooldown > 0] + \
+            [index for index in skills if skills[index].cooldown <= 0][:1]
+    return BattleUnit(name or rows["name"].iloc[0], base_speed if speed is None else speed,
+                      [skills[index] for index in skill_priority], base_speed, turn_meter)
+
+
+class BattleResult:
+    """
+    What happened in a simulated battle.
+
+    .sequence is the list of unit names in turn order (if recorded). .turns is a dict of unit name -> turns taken.
+    .uptime and .boss_turn_uptime are dicts of (unit name, status name) -> share of all turns / of the boss's turns
+    the status was on the unit at the start of.
+    """
+
+    def __init__(self, names, boss, sequence, turns, uptime, boss_turn_uptime):
+        self.names = names
+        self.boss = boss
+        self.sequence = sequence
+        self.turns = turns
+        self.uptime = uptime
+        self.boss_turn_uptime = boss_turn_uptime
+
+    def turn_sequence(self):
+        """
+        :return: List of the turns taken between boss turns, each a list of unit names. The first is before the boss's
+                 first turn.
+        """
+        cycles = [[]]
+        for name in self.sequence:
+            if name == self.boss:
+                cycles.append([])
+            else:
+                cycles[-1].append(name)
+        return cycles
+
+    def uptime_frame(self):
+        """
+        :return: DataFrame of uptime by unit and status
+        """
+        return pd.DataFrame({"uptime": pd.Series(self.uptime, dtype=float),
+                             "boss_turn_uptime": pd.Series(self.boss_turn_uptime, dtype=float)}).rename_axis(
+            ["unit", "status"])
+
+
+def _compile_units(units):
+    """
+    :return: Plain lists the simulation loop works on: per unit (speed, base speed, turn meter, skills as (cooldown,
+             effects)), with effect targets resolved to unit indexes per acting unit
+    """
+    team_size = len(units) - 1
+    compiled = []
+    for i, unit in enumerate(units):
+        allies = list(range(team_size)) if i < team_size else [team_size]
+        enemies = [team_size] if i < team_size else list(range(team_size))
+        groups = {"self": (i,), "allies": tuple(allies), "ally": tuple(allies), "enemies": tuple(enemies),
+                  "enemy": tuple(enemies[:1]), "everyone": tuple(range(len(units)))}
+        skills = []
+        for skill in unit.skills:
+            skills.append((skill.cooldown, tuple((kind, groups[target], target == "ally", value, duration, chance)
+                                                 for kind, target, value, duration, chance in skill.effects)))
+        compiled.append((float(unit.speed), float(unit.base_speed), float(unit.turn_meter), tuple(skills)))
+    return compiled
+
+
+def _speed_rate(unit_statuses, speed, base_speed):
+    # Turn meter per tick, with the biggest SPD buff and biggest SPD debuff the unit has
+    buff = debuff = 0
+    for status in unit_statuses:
+        change = SPEED_STATUSES.get(status, 0)
+        if change > buff:
+            buff = change
+        elif change < debuff:
+            debuff = change
+    return (speed + base_speed * (buff + debuff)) * TURN_METER_TICK
+
+
+def _simulate(compiled, max_turns, max_boss_turns, seed, record):
+    """
+    Run the turn meter simulation. The boss is the last unit.
+
+    :return: (sequence of unit indexes or None, turns per unit, per unit dict of status -> turns it was up at the
+              start of, the same at the start of boss turns, boss turns)
+    """
+    units = len(compiled)
+    boss = units - 1
+    rng = random.random
+    if seed is not None:
+        rng = random.Random(seed).random
+    full = TURN_METER_FULL
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+    ceil = math.ceil
+
+    speed = [unit[0] for unit in compiled]
+    base_speed = [unit[1] for unit in compiled]
+    skills = [unit[3] for unit in compiled]
+    rate = [s * TURN_METER_TICK for s in speed]
+    # Turn meter of each unit as of the tick in meter_tick. It fills at rate per tick from then on.
+    meter = [unit[2] for unit in compiled]
+    meter_tick = [0] * units
+    version = [0] * units
+    cooldowns = [[0] * len(unit_skills) for unit_skills in skills]
+    # Per unit: status -> turns left
+    statuses = [{} for _ in range(units)]
+    # Uptime is kept as intervals: per unit, status -> (turns, boss turns) when it was put on, and the totals of
+    # statuses that have come off since
+    placed = [{} for _ in range(units)]
+    uptime = [{} for _ in range(units)]
+    boss_uptime = [{} for _ in range(units)]
+    turns = [0] * units
+    sequence = [] if record else None
+    total_turns = 0
+    boss_turns = 0
+
+    heap = []
+    for i in range(units):
+        if meter[i] >= full:
+            heap.append((0, -meter[i], i, 0))
+        elif rate[i] > 0:
+            ready = max(1, ceil((full - meter[i]) / rate[i] - 1e-9))
+            heap.append((ready, -(meter[i] + rate[i] * ready), i, 0))
+    heapq.heapify(heap)
+
+    while heap and total_turns < max_turns and boss_turns < max_boss_turns:
+        tick, _, i, entry_version = heappop(heap)
+        if entry_version != version[i]:
+            continue
+
+        total_turns += 1
+        turns[i] += 1
+        if i == boss:
+            boss_turns += 1
+        if record:
+            sequence.append(i)
+
+        meter[i] = 0.0
+        meter_tick[i] = tick
+        extra_turn = False
+        placed_on_self = ()
+        rescheduled = []
+
+        unit_cooldowns = cooldowns[i]
+        for skill_number, (cooldown, effects) in enumerate(skills[i]):
+            if unit_cooldowns[skill_number] > 0:
+                continue
+            unit_cooldowns[skill_number] = cooldown
+            for kind, targets, single_ally, value, duration, chance in effects:
+                if chance < 1 and rng() >= chance:
+                    continue
+                if single_ally:
+                    # The ally furthest from a turn
+                    targets = (min(targets, key=lambda t: meter[t] + rate[t] * (tick - meter_tick[t])),)
+                if kind == TURN_METER_FILL or kind == TURN_METER_DECREASE:
+                    for target in targets:
+                        target_meter = meter[target] + rate[target] * (tick - meter_tick[target]) + \
+                            (value if kind == TURN_METER_FILL else -value)
+                        meter[target] = full if target_meter > full else 0.0 if target_meter < 0 else target_meter
+                        meter_tick[target] = tick
+                        rescheduled.append(target)
+                elif kind == EXTRA_TURN:
+                    extra_turn = True
+                elif kind == PLACE_BUFF or kind == PLACE_DEBUFF:
+                    for target in targets:
+                        target_statuses = statuses[target]
+                        turns_left = target_statuses.get(value)
+                        if turns_left is None:
+                            target_statuses[value] = duration
+                            placed[target][value] = (total_turns, boss_turns)
+                            if value in SPEED_STATUSES:
+                                meter[target] += rate[target] * (tick - meter_tick[target])
+                                meter_tick[target] = tick
+                                rate[target] = _speed_rate(target_statuses, speed[target], base_speed[target])
+                                rescheduled.append(target)
+                        elif duration > turns_left:
+                            target_statuses[value] = duration
+                        if target == i:
+                            placed_on_self += (value,)
+            break
+
+        # End of the turn: count down the unit's cooldowns and statuses
+        for skill_number, turns_left in enumerate(unit_cooldowns):
+            if turns_left > 0:
+                unit_cooldowns[skill_number] = turns_left - 1
+        unit_statuses = statuses[i]
+        if unit_statuses:
+            speed_changed = False
+            for status, turns_left in list(unit_statuses.items()):
+                if status in placed_on_self:
+                    continue
+                if turns_left > 1:
+                    unit_statuses[status] = turns_left - 1
+                    continue
+                del unit_statuses[status]
+                placed_turns, placed_boss_turns = placed[i].pop(status)
+                uptime[i][status] = uptime[i].get(status, 0) + total_turns - placed_turns
+                boss_uptime[i][status] = boss_uptime[i].get(status, 0) + boss_turns - placed_boss_turns
+                speed_changed = speed_changed or status in SPEED_STATUSES
+            if speed_changed:
+                rate[i] = _speed_rate(unit_statuses, speed[i], base_speed[i])
+
+        # Back in the queue under the tick their turn meter fills up on
+        if extra_turn:
+            meter[i] = full
+            version[i] += 1
+            heappush(heap, (tick, -math.inf, i, version[i]))
+        else:
+            rescheduled.append(i)
+        if len(rescheduled) > 1:
+            rescheduled = set(rescheduled)
+        for target in rescheduled:
+            if extra_turn and target == i:
+                continue
+            version[target] += 1
+            target_meter = meter[target]
+            if target_meter >= full:
+                heappush(heap, (tick, -target_meter, target, version[target]))
+            elif rate[target] > 0:
+                ready = tick + max(1, ceil((full - target_meter) / rate[target] - 1e-9))
+                heappush(heap, (ready, -(target_meter + rate[target] * (ready - tick)), target, version[target]))
+
+    # Statuses still up at the end
+    for i in range(units):
+        for status, (placed_turns, placed_boss_turns) in placed[i].items():
+            uptime[i][status] = uptime[i].get(status, 0) + total_turns - placed_turns
+            boss_uptime[i][status] = boss_uptime[i].get(status, 0) + boss_turns - placed_boss_turns
+
+    return sequence, turns, uptime, boss_uptime, boss_turns
+
+
+def simulate_battle(team, boss, boss_turns=50, max_turns=100000, seed=0, record=True):
+    """
+    Simulate the turn order of a team against a boss.
+
+    :param team: List of BattleUnits
+    :param boss: BattleUnit
+    :param boss_turns: Stop after this many boss turns
+    :param max_turns: Or after this many turns in all
+    :param seed: Seed for the effects with less than 100% chance
+    :param record: Keep the whole turn sequence
+    :return: BattleResult
+    """
+    units = list(team) + [boss]
+    names = [unit.name for unit in units]
+    sequence, turns, uptime, boss_uptime, boss_turns_taken = _simulate(_compile_units(units), max_turns, boss_turns,
+                                                                       seed, record)
+    total_turns = sum(turns)
+
+    def shares(counts, total):
+        return {(names[unit], STATUS_TYPES.get(status, str(status))): count / total
+                for unit, unit_counts in enumerate(counts) for status, count in unit_counts.items()} if total else {}
+
+    return BattleResult(names, boss.name, [names[i] for i in sequence] if record else None,
+                        dict(zip(names, turns)), shares(uptime, total_turns), shares(boss_uptime, boss_turns_taken))
+
+
+def _speed_tune_task(team, boss, combinations, boss_turns, max_turns, seed):
+    """
+    :return: (list of result rows, one per combination of speeds, turns simulated)
+    """
+    rows = []
+    simulated = 0
+    for speeds in combinations:
+        units = [unit.with_speed(unit_speed) for unit, unit_speed in zip(team, speeds)] + [boss]
+        sequence, turns, _, boss_uptime, taken = _simulate(_compile_units(units), max_turns, boss_turns, seed, True)
+        simulated += len(sequence)
+
+        # How many of the last boss turns had the same team turns before them as the last one
+        cycles = [[]]
+        for unit in sequence:
+            if unit == len(team):
+                cycles.append([])
+            else:
+                cycles[-1].append(unit)
+        cycles = cycles[1:-1] or cycles
+        stable = next((n for n, cycle in enumerate(reversed(cycles)) if cycle != cycles[-1]), len(cycles))
+
+        row = list(speeds) + [turns[unit] / max(taken, 1) for unit in range(len(team))] + [stable]
+        row.append({(unit, status): count / max(taken, 1) for unit, counts in enumerate(boss_uptime)
+                    for status, count in counts.items()})
+        rows.append(row)
+    return rows, simulated
+
+
+def speed_tune_search(team, boss, speeds, boss_turns=50, max_turns=100000, seed=0, workers=1,
+                      combinations_per_task=SPEED_TUNE_COMBINATIONS_PER_TASK):
+    """
+    Simulate every combination of speeds for the team.
+
+    A process gets through roughly 140,000-240,000 turns a second, depending on the team and the machine, so the
+    combinations are spread over workers processes. Millions of turns a second takes 8 or more cores.
+
+    :param team: List of BattleUnits
+    :param boss: BattleUnit
+    :param speeds: List with the speeds to try for each champ in the team, e.g. [range(170, 190), [230, 231]]
+    :param boss_turns: Boss turns to simulate per combination
+    :param max_turns: Or this many turns in all, per combination
+    :param seed: See simulate_battle
+    :param workers: Number of processes to spread the combinations over
+    :param combinations_per_task: Combinations handed to a worker process at a time
+    :return: DataFrame with a row per combination: the speeds ("<name> spd"), turns per boss turn ("<name> turns"),
+             the number of boss turns at the end with the same team turns before them as the last ("stable"), and
+             the share of boss turns each status was up on each unit for ("<unit>: <status>"). .attrs["turns_simulated"]
+             is the number of turns simulated in all.
+    """
+    if not boss.speed > 0:
+        raise ValueError(f"Boss {boss.name!r} has SPD {boss.speed!r}, it would never take a turn")
+    team = list(team)
+    combinations = itertools.product(*[list(unit_speeds) for unit_speeds in speeds])
+    tasks = iter(lambda: list(itertools.islice(combinations, combinations_per_task)), [])
+    names = [unit.name for unit in team] + [boss.name]
+
+    task = functools.partial(_speed_tune_task, team, boss, boss_turns=boss_turns, max_turns=max_turns,
+                             seed=seed)
+    rows = []
+    simulated = 0
+    if workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(task, tasks))
+    else:
+        results = map(task, tasks)
+    for task_rows, task_simulated in results:
+        rows.extend(task_rows)
+        simulated += task_simulated
+
+    columns = [f"{unit.name} spd" for unit in team] + [f"{unit.name} turns" for unit in team] + ["stable"]
+    result = pd.DataFrame([row[:-1] for row in rows], columns=columns)
+    uptime = pd.DataFrame([{f"{names[unit]}: {STATUS_TYPES.get(status, status)}": share
+                            for (unit, status), share in row[-1].items()} for row in rows], index=result.index)
+    result = pd.concat([result, uptime.fillna(0.0)], axis=1)
+    result.attrs["turns_simulated"] = simulated
+    return result
+
+
+if __name__ == '__main__':
+    from raid_damage_calculator import champ_damage_tables
+    from raid_static_data_cache import load_static_data
+
+    static_data = load_static_data(sys.argv[1] if len(sys.argv) > 1 else "static_data.json")
+    _, moves = champ_damage_tables(static_data)
+    battle = simulate_battle([battle_unit(moves, champ, float(champ_speed))
+                              for champ, champ_speed in (arg.split("=", 1) for arg in sys.argv[3:])],
+                             BattleUnit("Boss", float(sys.argv[2]) if len(sys.argv) > 2 else 190.0))
+    for boss_turn, cycle in enumerate(battle.turn_sequence()):
+        print(f"{boss_turn}: {', '.join(cycle)}")
+    print(battle.uptime_frame().to_string())
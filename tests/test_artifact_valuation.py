@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from raid_artifact_valuation import VaultValuation, artifact_indexes, value_vault
+from raid_static_data_analysis import ARTIFACT_SELL_PRICES
+
+# The same vault by ID and by name, plus records that can't be priced
+VAULT_BY_ID = [
+    {"set": 4, "kind": 4, "rank": 6, "rarity": 5},
+    {"set": 1, "kind": 1, "rank": 5, "rarity": 4},
+    {"set": 4, "kind": 2, "rank": 6, "rarity": 5},
+    {"set": 9, "kind": 8, "rank": 3, "rarity": 1},
+]
+VAULT_BY_NAME = [
+    {"set": "Speed", "kind": "Boots", "rank": "6", "rarity": "Legendary"},
+    {"set": "life", "kind": "HELMET", "rank": "five", "rarity": "Epic"},
+    {"set": "Speed", "kind": "Armor", "rank": 6, "rarity": "legendary"},
+    {"set": "LifeDrain", "kind": "Cloak", "rank": 3, "rarity": "Common"},
+]
+UNPRICED = [
+    {"set": "Not a set", "kind": "Boots", "rank": 6, "rarity": "Legendary"},
+    {"set": 4, "kind": 4, "rank": 7, "rarity": 5},
+    {"set": 4, "kind": 4, "rank": None, "rarity": 5},
+]
+
+
+def _expected_value():
+    return sum(ARTIFACT_SELL_PRICES[record["set"] - 1, record["kind"] - 1, record["rank"] - 1, record["rarity"] - 1]
+               for record in VAULT_BY_ID)
+
+
+@pytest.mark.parametrize("field, values, expected", [
+    ("set", [1, 4, 42, 43, 0], [0, 3, 41, -1, -1]),
+    ("set", ["Speed", "critical rate", "CritRate", "4", "Speedy", None], [3, 4, 4, 3, -1, -1]),
+    ("kind", ["Boots", "armor", "Cloak", 2.0, 2.5], [3, 1, 7, 1, -1]),
+    ("rank", ["six", "6", 1, 7], [5, 5, 0, -1]),
+    ("rarity", ["Legendary", "epic", 1, "Mythical"], [4, 3, 0, -1]),
+])
+def test_artifact_indexes(field, values, expected):
+    assert list(artifact_indexes(field, np.array(values, dtype=object) if None in values else values)) == expected
+
+
+def test_names_and_ids_price_the_same():
+    by_id = VaultValuation()
+    by_id.add(*[[record[field] for record in VAULT_BY_ID] for field in ["set", "kind", "rank", "rarity"]])
+    by_name = VaultValuation()
+    by_name.add(*[[record[field] for record in VAULT_BY_NAME] for field in ["set", "kind", "rank", "rarity"]])
+    assert np.array_equal(by_id.counts, by_name.counts)
+    assert by_id.total_value() == pytest.approx(_expected_value())
+    assert by_id.unpriced == by_name.unpriced == 0
+
+    by_id.merge(by_name)
+    assert by_id.counts.sum() == 8
+    assert by_id.total_value() == pytest.approx(2 * _expected_value())
+
+
+def test_exports_give_the_same_valuation(tmp_path):
+    records = VAULT_BY_ID + VAULT_BY_NAME + UNPRICED
+    pd.DataFrame(records).to_csv(tmp_path / "vault.csv", index=False)
+    with open(tmp_path / "vault.json", "w", encoding="utf-8") as f:
+        json.dump({"account": {"artifacts": records}}, f)
+    with open(tmp_path / "vault.jsonl", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+    valuations = [value_vault(str(tmp_path / "vault.csv"), chunk_rows=3),
+                  value_vault(str(tmp_path / "vault.json"), keys=("account", "artifacts"), chunk_rows=3),
+                  value_vault(str(tmp_path / "vault.jsonl"), chunk_rows=3)]
+    for valuation in valuations:
+        assert valuation.counts.sum() == 8
+        assert valuation.unpriced == len(UNPRICED)
+        assert valuation.total_value() == pytest.approx(2 * _expected_value())
+        assert np.array_equal(valuation.counts, valuations[0].counts)
+
+
+def test_other_column_names(tmp_path):
+    pd.DataFrame(VAULT_BY_ID).rename(columns={"set": "setKindId"}).to_csv(tmp_path / "vault.csv", index=False)
+    valuation = value_vault(str(tmp_path / "vault.csv"), columns={"set": "setKindId"})
+    assert valuation.total_value() == pytest.approx(_expected_value())
+
+
+def test_totals():
+    valuation = VaultValuation()
+    valuation.add(*[[record[field] for record in VAULT_BY_ID] for field in ["set", "kind", "rank", "rarity"]])
+    by_set = valuation.totals(["set"])
+    assert list(by_set.index.get_level_values("set")) == ["Life", "Speed", "Lifesteal"]
+    assert list(by_set["count"]) == [1, 2, 1]
+    assert by_set["value"].sum() == pytest.approx(valuation.total_value())
+
+    by_rank_set = valuation.totals(["rank", "set"])
+    assert list(by_rank_set.index) == [("3", "Lifesteal"), ("5", "Life"), ("6", "Speed")]
+    assert len(valuation.totals()) == 4
@@ -0,0 +1,75 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from raid_static_data_analysis import (CODE_DECODERS, UNKNOWN_CODE_NAME, CodeDecoder, add_unknown_codes,
+                                       calculate_damage_columns, log_unknown_codes, reset_unknown_codes,
+                                       unknown_codes)
+
+
+@pytest.fixture(autouse=True)
+def no_unknown_codes():
+    reset_unknown_codes()
+    yield
+    reset_unknown_codes()
+
+
+def test_known_codes():
+    decoder = CodeDecoder("stat", ["HP", "ATK", "DEF"], first_code=1)
+    assert [decoder.decode(code) for code in (1, 2, 3)] == ["HP", "ATK", "DEF"]
+    assert 2 in decoder and 0 not in decoder
+    assert not decoder.unknown_counts
+    assert CODE_DECODERS["target"].decode(8) == "All enemies"
+
+
+@pytest.mark.parametrize("code", [0, 4, 1000, -1, None, "2", 2.5])
+def test_unknown_codes_decode_to_the_sentinel(code):
+    decoder = CodeDecoder("stat", ["HP", "ATK", "DEF"], first_code=1)
+    assert decoder.decode(code) == UNKNOWN_CODE_NAME
+    assert decoder.decode(code) == UNKNOWN_CODE_NAME
+    assert decoder.unknown_counts == {code: 2}
+
+
+def test_decode_array_matches_decode():
+    names = {0: "zero", 3: "three", 7: "seven"}
+    codes = [7, 0, 3, 1, 8, -2, 3, 100]
+    one_at_a_time = CodeDecoder("test", names, unknown=None)
+    at_once = CodeDecoder("test", names, unknown=None)
+    assert at_once.decode_array(codes).tolist() == [one_at_a_time.decode(code) for code in codes]
+    assert at_once.unknown_counts == one_at_a_time.unknown_counts == {1: 1, 8: 1, -2: 1, 100: 1}
+
+    # Blanks read from a csv come in as NaN
+    assert at_once.decode_array(np.array([3.0, np.nan])).tolist() == ["three", None]
+    assert at_once.decode_array([]).tolist() == []
+
+
+def test_uncounted_decoder():
+    decoder = CodeDecoder("test", {5: "five"}, count_unknown=False)
+    assert decoder.decode(6) == UNKNOWN_CODE_NAME
+    assert decoder.decode_array([5, 6]).tolist() == ["five", UNKNOWN_CODE_NAME]
+    assert not decoder.unknown_counts
+
+
+def test_unknown_code_reports(caplog):
+    CODE_DECODERS["faction"].decode(999)
+    add_unknown_codes({"faction": {999: 2}, "kind": {12345: 1}})
+    assert unknown_codes() == {"faction": {999: 3}, "kind": {12345: 1}}
+    with caplog.at_level(logging.WARNING, logger="raid_static_data_analysis"):
+        log_unknown_codes()
+    assert "Unknown faction codes: 999 (3x)" in caplog.text
+    reset_unknown_codes()
+    assert unknown_codes() == {}
+
+
+def test_book_multipliers_by_effect_kind():
+    # Damage, heal, shield, and a kind books don't boost
+    champ_move_df = pd.DataFrame({
+        "hp": [1000] * 4, "atk": [100] * 4, "def": [10] * 4, "multiplier": ["'ATK"] * 4, "num_hits": [1] * 4,
+        "effect_type_code": [6000, 1000, 4000, 7000], "skill_cd_booked": [0] * 4,
+        "book_dmg_mul": [1.2] * 4, "book_heal_mul": [1.5] * 4, "book_shield_mul": [2.0] * 4,
+    })
+    damage = calculate_damage_columns(champ_move_df)
+    assert damage["calculated_damage"].tolist() == [120.0, 150.0, 200.0, 100.0]
+    assert unknown_codes() == {}
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from raid_damage_calculator import apply_gear, calculate_skill_damage, damage_effects
+
+# One Magic champ: A1 hits twice for 3.5*ATK (booked +10%), A2 hits for ATK plus 10% of the target's max HP and also
+# places a buff, which isn't damage
+MOVES = pd.DataFrame({
+    "id": [1006] * 4,
+    "name": ["Champ"] * 4,
+    "affinity": ["Magic"] * 4,
+    "skill_index": ["A1", "A2", "A2", "A2"],
+    "skill_id": [10061, 10062, 10062, 10062],
+    "skill_cd_booked": [0, 3, 3, 3],
+    "effect_id": [1, 2, 3, 4],
+    "effect_type_code": [6000, 6000, 6000, 4000],
+    "multiplier": ["'3.5*ATK", "'ATK", "'0.1*TRG_MAX_HP", ""],
+    "num_hits": [2, 1, 1, 1],
+    "book_dmg_mul": [1.1, 1.0, 1.0, 1.0],
+})
+
+BASE_STATS = pd.DataFrame({"id": [1006], "hp": [20000.0], "atk": [1000.0], "def": [900.0], "spd": [100.0],
+                           "cr_rate": [15.0], "cr_dmg": [50.0], "res": [30.0], "acc": [0.0]})
+
+BOSSES = pd.DataFrame({"def": [600.0, 0.0], "hp": [1e5, 1e5], "affinity": ["Spirit", "Force"]},
+                      index=["Spirit boss", "Force boss"])
+
+
+def _builds(**columns):
+    return pd.DataFrame({"id": [1006], "hp": [20000.0], "atk": [1000.0], "def": [900.0], "cr_rate": [50.0],
+                         "cr_dmg": [100.0], **columns}, index=["build"])
+
+
+def test_damage_effects():
+    assert list(damage_effects(MOVES)["effect_id"]) == [1, 2, 3]
+
+
+def test_apply_gear():
+    gear = pd.DataFrame({"id": [1006, 1006], "atk_pct": [50, None], "atk": [100, 0], "cr_rate": [30, 85],
+                         "build": ["nuker", "crit"]})
+    builds = apply_gear(BASE_STATS, gear)
+    assert list(builds["atk"]) == [1600, 1000]
+    assert list(builds["cr_rate"]) == [45, 100]
+    assert list(builds["hp"]) == [20000, 20000]
+    assert list(builds["build"]) == ["nuker", "crit"]
+    assert "atk_pct" not in builds
+
+
+def test_skill_damage():
+    damage = calculate_skill_damage(MOVES, _builds(), BOSSES)
+    assert list(damage.skills["skill_index"]) == ["A1", "A2"]
+
+    # Strong hit through 600 DEF, which halves damage
+    a1 = 3.5 * 1000 * 2 * 1.1 * 0.5 * 1.3
+    assert damage.non_crit[0, 0] == pytest.approx(a1)
+    assert damage.crit[0, 0] == pytest.approx(a1 * 2)
+    assert damage.expected[0, 0] == pytest.approx(a1 * 1.5)
+
+    # Weak hit, no DEF: can't crit
+    a2 = (1000 + 0.1 * 1e5) * 0.7
+    assert damage.non_crit[1, 1] == pytest.approx(a2)
+    assert damage.expected[1, 1] == pytest.approx(a2)
+    assert damage.per_turn(damage.expected)[1, 1] == pytest.approx(a2 / 3)
+
+    best = damage.best()
+    assert list(best["boss"]) == ["Spirit boss", "Force boss"]
+    assert list(best["skill_index"]) == ["A2", "A2"]
+    assert list(damage.best(per_turn=True)["skill_index"]) == ["A1", "A1"]
+    assert len(damage.to_frame()) == 4
+
+
+def test_masteries_and_defense():
+    plain = calculate_skill_damage(MOVES, _builds(), BOSSES)
+    damage = calculate_skill_damage(MOVES, _builds(deadly_precision=True, bring_it_down=True, def_ignore=0.5), BOSSES)
+    # Boss has more HP than the champ, so Bring it Down counts; half of 600 DEF ignored
+    non_crit = plain.non_crit[0, 0] / 0.5 * (600 / 900) * 1.06
+    assert damage.non_crit[0, 0] == pytest.approx(non_crit)
+    assert damage.expected[0, 0] == pytest.approx(non_crit * 1.55)
+
+    bosses = BOSSES.assign(def_down=0.6, damage_taken=1.25)
+    debuffed = calculate_skill_damage(MOVES, _builds(), bosses)
+    assert debuffed.non_crit[0, 0] == pytest.approx(plain.non_crit[0, 0] / 0.5 * (600 / 840) * 1.25)
+
+
+def test_missing_target_hp_is_nan():
+    damage = calculate_skill_damage(MOVES, _builds(), BOSSES.drop(columns="hp"))
+    assert np.isfinite(damage.expected[0]).all()
+    assert np.isnan(damage.expected[1]).all()
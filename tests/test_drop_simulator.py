@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_drop_simulator import DROP_SIMULATION_OUTCOMES, simulate_stage_drops
+from raid_static_data_analysis import campaign_stage_metrics, normalize_stage_rewards
+
+# Outcome -> per run column of campaign_stage_metrics it should average out to
+PER_RUN_COLUMNS = {"shard": "shard/run", "common": "com/run", "uncommon": "unc/run", "rare": "rare/run",
+                   "silver": "silver/run"}
+
+
+@pytest.fixture(scope="module")
+def stage_rewards(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=7)
+    with open(path, encoding="utf-8") as f:
+        return normalize_stage_rewards(json.load(f)["StageData"]["Stages"])
+
+
+def test_means_match_stage_metrics(stage_rewards):
+    runs, trials = 20, 4000
+    simulation = simulate_stage_drops(stage_rewards, runs, trials, seed=1)
+    metrics = campaign_stage_metrics(stage_rewards)
+    metrics = metrics[~metrics.index.duplicated(keep="last")].loc[simulation.stage_ids]
+    for outcome, column in PER_RUN_COLUMNS.items():
+        samples = simulation.samples[outcome]
+        expected = runs * np.nan_to_num(metrics[column].to_numpy(dtype=float))
+        # Within 6 standard errors, plus a little for stages that never vary
+        allowed = 6 * samples.std(axis=1) / np.sqrt(trials) + 1e-6 * np.abs(expected) + 1e-9
+        assert (np.abs(samples.mean(axis=1) - expected) <= allowed).all(), outcome
+
+
+def test_same_results_for_any_number_of_workers(stage_rewards):
+    stages = list(stage_rewards["readable_id"][:24])
+    serial = simulate_stage_drops(stage_rewards, 10, 200, seed=3, stages=stages)
+    parallel = simulate_stage_drops(stage_rewards, 10, 200, seed=serial.seed_entropy, stages=stages, workers=2,
+                                    stages_per_task=5)
+    assert list(parallel.stage_ids) == list(serial.stage_ids) == stages
+    for outcome in DROP_SIMULATION_OUTCOMES:
+        assert np.array_equal(parallel.samples[outcome], serial.samples[outcome]), outcome
+
+    # A stage's draws don't depend on which other stages are simulated with it
+    alone = simulate_stage_drops(stage_rewards, 10, 200, seed=3, stages=stages[5:6])
+    assert np.array_equal(alone.samples["silver"][0], serial.samples["silver"][5])
+
+
+def test_summary_and_chances(stage_rewards):
+    simulation = simulate_stage_drops(stage_rewards, 10, 500, seed=4, stages=stage_rewards["readable_id"][:3])
+    summary = simulation.summary()
+    assert len(summary) == 3
+    assert (summary["artifact p10"] <= summary["artifact p50"]).all()
+    assert (summary["artifact p50"] <= summary["artifact p90"]).all()
+    assert (simulation.chance_of_at_least("artifact", 0) == 1).all()
+    assert (simulation.chance_of_at_least("artifact", 11) == 0).all()
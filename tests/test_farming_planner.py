@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_farming_planner import FarmingPlanner, food_xp_needed
+
+linprog = pytest.importorskip("scipy.optimize").linprog
+
+
+@pytest.fixture(scope="module")
+def planner(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=6)
+    with open(path, encoding="utf-8") as f:
+        return FarmingPlanner.from_static_data(json.load(f))
+
+
+def _targets(planner, resources, count, seed):
+    columns = planner._resource_columns(resources)
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0.01, 1, (count, len(resources))) * planner.yields[:, columns].max(axis=0) * 300
+
+
+@pytest.mark.parametrize("resources", [("xp",), ("silver", "shard"), ("xp", "rare", "silver", "shard"),
+                                       ("xp", "common", "uncommon", "rare", "silver", "shard")])
+def test_targets_match_linprog(planner, resources):
+    columns = planner._resource_columns(resources)
+    for amounts in _targets(planner, resources, 10, len(resources)):
+        expected = linprog(planner.energy, A_ub=-planner.yields[:, columns].T, b_ub=-amounts, bounds=(0, None))
+        plan = planner.plan_targets(dict(zip(resources, amounts)))
+        assert plan["energy"] == pytest.approx(expected.fun, rel=1e-6)
+        totals = np.array([plan["totals"][resource] for resource in resources])
+        assert (totals >= amounts * (1 - 1e-9)).all()
+        assert sum(planner.energy[list(planner.stage_ids).index(stage_id)] * runs
+                   for stage_id, runs in plan["runs"].items()) == pytest.approx(plan["energy"])
+
+
+def test_many_targets_match_one_at_a_time(planner):
+    resources = ("xp", "silver")
+    targets = _targets(planner, resources, 20, 0)
+    runs, energy = planner.plan_targets_many(resources, targets)
+    for amounts, plan_runs, plan_energy in zip(targets, runs, energy):
+        assert plan_energy == pytest.approx(planner.plan_targets(dict(zip(resources, amounts)))["energy"])
+        assert plan_runs @ planner.energy == pytest.approx(plan_energy)
+
+
+def test_integer_targets(planner):
+    targets = {"xp": food_xp_needed(10, 40000, champs_per_run=3), "shard": 5}
+    plan = planner.plan_targets(targets, integer=True)
+    assert all(runs == int(runs) for runs in plan["runs"].values())
+    assert all(plan["totals"][resource] >= amount - 1e-6 for resource, amount in targets.items())
+    assert plan["energy"] >= planner.plan_targets(targets)["energy"] - 1e-6
+
+
+def test_budget_matches_linprog(planner):
+    weights = {"silver": 1, "shard": 100000}
+    weight_vector = np.array([weights.get(resource, 0) for resource in planner.resources])
+    expected = linprog(-(planner.yields @ weight_vector), A_ub=planner.energy[None, :], b_ub=[5000], bounds=(0, None))
+    plan = planner.plan_budget(5000, weights)
+    assert plan["value"] == pytest.approx(-expected.fun, rel=1e-9)
+    assert plan["energy"] == pytest.approx(5000)
+
+    whole = planner.plan_budget(5000, weights, integer=True)
+    assert whole["energy"] <= 5000
+    assert whole["value"] <= plan["value"] * (1 + 1e-9)
+
+
+def test_unknown_resource(planner):
+    with pytest.raises(ValueError):
+        planner.plan_targets({"gems": 10})
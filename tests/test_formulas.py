@@ -0,0 +1,150 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_static_data_analysis import (CompiledFormula, FormulaError, _FormulaParser, champ_abilities_and_multipliers,
+                                       compile_formula, evaluate_formulas_batched)
+
+STATS = {"HP": 20000, "ATK": 1500, "DEF": 1000}
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("3.4*ATK", 3.4 * 1500),
+    ("0.2*HP+3*ATK", 0.2 * 20000 + 3 * 1500),
+    ("1+2*3", 7),
+    ("(1+2)*3", 9),
+    ("10-4-3", 3),
+    ("12/4/3", 1),
+    ("7%4*2", 6),
+    ("-ATK+2*DEF", 500),
+    ("--2", 2),
+    ("-2*-3", 6),
+    ("+4", 4),
+    ("2*-(1+2)", -6),
+    ("1+2<4", True),
+    ("1<2==2<3", True),
+    ("1||0&&0", True),
+    ("!0", True),
+    ("!(1+1)", False),
+    ("ATK>DEF ? 2 : 3", 2),
+    ("ATK<DEF ? 2 : DEF>HP ? 3 : 4", 4),
+    ("1 ? 2 : 3 ? 4 : 5", 2),
+])
+def test_precedence_and_unary(formula, expected):
+    assert compile_formula(formula).evaluate(STATS) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("min(4*ATK, 0.1*HP)", 2000),
+    ("MAX(1, 2, 3)", 3),
+    ("abs(-3)", 3),
+    ("floor(2.7)+ceil(2.1)", 5),
+    ("round(2.345, 2)", 2.35),
+    ("sqrt(16)", 4),
+    ("pow(2, 10)", 1024),
+    ("clamp(ATK, 0, 1000)", 1000),
+    ("if(ATK>DEF, 1, 2)", 1),
+    ("and(1, 0)+or(1, 0)+not(0)", 2),
+])
+def test_whitelisted_calls(formula, expected):
+    assert compile_formula(formula).evaluate(STATS) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("formula, source, value", [
+    ("05*ATK", "(5 * _v['ATK'])", 7500),
+    ("007.50*ATK", "(7.5 * _v['ATK'])", 11250),
+    ("1.*ATK", "(1.0 * _v['ATK'])", 1500),
+    (".5*ATK", "(0.5 * _v['ATK'])", 750),
+    ("1e3", "1000.0", 1000),
+])
+def test_number_literals(formula, source, value):
+    compiled = CompiledFormula(formula)
+    assert compiled.source == source
+    assert compiled.evaluate(STATS) == value
+
+
+def test_int_and_float_literals_keep_their_arithmetic():
+    assert isinstance(compile_formula("2*3").evaluate({}), int)
+    assert isinstance(compile_formula("2.0*3").evaluate({}), float)
+    assert compile_formula("1e999").evaluate({}) == float("inf")
+
+
+def test_ast():
+    assert _FormulaParser("-A+2*B").parse() == \
+        ("binary", "+", ("unary", "-", ("var", "A")), ("binary", "*", ("num", "2"), ("var", "B")))
+    assert _FormulaParser("max(A, 1) ? 1 : 0").parse() == \
+        ("if", ("call", "max", [("var", "A"), ("num", "1")]), ("num", "1"), ("num", "0"))
+
+
+@pytest.mark.parametrize("formula", [
+    "", "2*", "*2", "(1+2", "1+2)", "1 2", "ATK ? 1", "min(1,", "min(1 2)", "foo(1)", "__import__('os')",
+    "ATK.real", "ATK[0]", "1 = 1", "'a'", "2**3", "ATK; 1", "lambda: 1",
+])
+def test_bad_input(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_bad_formula_cached_as_error():
+    for _ in range(2):
+        with pytest.raises(FormulaError):
+            compile_formula("3*(ATK")
+
+
+def test_missing_variable():
+    formula = compile_formula("0.1*TRG_MAX_HP+ATK")
+    assert formula.missing_variables(STATS) == ["TRG_MAX_HP"]
+    with pytest.raises(FormulaError, match="TRG_MAX_HP"):
+        formula.evaluate(STATS)
+
+
+def test_batched_matches_scalar():
+    formulas = ["3*ATK", "05*ATK", "min(ATK, DEF)+HP*0.1", "ATK>DEF ? 1 : 2", "", None, "3*(ATK", "TRG_HP*2",
+                "1/0*ATK"]
+    rows = len(formulas)
+    variables = {"HP": np.arange(rows) * 1000.0 + 1, "ATK": np.arange(rows) * 100.0 + 50,
+                 "DEF": np.full(rows, 400.0)}
+    results, failures = evaluate_formulas_batched(formulas, variables)
+
+    for row, formula in enumerate(formulas):
+        try:
+            expected = compile_formula(formula).evaluate({name: values[row] for name, values in variables.items()})
+        except (FormulaError, ArithmeticError, TypeError, AttributeError):
+            expected = np.nan
+        if not np.isfinite(expected):
+            expected = np.nan
+        assert results[row] == pytest.approx(expected, nan_ok=True), formula
+    assert set(failures) == {"3*(ATK", "TRG_HP*2", "1/0*ATK"}
+    assert pd.isna(results[formulas.index("1/0*ATK")])
+
+
+def test_batched_champ_tables_match_per_effect(tmp_path, monkeypatch):
+    path = tmp_path / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=10)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["HeroData"]["HeroTypes"] = data["HeroData"]["HeroTypes"][:120]
+    extra_variables = {"TRG_HP": 50000, "TRG_MAX_HP": 100000}
+
+    tables = {}
+    for batch_multipliers in (False, True):
+        run_dir = tmp_path / str(batch_multipliers)
+        run_dir.mkdir()
+        monkeypatch.chdir(run_dir)
+        champ_abilities_and_multipliers(data, extra_formula_variables=extra_variables,
+                                        batch_multipliers=batch_multipliers)
+        tables[batch_multipliers] = {name: pd.read_csv(run_dir / f"{name}.csv", index_col=0)
+                                     for name in ["champ_basic_info", "champ_moves_basic", "champ_move_details"]}
+
+    damage_columns = ["calculated_damage", "damage_per_turn"]
+    for name, table in tables[False].items():
+        batched = tables[True][name]
+        pd.testing.assert_frame_equal(table.drop(columns=damage_columns, errors="ignore"),
+                                      batched.drop(columns=damage_columns, errors="ignore"))
+    moves, batched_moves = tables[False]["champ_move_details"], tables[True]["champ_move_details"]
+    assert moves["calculated_damage"].notna().any()
+    for column in damage_columns:
+        assert np.allclose(moves[column].astype(float), batched_moves[column].astype(float), equal_nan=True)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_instrumentation import RUN_STATS, RunStats
+from raid_static_data_analysis import _process_champs
+
+
+def test_phases_counters_and_merge(tmp_path):
+    stats = RunStats()
+    with stats.phase("outer"):
+        with stats.phase("inner"):
+            pass
+        with stats.phase("inner"):
+            pass
+    stats.count("effects", 3)
+    stats.count("effects")
+    assert stats.phases["inner"][1] == 2
+    assert stats.phases["outer"][0] >= stats.phases["inner"][0]
+
+    # A worker's stats, added to the main process's
+    worker = RunStats()
+    worker.add_time("inner", 1.5)
+    worker.count("effects", 6)
+    stats.merge(worker.snapshot())
+    assert stats.phases["inner"][1] == 3
+    assert stats.counters["effects"] == 10
+
+    stats.write_report(str(tmp_path / "report.json"))
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert report["counters"] == {"effects": 10}
+    assert list(report["phases"]) == ["inner", "outer"]
+
+
+@pytest.fixture(scope="module")
+def static_data(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=5)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_formulas_are_timed_per_skill(static_data):
+    skill_data_by_id = {skill.get("Id"): skill for skill in static_data["SkillData"]["SkillTypes"]}
+    RUN_STATS.reset()
+    info, moves, _ = _process_champs(static_data["HeroData"]["HeroTypes"][:120], skill_data_by_id,
+                                     static_data["StaticDataLocalization"], None, False)
+    counters = RUN_STATS.counters
+    assert counters["heroes_processed"] == len(info)
+    assert counters["effects"] == len({(row_id, effect_id) for row_id, effect_id in
+                                       zip(moves.columns_data()[1]["id"], moves.columns_data()[1]["effect_id"])})
+    # Once per skill worked out, not once per effect
+    assert RUN_STATS.phases["formula_eval"][1] == counters["multiplier_memo_misses"] < counters["effects"]
+    RUN_STATS.reset()
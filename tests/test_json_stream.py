@@ -0,0 +1,137 @@
+import io
+import json
+
+import pytest
+
+from raid_benchmark import synthetic_counts, write_synthetic_static_data
+from raid_static_data_analysis import JsonStream, iter_json_array, iter_json_object, open_static_data
+
+STATIC_DATA_ARRAYS = [("HeroData", "HeroTypes"), ("SkillData", "SkillTypes"), ("StageData", "Stages")]
+
+# Strings with escapes and brackets in them, numbers, nesting and whitespace, to get cut up at every chunk boundary
+TRICKY_JSON = """ {
+  "skip": {"a": "x\\"]}", "b": [[1, [2, [3, {}]]], []], "c": "\\\\"},
+  "Items": [
+    "plain", "with \\"escaped\\" quotes", "ends in a backslash \\\\", "\\\\\\"", "brackets ]}[{ inside",
+    "unicode \\u00e9\\u4e2d \\ud83d\\ude00", "",
+    -12.5e-3, 0, 123456789012345678901234567890, 1E+2, true, false, null,
+    [], {}, [[[[]]]], {"nested": {"deeper": [1, {"x": "}"}]}},
+    {"Id": 1, "Name": {"Key": "h16n", "DefaultValue": "Champ"}}
+  ],
+  "Map": {"k1": "v1", "k\\"2": [1, 2], "k3": {"a": null}},
+  "Last": 7
+}"""
+
+
+@pytest.fixture(scope="module")
+def synthetic_json(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=1)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return str(path), data
+
+
+@pytest.mark.parametrize("chunk_size", [997, 1 << 20])
+def test_synthetic_static_data_matches_json_load(synthetic_json, chunk_size):
+    path, data = synthetic_json
+    for keys in STATIC_DATA_ARRAYS:
+        assert list(iter_json_array(path, *keys, chunk_size=chunk_size)) == data[keys[0]][keys[1]]
+    localization = list(iter_json_object(path, "StaticDataLocalization", chunk_size=chunk_size))
+    assert localization == list(data["StaticDataLocalization"].items())
+
+    counts = synthetic_counts(1)
+    assert len(data["HeroData"]["HeroTypes"]) == counts["hero_types"]
+    assert len(data["StageData"]["Stages"]) == counts["stages"]
+
+
+def test_open_static_data_matches_json_load(synthetic_json):
+    path, data = synthetic_json
+    streamed = open_static_data(path, chunk_size=4096)
+    for keys in STATIC_DATA_ARRAYS:
+        # Streams can be iterated again
+        for _ in range(2):
+            assert list(streamed[keys[0]][keys[1]]) == data[keys[0]][keys[1]]
+    assert streamed["StaticDataLocalization"] == data["StaticDataLocalization"]
+
+
+def test_indented_static_data_matches_json_load(synthetic_json, tmp_path):
+    # Same data, with whitespace everywhere it's allowed
+    _, data = synthetic_json
+    path = tmp_path / "indented.json"
+    data = {"HeroData": {"HeroTypes": data["HeroData"]["HeroTypes"][:300]},
+            "SkillData": {"SkillTypes": data["SkillData"]["SkillTypes"][:200]}}
+    path.write_text(json.dumps(data, indent=3), encoding="utf-8")
+    for chunk_size in (61, 4096):
+        assert list(iter_json_array(str(path), "SkillData", "SkillTypes", chunk_size=chunk_size)) == \
+            data["SkillData"]["SkillTypes"]
+
+
+def _stream(text, chunk_size):
+    return JsonStream(io.StringIO(text), chunk_size)
+
+
+def _read_all(stream):
+    # Everything in TRICKY_JSON, read through the stream the way the analysis does
+    result = {}
+    for key in stream.iter_object_keys():
+        if key == "Items":
+            result[key] = list(stream.iter_array())
+        elif key == "Map":
+            result[key] = {}
+            for map_key in stream.iter_object_keys():
+                result[key][map_key] = stream.read_value()
+        elif key == "skip":
+            stream.skip_value()
+        else:
+            result[key] = stream.read_value()
+    return result
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 41))
+def test_tokens_split_across_chunks(chunk_size):
+    expected = json.loads(TRICKY_JSON)
+    del expected["skip"]
+    assert _read_all(_stream(TRICKY_JSON, chunk_size)) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8, 13])
+def test_seek_across_chunks(chunk_size):
+    stream = _stream(TRICKY_JSON, chunk_size)
+    stream.seek("Map")
+    assert dict((key, stream.read_value()) for key in stream.iter_object_keys()) == json.loads(TRICKY_JSON)["Map"]
+
+    stream = _stream(TRICKY_JSON, chunk_size)
+    stream.seek("Items")
+    assert list(stream.iter_array()) == json.loads(TRICKY_JSON)["Items"]
+
+
+def test_missing_key():
+    with pytest.raises(KeyError):
+        _stream(TRICKY_JSON, 16).seek("Map", "nope")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_truncated_input_raises_value_error(chunk_size):
+    # Every cut short version of the document fails with a ValueError, not an IndexError or a hang
+    text = TRICKY_JSON.rstrip()
+    for end in range(len(text) - 1):
+        with pytest.raises(ValueError):
+            _read_all(_stream(text[:end], chunk_size))
+
+
+@pytest.mark.parametrize("text", [
+    '{"Items" [1]}',
+    '{"Items": [1 2]}',
+    '{"Items": [1,, 2]}',
+    '{"Items": [1, 2}',
+    '{"Items": [1, 2]; "Last": 1}',
+    '{"Items": [tru]}',
+    '{"Items": ["open]}',
+    '{"Items": [1, 2], "Last": @}',
+    '[1, 2]',
+])
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 20])
+def test_malformed_input_raises_value_error(text, chunk_size):
+    with pytest.raises(ValueError):
+        _read_all(_stream(text, chunk_size))
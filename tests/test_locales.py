@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_static_data_analysis import champ_abilities_and_multipliers, champ_abilities_and_multipliers_by_locale
+
+TABLES = ["champ_basic_info", "champ_moves_basic", "champ_move_details"]
+
+
+@pytest.fixture(scope="module")
+def static_data(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=8)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["HeroData"]["HeroTypes"] = data["HeroData"]["HeroTypes"][:150]
+    return data
+
+
+@pytest.mark.parametrize("batch_multipliers, workers", [(False, 1), (True, 2)])
+def test_each_locale_matches_a_run_in_that_language(static_data, tmp_path, monkeypatch, batch_multipliers, workers):
+    english = static_data["StaticDataLocalization"]
+    german = {key: f"Übersetzt {value}" for key, value in english.items()}
+    monkeypatch.chdir(tmp_path)
+    champ_abilities_and_multipliers_by_locale(static_data, {"en": english, "de": german},
+                                              batch_multipliers=batch_multipliers, workers=workers,
+                                              heroes_per_task=40)
+
+    for language, localization in [("en", english), ("de", german)]:
+        single = tmp_path / language
+        single.mkdir()
+        monkeypatch.chdir(single)
+        champ_abilities_and_multipliers(dict(static_data, StaticDataLocalization=localization),
+                                        batch_multipliers=batch_multipliers)
+        for table in TABLES:
+            assert (tmp_path / f"{table}_{language}.csv").read_bytes() == (single / f"{table}.csv").read_bytes(), \
+                (language, table)
+    assert "Übersetzt" in (tmp_path / "champ_basic_info_de.csv").read_text(encoding="utf-8")
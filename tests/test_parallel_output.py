@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_static_data_analysis import main
+
+OUTPUT_FILES = ["champ_basic_info.csv", "champ_moves_basic.csv", "champ_move_details.csv",
+                "raid_campaign_farming_data.csv"]
+
+
+@pytest.fixture(scope="module")
+def static_data_json(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=4)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["HeroData"]["HeroTypes"] = data["HeroData"]["HeroTypes"][:300]
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return path
+
+
+def test_workers_give_the_same_csvs(static_data_json, tmp_path, monkeypatch):
+    outputs = {}
+    processed = {}
+    for workers in (1, 3):
+        run_dir = tmp_path / f"workers_{workers}"
+        run_dir.mkdir()
+        monkeypatch.chdir(run_dir)
+        main([str(static_data_json), "--workers", str(workers), "--log-level", "WARNING"])
+        outputs[workers] = {name: (run_dir / name).read_bytes() for name in OUTPUT_FILES}
+        processed[workers] = json.loads((run_dir / "raid_run_report.json").read_text())["counters"]["heroes_processed"]
+    assert outputs[1] == outputs[3]
+    # Counters from the workers make it into the report
+    assert processed[1] == processed[3] > 0
+
+
+def test_workers_must_be_positive(static_data_json, capsys):
+    with pytest.raises(SystemExit):
+        main([str(static_data_json), "--workers", "0"])
+    assert "--workers" in capsys.readouterr().err
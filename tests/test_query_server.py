@@ -0,0 +1,51 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_query_server import QueryError, StaticDataState, answer_query
+
+
+@pytest.fixture(scope="module")
+def state(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=4)
+    return StaticDataState(str(path))
+
+
+def test_lookups(state):
+    assert answer_query(state, "/status")["heroes"] == len(state.index.heroes)
+    assert answer_query(state, "/heroes/1006")["id"] == 1006
+    assert answer_query(state, "/skills/10061")["id"] == 10061
+
+    page = answer_query(state, "/heroes", "faction=Dwarves&limit=3&offset=1")
+    expected = sorted(state.index.find_heroes(faction="Dwarves"))
+    assert page["count"] == len(expected)
+    assert [hero["id"] for hero in page["results"]] == expected[1:4]
+
+    stage_id = state.stage_ids[0]
+    assert answer_query(state, f"/stages/{stage_id}")["id"] == stage_id
+    ranked = answer_query(state, "/stages", "sort=silver/e&limit=5")["results"]
+    assert [stage["silver/e"] for stage in ranked] == sorted([stage["silver/e"] for stage in ranked], reverse=True)
+    json.dumps(ranked, allow_nan=False)
+
+
+@pytest.mark.parametrize("path, query, status", [
+    ("/nothing", "", HTTPStatus.NOT_FOUND),
+    ("/heroes/1/2", "", HTTPStatus.NOT_FOUND),
+    ("/heroes/1001", "", HTTPStatus.NOT_FOUND),
+    ("/skills/1", "", HTTPStatus.NOT_FOUND),
+    ("/stages/99-9-Br", "", HTTPStatus.NOT_FOUND),
+    ("/heroes/abc", "", HTTPStatus.BAD_REQUEST),
+    ("/heroes", "colour=red", HTTPStatus.BAD_REQUEST),
+    ("/skills", "max_cooldown=four", HTTPStatus.BAD_REQUEST),
+    ("/skills", "max_cooldown=3&max_cooldown=4", HTTPStatus.BAD_REQUEST),
+    ("/effects", "limit=-1", HTTPStatus.BAD_REQUEST),
+    ("/stages", "sort=colour", HTTPStatus.BAD_REQUEST),
+    ("/stages", "faction=Dwarves", HTTPStatus.BAD_REQUEST),
+])
+def test_errors(state, path, query, status):
+    with pytest.raises(QueryError) as error:
+        answer_query(state, path, query)
+    assert error.value.status == status
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from raid_static_data_analysis import (ARTIFACT_SELL_PRICES, ARTIFACT_SET_BASE_PRICES, ITEM_RANK_SELL_VALUE_MULTIPLIERS,
+                                       ITEM_RANK_VALUE_MULTIPLIERS, ITEM_RARITY_VALUE_MULTIPLIERS,
+                                       ITEM_TYPE_VALUE_MULTIPLIERS, artifact_sell_prices, calculate_expected_sell_value,
+                                       expected_sell_values)
+
+
+def _one_hot(indexes, size):
+    return np.eye(size)[indexes]
+
+
+@pytest.mark.parametrize("cell", [(0, 0, 0, 0), (3, 3, 5, 4), (41, 8, 2, 1)])
+def test_tensor_cells(cell):
+    item_set, kind, rank, rarity = cell
+    expected = ARTIFACT_SET_BASE_PRICES[item_set] * ITEM_TYPE_VALUE_MULTIPLIERS[kind] * \
+        ITEM_RANK_VALUE_MULTIPLIERS[rank] * ITEM_RANK_SELL_VALUE_MULTIPLIERS[rank] * ITEM_RARITY_VALUE_MULTIPLIERS[rarity]
+    assert ARTIFACT_SELL_PRICES.shape == (42, 9, 6, 5)
+    assert ARTIFACT_SELL_PRICES[cell] == pytest.approx(expected)
+
+
+def test_known_and_averaged_sets_and_kinds_agree():
+    sets = np.array([0, 3, 41])
+    kinds = np.array([8, 3, 0])
+    expected = ARTIFACT_SELL_PRICES[sets, kinds]
+    set_probabilities = _one_hot(sets, 42)
+    kind_probabilities = _one_hot(kinds, 9)
+    for item_sets in (sets, set_probabilities):
+        for item_kinds in (kinds, kind_probabilities):
+            assert np.allclose(artifact_sell_prices(item_sets, item_kinds), expected)
+
+    # Half and half is the average of the two
+    mixed_sets = np.tile([0.5, 0.5] + [0.0] * 40, (3, 1))
+    averaged = (ARTIFACT_SELL_PRICES[0, kinds] + ARTIFACT_SELL_PRICES[1, kinds]) / 2
+    assert np.allclose(artifact_sell_prices(mixed_sets, kinds), averaged)
+    assert np.allclose(artifact_sell_prices(mixed_sets, kind_probabilities), averaged)
+
+
+def test_expected_sell_values():
+    rng = np.random.default_rng(0)
+    probabilities = rng.dirichlet(np.ones(30), size=4).reshape(4, 6, 5)
+    sets = np.array([0, 5, 10, 41])
+    kinds = np.array([0, 2, 4, 8])
+    values = expected_sell_values(probabilities, sets, kinds)
+    for n in range(4):
+        assert values[n] == pytest.approx((probabilities[n] * ARTIFACT_SELL_PRICES[sets[n], kinds[n]]).sum())
+        assert calculate_expected_sell_value(probabilities[n], sets[n], kinds[n]) == pytest.approx(values[n])
+    # Only a 30% chance of an artifact at all
+    assert expected_sell_values(probabilities * 0.3, sets, kinds) == pytest.approx(values * 0.3)
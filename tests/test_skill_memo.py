@@ -0,0 +1,52 @@
+import copy
+import json
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_instrumentation import RUN_STATS
+from raid_static_data_analysis import SkillMemo, champ_abilities_and_multipliers
+
+TABLES = ["champ_basic_info.csv", "champ_moves_basic.csv", "champ_move_details.csv"]
+
+
+@pytest.fixture(scope="module")
+def static_data(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=9)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    heroes = data["HeroData"]["HeroTypes"][:60]
+    # A reskin: another champ with the first one's skills, at other stats
+    reskin = copy.deepcopy(heroes[5])
+    reskin["Id"] = 99996
+    reskin["BaseStats"]["Attack"] = reskin["BaseStats"]["Attack"] * 2
+    data["HeroData"]["HeroTypes"] = heroes + [reskin]
+    return data
+
+
+def _run(data, directory, monkeypatch, skill_memo=None):
+    directory.mkdir()
+    monkeypatch.chdir(directory)
+    RUN_STATS.reset()
+    champ_abilities_and_multipliers(data, skill_memo=skill_memo)
+    counters = dict(RUN_STATS.counters)
+    RUN_STATS.reset()
+    return {table: (directory / table).read_bytes() for table in TABLES}, counters
+
+
+def test_memo_gives_the_same_tables(static_data, tmp_path, monkeypatch):
+    memo = SkillMemo()
+    first, first_counters = _run(static_data, tmp_path / "first", monkeypatch, memo)
+    again, again_counters = _run(static_data, tmp_path / "again", monkeypatch, memo)
+    tiny, _ = _run(static_data, tmp_path / "tiny", monkeypatch, SkillMemo(maxsize=2))
+    assert first == again == tiny
+
+    # The reskin's skills were already worked out, but not at its stats
+    assert first_counters["skill_memo_hits"] >= 4
+    assert first_counters["multiplier_memo_misses"] > 0
+    # Everything was worked out the first time round
+    assert again_counters.get("skill_memo_misses", 0) == 0
+    assert again_counters.get("multiplier_memo_misses", 0) == 0
+    assert again_counters["skill_memo_hits"] == first_counters["skill_memo_hits"] + \
+        first_counters["skill_memo_misses"]
@@ -0,0 +1,50 @@
+import numpy as np
+
+from raid_static_data_analysis import (STAGE_DECODERS, _id_probabilities, campaign_stage_metrics,
+                                       normalize_stage_rewards, stage_drop_info)
+
+
+def _stage(stage_id, kinds, sets, energy=4):
+    return {
+        "Id": stage_id,
+        "StartCondition": {"Price": {"RawValues": {"1": energy}}},
+        "RewardHeroXp": 400,
+        "Rewards": [{"Type": 3, "MinCount": 100, "MaxCount": 100}],
+        "Reward": {"Rewards": [{"Type": 4, "Probability": 100}], "ArtifactProbsByRankId": {"1": 100},
+                   "ArtifactProbsByRarityId": {"1": 100}, "ArtifactProbsByKindId": kinds,
+                   "ArtifactProbsBySetKindId": sets},
+    }
+
+
+def test_id_probabilities():
+    assert _id_probabilities({"1": 30, "3": 10, "99": 60}, 4) == [0.3, 0.0, 0.1, 0.0]
+    assert _id_probabilities({}, 3) == [0.0, 0.0, 0.0]
+    assert _id_probabilities({1: 0, 2: 0}, 5) == [0.0] * 5
+
+
+def test_zero_artifact_weights_dont_stop_other_stages():
+    stages = [_stage(1011101, {"1": 0}, {"1": 0, "2": 0}), _stage(1011102, {"1": 100}, {"1": 100})]
+    stage_rewards = normalize_stage_rewards(stages, STAGE_DECODERS)
+    assert not stage_rewards["set_probabilities"][0].any()
+    assert not stage_rewards["kind_probabilities"][0].any()
+    metrics = campaign_stage_metrics(stage_rewards)
+    assert len(metrics) == 2
+    assert np.isfinite(metrics["silver/e"]).all()
+    assert metrics["silver/e"].iloc[1] > metrics["silver/e"].iloc[0]
+
+
+def test_stages_without_energy_cost_have_no_per_energy_returns(tmp_path, monkeypatch):
+    stages = [_stage(1011101, {"1": 100}, {"1": 100}), _stage(2000001, {"1": 100}, {"1": 100}, energy=0),
+              _stage(1011102, {"1": 100}, {"1": 100}, energy=8)]
+    metrics = campaign_stage_metrics(normalize_stage_rewards(stages, STAGE_DECODERS))
+    free = metrics.iloc[1]
+    for column in ["xp/e", "com/e", "silver/e", "shard/e", "e return/e", "real xp/e"]:
+        assert np.isnan(free[column]), column
+    assert free["xp/run"] == 200
+    assert np.isfinite(metrics.iloc[[0, 2]][["xp/e", "silver/e", "real xp/e"]].to_numpy()).all()
+
+    monkeypatch.chdir(tmp_path)
+    ranked = stage_drop_info(stages)
+    # Best per energy first, free stage last
+    assert list(ranked["energy"]) == [4, 8, 0]
+    assert (tmp_path / "raid_stage_farming_data.csv").exists()
@@ -0,0 +1,36 @@
+import json
+import os
+
+from raid_static_data_cache import LocalizationStore, load_localization_store
+
+LOCALIZATION = {"h1n": "Kael", "s1d": "Attacks 1 enemy.\nPoisons.", "empty": "", "unicode": "Zhè 中 \U0001f600"}
+
+
+def test_localization_store_matches_dict(tmp_path):
+    store = LocalizationStore.build(str(tmp_path / "en.loc"), LOCALIZATION.items())
+    assert dict(store) == LOCALIZATION
+    assert len(store) == len(LOCALIZATION)
+    assert store.get("nope") is None
+    assert "h1n" in store and "nope" not in store
+    store.close()
+
+
+def test_load_localization_store_rebuilds_when_the_json_changes(tmp_path):
+    json_path = tmp_path / "static_data_de.json"
+    json_path.write_text(json.dumps({"HeroData": {}, "StaticDataLocalization": LOCALIZATION}), encoding="utf-8")
+
+    store = load_localization_store(str(json_path))
+    assert dict(store) == LOCALIZATION
+    store.close()
+    store_path = tmp_path / "static_data_de.loc"
+    built = store_path.stat().st_mtime_ns
+
+    # Touched but the same, the store is kept
+    os.utime(json_path)
+    load_localization_store(str(json_path)).close()
+    assert store_path.stat().st_mtime_ns == built
+
+    json_path.write_text(json.dumps({"StaticDataLocalization": {"h1n": "Kael DE"}}), encoding="utf-8")
+    store = load_localization_store(str(json_path))
+    assert dict(store) == {"h1n": "Kael DE"}
+    store.close()
@@ -0,0 +1,71 @@
+import copy
+import json
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_static_data_diff import _changed_fields, update_outputs
+
+OUTPUT_FILES = ["champ_basic_info.csv", "champ_moves_basic.csv", "champ_move_details.csv",
+                "raid_campaign_farming_data.csv"]
+
+
+@pytest.fixture(scope="module")
+def static_data(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=3)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    # A few champs is plenty, all the stages so the changed ones are a small part of them
+    data["HeroData"]["HeroTypes"] = data["HeroData"]["HeroTypes"][:60]
+    return data
+
+
+def _patched(data):
+    # A made up game patch: some campaign stages give more silver, a champ gets more ATK
+    data = copy.deepcopy(data)
+    stages = [stage for stage in data["StageData"]["Stages"] if str(stage["Id"]).startswith("1") and
+              any(reward["Type"] == 3 for reward in stage.get("Rewards") or [])][:20:4]
+    for stage in stages:
+        for reward in stage["Rewards"]:
+            if reward["Type"] == 3:
+                reward["MinCount"] += 100
+                reward["MaxCount"] += 100
+    # The 6th grade of the first champ, the one that gets rows
+    hero = data["HeroData"]["HeroTypes"][5]
+    hero["BaseStats"]["Attack"] += 100 * 390018709
+    return data, len(stages), hero["Id"]
+
+
+def test_incremental_update_matches_full_run(static_data, tmp_path, monkeypatch):
+    patched, patched_stages, hero_id = _patched(static_data)
+
+    (tmp_path / "full").mkdir()
+    (tmp_path / "incremental").mkdir()
+
+    monkeypatch.chdir(tmp_path / "full")
+    assert update_outputs(patched) is None
+
+    monkeypatch.chdir(tmp_path / "incremental")
+    update_outputs(static_data)
+    changelog = update_outputs(patched)
+    for name in OUTPUT_FILES:
+        assert (tmp_path / "incremental" / name).read_bytes() == (tmp_path / "full" / name).read_bytes(), name
+
+    # Only the patched stages and champ show up, no rounding noise from anything worked out again
+    stage_changes = changelog[changelog["kind"] == "stage"]
+    assert set(stage_changes["field"]) == {"silver/e"}
+    assert stage_changes["id"].nunique() == patched_stages
+    assert set(changelog[changelog["kind"] == "champ"]["id"]) == {hero_id}
+
+    # Nothing changed, nothing to report
+    assert update_outputs(patched).empty
+
+
+def test_changed_fields_ignores_float_rounding():
+    fields = {"silver/e": True, "cd": False, "name": None}
+    old = {"silver/e": 465.2037305210417, "cd": 4, "name": "A"}
+    assert list(_changed_fields(old, {"silver/e": 465.20373052104173, "cd": 4, "name": "A"}, fields)) == []
+    assert list(_changed_fields({"silver/e": float("nan")}, {"silver/e": float("nan")}, fields)) == []
+    assert list(_changed_fields(old, {"silver/e": 466.0, "cd": 3, "name": "B"}, fields)) == [
+        ("silver/e", 465.2037305210417, 466.0, "buff"), ("cd", 4, 3, "buff"), ("name", "A", "B", "changed")]
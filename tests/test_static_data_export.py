@@ -0,0 +1,69 @@
+import json
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_static_data_analysis import champ_abilities_and_multipliers
+from raid_static_data_export import NORMALIZED_TABLES, export_normalized_tables, main
+
+
+@pytest.fixture(scope="module")
+def static_data(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=2)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["HeroData"]["HeroTypes"] = data["HeroData"]["HeroTypes"][:60]
+    # A booked skill with nothing but a description
+    skill = next(skill for skill in data["SkillData"]["SkillTypes"] if skill["Id"] == 10061)
+    skill["Effects"] = []
+    skill["SkillLevelBonuses"] = [{"SkillBonusType": 0, "Value": 644245094}, {"SkillBonusType": 4, "Value": 429496729}]
+    return data
+
+
+def test_normalized_tables_match_champ_tables(static_data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows_written = export_normalized_tables(static_data, sqlite_path="champ_data.sqlite")
+    champ_abilities_and_multipliers(static_data)
+
+    heroes = pd.read_csv("champ_heroes.csv")
+    skills = pd.read_csv("champ_skills.csv")
+    effects = pd.read_csv("champ_effects.csv")
+    basic_info = pd.read_csv("champ_basic_info.csv", index_col=0)
+    moves_basic = pd.read_csv("champ_moves_basic.csv", index_col=0)
+    move_details = pd.read_csv("champ_move_details.csv", index_col=0)
+    assert rows_written["heroes"] == len(heroes) == len(basic_info)
+    # Common champs are in every grade, which champ_moves_basic has as duplicates but the skills table keeps apart
+    skill_counts = {hero["Id"]: len(hero["SkillTypeIds"]) for hero in static_data["HeroData"]["HeroTypes"]}
+    assert rows_written["skills"] == len(skills) == sum(skill_counts[champ_id] for champ_id in heroes["id"])
+    assert len(skills.drop(columns=["id", "skill_id"]).drop_duplicates()) == len(moves_basic)
+    pd.testing.assert_frame_equal(heroes, basic_info.reset_index(drop=True))
+    assert set(effects["effect_id"]) == set(move_details["effect_id"])
+
+    # Book multipliers come from the skill, effects or not
+    no_effects = skills[skills["skill_id"] == 10061].iloc[0]
+    assert (no_effects["book_dmg_mul"], no_effects["book_heal_mul"], no_effects["book_shield_mul"]) == \
+        (1.15, 1.0, 1.1)
+    assert no_effects["book_effects"] == "+15% Damage, +10% Shield"
+    assert 10061 not in set(effects["skill_id"])
+    books = move_details.drop_duplicates("skill_id").set_index("skill_id")
+    booked = skills.drop_duplicates("skill_id").set_index("skill_id").loc[books.index]
+    for column in ["book_dmg_mul", "book_heal_mul", "book_shield_mul"]:
+        assert booked[column].tolist() == books[column].tolist()
+    assert skills[["book_dmg_mul", "book_heal_mul", "book_shield_mul"]].notna().all().all()
+
+    with sqlite3.connect("champ_data.sqlite") as connection:
+        for table in NORMALIZED_TABLES:
+            count, = connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()
+            assert count == rows_written[table]
+
+
+def test_main(static_data, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "static_data.json").write_text(json.dumps(static_data), encoding="utf-8")
+    main(["static_data.json", "out.sqlite", "--format", "none"])
+    assert not list(tmp_path.glob("champ_*.csv"))
+    assert (tmp_path / "out.sqlite").exists()
+    assert "heroes: 15 rows" in capsys.readouterr().out
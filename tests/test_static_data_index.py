@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from raid_benchmark import write_synthetic_static_data
+from raid_static_data_index import StaticDataIndex
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("static_data") / "static_data.json"
+    write_synthetic_static_data(str(path), scale=1, seed=3)
+    with open(path, encoding="utf-8") as f:
+        return StaticDataIndex(json.load(f))
+
+
+def _effect_matches(index, effect, status, kind, target):
+    return ((status is None or any(status_id in index.codes("status", status) for status_id, _ in effect["statuses"]))
+            and (kind is None or effect["kind"] in index.codes("kind", kind))
+            and (target is None or effect["target"] in index.codes("target", target)))
+
+
+def _skill_matches(index, skill, status, kind, target, max_cooldown):
+    # Effect filters have to match on the same effect, and the cooldown on the same skill
+    if max_cooldown is not None and skill["cooldown"] > max_cooldown:
+        return False
+    return any(_effect_matches(index, index.effects[effect_id], status, kind, target)
+               for effect_id in skill["effect_ids"])
+
+
+def test_codes():
+    assert StaticDataIndex.codes("status", "Decrease DEF") == {150, 151}
+    assert StaticDataIndex.codes("status", 151) == {151}
+    assert StaticDataIndex.codes("faction", ["Dwarves", 1]) == {16, 1}
+    assert StaticDataIndex.codes("faction", "Not a faction") == frozenset()
+
+
+@pytest.mark.parametrize("filters", [
+    {"status": "Decrease"},
+    {"status": "Decrease", "target": "All enemies"},
+    {"kind": [4000, 5000], "max_cooldown": 4},
+    {"status": "Increase", "target": "All allies", "max_cooldown": 3},
+])
+def test_skill_filters_match_brute_force(index, filters):
+    filters = {"status": None, "kind": None, "target": None, "max_cooldown": None, **filters}
+    expected = {skill_id for skill_id, skill in index.skills.items() if _skill_matches(index, skill, **filters)}
+    assert expected
+    assert index.find_skills(**filters) == expected
+
+    expected_heroes = {champ_id for champ_id, hero in index.heroes.items()
+                       if any(skill_id in expected for skill_id in hero["skill_ids"])}
+    assert index.find_heroes(**filters) == expected_heroes
+
+
+def test_hero_filters_match_brute_force(index):
+    champ_id, hero = next(iter(index.heroes.items()))
+    expected = {other_id for other_id, other in index.heroes.items()
+                if other["faction"] == hero["faction"] and other["affinity"] == hero["affinity"]}
+    assert champ_id in expected
+    assert index.find_heroes(faction=hero["faction"], affinity=hero["affinity"]) == expected
+    assert index.find_heroes() == set(index.heroes)
+    assert index.find_heroes(faction="Not a faction") == frozenset()
+
+
+def test_playable_only(index):
+    assert all(champ_id % 10 == 6 or hero["rarity"] == 1 for champ_id, hero in index.heroes.items())
+    described = index.describe_hero(1006)
+    assert described["id"] == 1006
+    assert isinstance(described["faction"], str)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from raid_static_data_analysis import RowAccumulator, TableWriter
+
+MIXED_ROWS = [
+    {"a": 1, "b": "x"},
+    {"a": "1", "b": "x"},
+    {"a": 1.0, "b": "x"},
+    {"a": True, "b": "x"},
+    {"a": None, "b": "x"},
+    {"a": np.nan, "b": "x"},
+    {"a": "None", "b": "x"},
+    {"a": "nan", "b": "x"},
+    {"a": 1.5, "b": None},
+    {"a": "1.5", "b": None},
+    {"a": 1.5, "b": np.nan},
+    {"a": np.int64(1), "b": "x"},
+    {"a": "", "b": ""},
+    {"a": 2, "b": 3},
+    {"a": 2, "b": "3"},
+    {"a": 2.0, "b": 3.0},
+]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 3, 100])
+def test_duplicates_dropped_like_drop_duplicates(tmp_path, chunk_rows):
+    expected = RowAccumulator(["a", "b"])
+    for row in MIXED_ROWS * 2:
+        expected.append(row)
+    expected = expected.to_dataframe().drop_duplicates(ignore_index=True)
+
+    written = []
+    with TableWriter(str(tmp_path / "mixed.csv"), ["a", "b"], chunk_rows=chunk_rows,
+                     transform=lambda df: written.append(df) or df) as writer:
+        for row in MIXED_ROWS * 2:
+            writer.append(row)
+    written = pd.concat(written)
+
+    assert writer.rows_written == len(expected)
+    # Same rows, with the same types of value
+    assert [[(type(value), value) for value in row] for row in written.itertuples(index=False)] == \
+        [[(type(value), value) for value in row] for row in expected.itertuples(index=False)]
+    assert written.index.tolist() == list(range(len(expected)))
+
+
+def test_row_accumulator():
+    rows = RowAccumulator(["a", "b"], dtypes={"a": float})
+    rows.append({"a": 1, "b": "x"})
+    rows.append({"b": "y", "c": 3})
+    other = RowAccumulator(["a", "d"])
+    other.append({"a": 2, "d": True})
+    rows.extend_columns(other.columns_data())
+    assert len(rows) == 3
+    assert rows.columns == ["a", "b", "c", "d"]
+
+    df = rows.to_dataframe()
+    expected = pd.DataFrame({"a": [1.0, np.nan, 2.0], "b": ["x", "y", None], "c": [None, 3, None],
+                             "d": [None, None, True]}, dtype=object).astype({"a": float})
+    assert df["a"].dtype == float
+    # Columns without a dtype keep their values as they were
+    assert df["c"].tolist() == [None, 3, None]
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_csv_and_sqlite_output(tmp_path):
+    import sqlite3
+
+    rows = [{"id": i % 7, "name": f"champ {i % 7}", "atk": i % 7 * 10} for i in range(30)]
+    expected = pd.DataFrame(rows).drop_duplicates(ignore_index=True)
+    with TableWriter(str(tmp_path / "champs.csv"), ["id", "name", "atk"], chunk_rows=4) as csv_writer, \
+            TableWriter(str(tmp_path / "champs.sqlite"), ["id", "name", "atk"], "sqlite", chunk_rows=4,
+                        table_name="champs", index_columns=["id"]) as sqlite_writer:
+        for row in rows:
+            csv_writer.append(row)
+            sqlite_writer.append(row)
+
+    assert csv_writer.rows_written == sqlite_writer.rows_written == 7
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "champs.csv", index_col=0), expected)
+    with sqlite3.connect(tmp_path / "champs.sqlite") as connection:
+        pd.testing.assert_frame_equal(pd.read_sql("SELECT * FROM champs", connection), expected)
+        assert connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0] == 1
@@ -0,0 +1,77 @@
+import pytest
+
+from raid_turn_meter import BattleSkill, BattleUnit, simulate_battle, speed_tune_search
+
+A1 = BattleSkill("A1")
+SPEED_BUFF = BattleSkill("Buff", 0, [(4000, "self", 160, 2, 1.0)])
+EXTRA_TURN = BattleSkill("Extra", 3, [(4007, "self", 0, 0, 1.0)])
+TURN_METER_FILL = BattleSkill("Fill", 3, [(4001, "allies", 30, 0, 1.0)])
+SPEED_DEBUFF = BattleSkill("Debuff", 3, [(5000, "enemies", 170, 2, 1.0)])
+
+
+def test_faster_champs_take_more_turns():
+    result = simulate_battle([BattleUnit("A", 200, [A1]), BattleUnit("B", 100, [A1])], BattleUnit("Boss", 100),
+                             boss_turns=10)
+    assert result.turns == {"A": 18, "B": 10, "Boss": 10}
+    assert len(result.turn_sequence()) == 11
+    assert result.sequence.count("Boss") == 10
+
+
+def test_speed_buff():
+    plain = simulate_battle([BattleUnit("A", 200, [A1])], BattleUnit("Boss", 100), boss_turns=10)
+    buffed = simulate_battle([BattleUnit("A", 200, [SPEED_BUFF])], BattleUnit("Boss", 100), boss_turns=10)
+    assert buffed.turns["A"] > plain.turns["A"]
+    # Placed again every turn, so it's always up when the boss goes
+    assert buffed.boss_turn_uptime == {("A", "15% Increase SPD"): 1.0}
+    assert set(buffed.uptime_frame().index) == {("A", "15% Increase SPD")}
+
+
+def test_speed_debuff_slows_the_boss():
+    plain = simulate_battle([BattleUnit("A", 150, [A1])], BattleUnit("Boss", 150), boss_turns=20)
+    debuffed = simulate_battle([BattleUnit("A", 150, [SPEED_DEBUFF, A1])], BattleUnit("Boss", 150), boss_turns=20)
+    assert debuffed.turns["A"] > plain.turns["A"]
+
+
+def test_extra_turns_and_turn_meter_fills():
+    result = simulate_battle([BattleUnit("A", 100, [EXTRA_TURN, A1])], BattleUnit("Boss", 100), boss_turns=6)
+    assert result.turn_sequence()[:4] == [["A", "A"], ["A"], ["A", "A"], ["A"]]
+
+    plain = simulate_battle([BattleUnit("A", 120, [A1]), BattleUnit("B", 100, [A1])], BattleUnit("Boss", 90),
+                            boss_turns=20)
+    filled = simulate_battle([BattleUnit("A", 120, [TURN_METER_FILL, A1]), BattleUnit("B", 100, [A1])],
+                             BattleUnit("Boss", 90), boss_turns=20)
+    assert filled.turns["B"] > plain.turns["B"]
+
+
+def test_zero_speed():
+    # A boss that never moves: stops at max_turns instead of going on forever, with no boss turns to share over
+    result = simulate_battle([BattleUnit("A", 200, [A1])], BattleUnit("Boss", 0), boss_turns=10, max_turns=500)
+    assert result.turns == {"A": 500, "Boss": 0}
+    assert result.boss_turn_uptime == {}
+
+    result = simulate_battle([BattleUnit("A", 200, [A1]), BattleUnit("Stuck", 0, [A1])], BattleUnit("Boss", 100),
+                             boss_turns=10)
+    assert result.turns["Stuck"] == 0
+
+    with pytest.raises(ValueError):
+        speed_tune_search([BattleUnit("A", 200, [A1])], BattleUnit("Boss", 0), [[180, 200]])
+
+
+def test_speed_tune_search():
+    team = [BattleUnit("A", 200, [SPEED_BUFF]), BattleUnit("B", 150, [TURN_METER_FILL, A1])]
+    speeds = [range(170, 176), [150, 210]]
+    result = speed_tune_search(team, BattleUnit("Boss", 190), speeds, boss_turns=20)
+    assert len(result) == 12
+    assert list(result[["A spd", "B spd"]].itertuples(index=False, name=None))[:3] == [(170, 150), (170, 210),
+                                                                                        (171, 150)]
+    assert result.attrs["turns_simulated"] > 12 * 20
+
+    row = result.iloc[1]
+    battle = simulate_battle([team[0].with_speed(170), team[1].with_speed(210)], BattleUnit("Boss", 190),
+                             boss_turns=20)
+    assert row["A turns"] == battle.turns["A"] / battle.turns["Boss"]
+    assert row["A: 15% Increase SPD"] == battle.boss_turn_uptime[("A", "15% Increase SPD")]
+
+    parallel = speed_tune_search(team, BattleUnit("Boss", 190), speeds, boss_turns=20, workers=2,
+                                 combinations_per_task=5)
+    assert parallel.equals(result)